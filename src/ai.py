@@ -3,25 +3,72 @@ import os
 
 try:
     import torch
-    from training.model import ChessNet
+    from training.model import ChessNet, checkpoint_model_config
+    from training.eval_cache import EvalCache
+    from training.inference_model import load_inference_model
+    from training.opening_book import load_book
+    from training.tablebase import load_tablebases
     HAS_TORCH = True
 except ImportError:
     HAS_TORCH = False
 
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models')
+
+
+def resolve_checkpoint(name_or_path):
+    """Checkpoint path for a path, or for a bare model name in models/.
+
+    "student" -> models/student.pt (e.g. a network from training/distill.py).
+    """
+    if os.path.exists(name_or_path) or os.sep in name_or_path or name_or_path.endswith(".pt"):
+        return name_or_path
+    return os.path.join(MODELS_DIR, name_or_path + ".pt")
+
+
 class AI:
-    def __init__(self, checkpoint_path, device):
+    def __init__(self, checkpoint_path, device, cache_bytes=64 * 1024 * 1024, search_depth=0,
+                 book_path=None, tablebase_dir=None, book_plies=8):
+        """checkpoint_path may also be a model name, see resolve_checkpoint().
+
+        With search_depth > 0, moves come from a policy-guided alpha-beta
+        search (training/search.py) instead of the raw policy. book_path
+        names an opening book (training/opening_book.py) probed before
+        either for the first book_plies plies, as in self-play; a missing
+        file means no book. tablebase_dir holds endgame
+        tables (training/tablebase.py), played exactly once they cover the
+        position.
+        """
         self.device = device
+        self.search_depth = search_depth
+        self.book = load_book(book_path)
+        self.book_plies = book_plies
+        self.tablebases = load_tablebases(tablebase_dir) if tablebase_dir is not None else None
         self.model = ChessNet(num_channels=13, policy_size=8513).to(device)
+        self.cache = EvalCache(max_bytes=cache_bytes)
+        self.inference_model = None  # Fused/scripted build, if one could be loaded
         self.load_checkpoint(checkpoint_path)
         self.ai_color = None  # Will be set later: 'white' or 'black'
 
     def load_checkpoint(self, checkpoint_path):
+        checkpoint_path = resolve_checkpoint(checkpoint_path)
+        self.inference_model = None
         try:
             checkpoint = torch.load(checkpoint_path, map_location=self.device)
-            self.model.load_state_dict(checkpoint["model_state_dict"])
+            model = ChessNet(**checkpoint_model_config(checkpoint)).to(self.device)
+            model.load_state_dict(checkpoint["model_state_dict"])
+            self.model = model
+            self.cache.clear()
             print("AI model loaded from checkpoint.")
         except Exception as e:
             print("No checkpoint loaded; using a new model.", e)
+            return
+        self.inference_model = load_inference_model(checkpoint_path, self.device)
+
+    def get_eval_model(self):
+        """The model used for move selection: the inference build if available."""
+        if self.inference_model is not None:
+            return self.inference_model
+        return self.model
 
     def set_color(self, color_choice):
         """
@@ -43,7 +90,21 @@ class AI:
         """
         #print("AI.get_move called. Game turn:", game.turn, "AI color:", game.ai_color)
         if game.turn == game.ai_color and not game.game_over:
-            move = game.get_model_move(self.model, self.device, temperature=1.0, use_dirichlet=False, sample=False)
+            # Probing builds every child position; past the opening it never hits.
+            if self.book is not None and len(game.move_log) < self.book_plies:
+                move = self.book.probe(game)
+                if move is not None:
+                    return move
+            if self.tablebases is not None:
+                move = self.tablebases.best_move(game)
+                if move is not None:
+                    return move
+            if self.search_depth > 0:
+                from training.search import AlphaBetaSearch
+                searcher = AlphaBetaSearch(self.get_eval_model(), self.device, cache=self.cache,
+                                           tablebases=self.tablebases)
+                return searcher.search(game, self.search_depth)["best_action"]
+            move = game.get_model_move(self.get_eval_model(), self.device, temperature=1.0, use_dirichlet=False, sample=False, cache=self.cache)
             #print("AI.get_move returning move:", move, flush=True)
             return move
         #print("AI.get_move: condition not met (either wrong turn or game over), returning None", flush=True)
@@ -6,7 +6,6 @@ from .clock import format_time  # Changed to relative import
 import importlib.resources as pkg_resources
 from . import assets  # assets folder should be a package
 import torch
-import torch.nn.functional as F
 
 class Game:
     def __init__(self, screen, headless=False):
@@ -115,35 +114,22 @@ class Game:
             self.time_control_options.append((rect, label, *time_params))
             y_cursor += btn_h + btn_spacing
 
-    def get_model_move(self, model, device, temperature=1.0, use_dirichlet=False, epsilon=0.25, alpha=0.3, sample=False):
+    def get_model_move(self, model, device, temperature=1.0, use_dirichlet=False, epsilon=0.25, alpha=0.3, sample=False, cache=None,
+                       legal_actions=None):
         """
         Selects a move using the model with adjustable exploration.
-        ...
-        """
-        # 1. Encode board state and get model prediction.
-        board_state = self.encode_board_state()  # Shape: (num_channels, BOARD_SIZE, BOARD_SIZE)
-        state_tensor = torch.tensor(board_state).unsqueeze(0).to(device)
-        
-        model.eval()
-        with torch.no_grad():
-            # Assuming model outputs logits for the policy.
-            logits, _ = model(state_tensor)
-        logits = logits.squeeze(0)
-        
-        # Apply temperature scaling.
-        scaled_logits = logits / temperature
-        probs = F.softmax(scaled_logits, dim=-1)
-        
-        # Optionally add Dirichlet noise.
-        if use_dirichlet:
-            noise = np.random.dirichlet([alpha] * probs.shape[-1])
-            noise_tensor = torch.tensor(noise, dtype=torch.float32, device=device)
-            probs = (1 - epsilon) * probs + epsilon * noise_tensor
 
-        # 2. Build the list of legal actions (shared method).
-        legal_actions = self.get_legal_actions()
+        Only the legal actions' logits are computed; softmax, temperature,
+        Dirichlet noise and sampling run over that subset on the model's
+        device. If an EvalCache is given, network outputs are looked up by
+        position before running the model. legal_actions may pass in an
+        already computed get_legal_actions() result.
+        """
+        # 1. Build the list of legal actions (shared method).
+        if legal_actions is None:
+            legal_actions = self.get_legal_actions()
         
-        # 3. Map each legal action to its corresponding index.
+        # 2. Map each legal action to its corresponding index.
         action_indices = []
         for action in legal_actions:
             action_type, src, dst, purchase_type = action
@@ -158,29 +144,100 @@ class Game:
             # Fallback: if no legal actions, return a random move.
             return self.get_random_move()
         
-        # 4. Create lists for legal indices and actions.
+        # 3. Create lists for legal indices and actions.
         legal_idx_list = [idx for idx, action in action_indices]
         legal_actions_list = [action for idx, action in action_indices]
-        
-        # Extract the probabilities for legal moves.
-        policy_probs = probs.cpu().numpy()
-        legal_probs = policy_probs[legal_idx_list]
-        
-        # If sampling is requested, sample based on the legal probabilities.
+
+        # 4. Get the model's logits for the legal moves.
+        legal_logits, _ = self.evaluate_legal_policy(model, device, legal_idx_list, cache=cache)
+
+        # Apply temperature scaling.
+        probs = torch.softmax(legal_logits / temperature, dim=-1)
+
+        # Optionally add Dirichlet noise.
+        if use_dirichlet:
+            concentration = torch.full_like(probs, alpha)
+            noise = torch.distributions.Dirichlet(concentration).sample()
+            probs = (1 - epsilon) * probs + epsilon * noise
+
         if sample:
-            sum_prob = legal_probs.sum()
-            if sum_prob > 0:
-                normalized_probs = legal_probs / sum_prob
-                chosen_idx = np.random.choice(len(legal_actions_list), p=normalized_probs)
-                chosen_action = legal_actions_list[chosen_idx]
-            else:
-                # Fallback to best move if probabilities sum to zero.
-                chosen_action = legal_actions_list[np.argmax(legal_probs)]
+            # Sample on the model's device based on the legal probabilities.
+            chosen_idx = torch.multinomial(probs, 1).item()
         else:
             # Deterministic: select the action with the highest probability.
-            chosen_action = legal_actions_list[np.argmax(legal_probs)]
-        
-        return chosen_action
+            chosen_idx = torch.argmax(probs).item()
+
+        return legal_actions_list[chosen_idx]
+
+    def evaluate_legal_policy(self, model, device, legal_indices, cache=None):
+        """
+        Returns (logits, value) for the current position, where logits is a
+        1-D tensor on device holding the policy logits at legal_indices only.
+        Models exposing legal_policy() (ChessNet and its inference build)
+        compute just those logits; anything else runs the full forward pass.
+        Uses and fills the given EvalCache, keyed by get_position_key().
+        legal_indices are always move_to_index indices; they are translated
+        for models using the compact action space (training/action_space.py).
+        """
+        key = None
+        if cache is not None:
+            key = self.get_position_key()
+            entry = cache.get(key, legal_indices)
+            if entry is not None:
+                _, legal_logits, value = entry
+                return torch.from_numpy(legal_logits).to(device), value
+
+        board_state = self.encode_board_state()  # Shape: (num_channels, BOARD_SIZE, BOARD_SIZE)
+        state_tensor = torch.tensor(board_state).unsqueeze(0).to(device)
+
+        model.eval()
+        with torch.no_grad():
+            if getattr(model, "legal_policy", None) is not None:
+                index_tensor = self._policy_index_tensor(
+                    legal_indices, getattr(model, "policy_size", 8513), device)
+                logits, value = model.legal_policy(state_tensor, index_tensor)
+            else:
+                logits, value = model(state_tensor)
+                index_tensor = self._policy_index_tensor(legal_indices, logits.shape[1], device)
+                logits = logits.index_select(1, index_tensor)
+        legal_logits = logits.squeeze(0)
+        value = float(value.reshape(-1)[0])
+
+        if cache is not None:
+            cache.put(key, legal_indices, legal_logits.cpu().numpy(), value)
+        return legal_logits, value
+
+    @staticmethod
+    def _policy_index_tensor(legal_indices, policy_size, device):
+        """legal_indices as a tensor of indices into a policy_size-wide output."""
+        if policy_size != 8513:
+            from training.action_space import legacy_to_compact_indices
+            legal_indices = legacy_to_compact_indices(legal_indices)
+        return torch.as_tensor(legal_indices, dtype=torch.long, device=device)
+
+    def evaluate_value(self, model, device, cache=None):
+        """
+        Returns the model's value estimate for the current position, from the
+        perspective of the side to move. Models exposing value_only() skip
+        the policy head entirely. A cached entry for this position is reused,
+        but value-only results are not cached (they carry no policy).
+        """
+        if cache is not None:
+            key = self.get_position_key()
+            if key in cache:
+                _, _, value = cache.get(key)
+                return value
+
+        board_state = self.encode_board_state()
+        state_tensor = torch.tensor(board_state).unsqueeze(0).to(device)
+
+        model.eval()
+        with torch.no_grad():
+            if getattr(model, "value_only", None) is not None:
+                value = model.value_only(state_tensor)
+            else:
+                _, value = model(state_tensor)
+        return float(value.reshape(-1)[0])
 
     def is_move_legal(self, move):
         """
@@ -319,14 +376,23 @@ class Game:
         encoded_state = np.concatenate([piece_tensor, gold_tensor], axis=0)
         return encoded_state
     
-    def get_training_example(self):
+    def get_training_example(self, action_probs=None):
         """
         Returns (board_state, policy_target, player) where policy_target is
-        a uniform distribution over all legal actions in the 8513-dim action space.
+        a uniform distribution over all legal actions in the 8513-dim action space,
+        or the given distribution when action_probs maps actions to probabilities
+        (e.g. the improved policy of training/gumbel.py). Given probabilities of
+        actions that share an index (every collect_gold, for one) add up.
         """
         board_state = self.encode_board_state()
         total_actions = 8513
         policy_target = np.zeros(total_actions, dtype=np.float32)
+
+        if action_probs is not None:
+            for action, prob in action_probs.items():
+                policy_target[self.move_to_index(*action)] += prob
+            return board_state, policy_target, self.turn
+
         legal_actions = self.get_legal_actions()
 
         # Uniform distribution over legal actions
@@ -17,7 +17,14 @@ def main():
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     script_dir = os.path.dirname(os.path.abspath(__file__))
     checkpoint_path = os.path.join(script_dir, '..', 'models', 'chess_model_checkpoint.pt')
-    ai_instance = AI(checkpoint_path, device)
+    book_path = os.path.join(script_dir, '..', 'models', 'opening_book.npz')
+    tablebase_dir = os.path.join(script_dir, '..', 'models', 'tablebases')
+    # CHESSBUILDER_MODEL picks another checkpoint by name or path, e.g. a
+    # distilled "student" for faster casual play; CHESSBUILDER_BOOK and
+    # CHESSBUILDER_TABLEBASES another opening book / tablebase directory.
+    ai_instance = AI(os.environ.get("CHESSBUILDER_MODEL", checkpoint_path), device,
+                     book_path=os.environ.get("CHESSBUILDER_BOOK", book_path),
+                     tablebase_dir=os.environ.get("CHESSBUILDER_TABLEBASES", tablebase_dir))
 
     clock = pygame.time.Clock()
 
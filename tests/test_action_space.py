@@ -0,0 +1,106 @@
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from src.game import Game
+from training.action_space import (
+    COMPACT_POLICY_SIZE,
+    COMPACT_TO_LEGACY,
+    LEGACY_TO_COMPACT,
+    convert_policy,
+    migrate_replay_data,
+)
+from training.dataset import _COMPACT_FLIP_INDEX_MAP, _FLIP_INDEX_MAP, ChessDataset
+from training.model import ChessNet
+
+
+def test_compact_vocab_is_a_bijection_covering_legal_actions():
+    assert COMPACT_POLICY_SIZE < 8513 // 2
+    assert (LEGACY_TO_COMPACT[COMPACT_TO_LEGACY] == np.arange(COMPACT_POLICY_SIZE)).all()
+
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    for _ in range(200):
+        if g.is_game_over():
+            g.new_game()
+        _, policy, _ = g.get_training_example()
+        compact = convert_policy(policy, COMPACT_POLICY_SIZE)
+        assert np.isclose(compact.sum(), policy.sum())
+        assert np.array_equal(convert_policy(compact, 8513), policy)
+        g.apply_move(g.get_random_move())
+
+
+def test_compact_flip_map_matches_legacy_flip():
+    rng = np.random.default_rng(0)
+    legacy = np.zeros(8513, dtype=np.float32)
+    legacy[COMPACT_TO_LEGACY] = rng.random(COMPACT_POLICY_SIZE)
+    flipped = convert_policy(legacy[_FLIP_INDEX_MAP], COMPACT_POLICY_SIZE)
+    assert np.array_equal(convert_policy(legacy, COMPACT_POLICY_SIZE)[_COMPACT_FLIP_INDEX_MAP], flipped)
+
+
+def test_migrated_replay_data_trains_like_the_original():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        compact_path = os.path.join(tmpdir, 'compact_training_data.npz')
+        g = Game(screen=None, headless=True)
+        g.new_game()
+        states, policies = [], []
+        for _ in range(6):
+            state, policy, _ = g.get_training_example()
+            states.append(state)
+            policies.append(policy)
+            g.apply_move(g.get_random_move())
+        np.savez(data_path, states=np.array(states), policy_targets=np.array(policies),
+                 value_targets=np.zeros((6, 1), dtype=np.float32))
+
+        migrate_replay_data(data_path, compact_path)
+        legacy_ds = ChessDataset(data_file=data_path, augment=True)
+        compact_ds = ChessDataset(data_file=compact_path, augment=True)
+        converted_ds = ChessDataset(data_file=data_path, augment=True, policy_size=COMPACT_POLICY_SIZE)
+        for i in range(len(legacy_ds)):
+            expected = convert_policy(legacy_ds[i][1], COMPACT_POLICY_SIZE)
+            assert np.array_equal(compact_ds[i][1], expected)
+            assert np.array_equal(converted_ds[i][1], expected)
+            assert np.array_equal(compact_ds[i][0], legacy_ds[i][0])
+
+
+def test_game_translates_indices_for_compact_model():
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=COMPACT_POLICY_SIZE, policy_head="conv")
+    model.train(False)
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    legal = [g.move_to_index(*a) for a in g.get_legal_actions()]
+    logits, _ = g.evaluate_legal_policy(model, torch.device('cpu'), legal)
+
+    x = torch.tensor(g.encode_board_state()).unsqueeze(0)
+    with torch.no_grad():
+        full, _ = model(x)
+    expected = full[0, torch.from_numpy(LEGACY_TO_COMPACT[legal])]
+    assert torch.allclose(logits, expected, atol=1e-5)
+    assert g.get_model_move(model, torch.device('cpu'), sample=False) in g.get_legal_actions()
+
+
+def test_selfplay_with_compact_model_migrates_buffer():
+    """A compact model's games are stored compactly, converting the old buffer."""
+    from training.selfplay import generate_selfplay_data
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        generate_selfplay_data(num_games=1, model=None, device=None, data_path=data_path, max_moves=10)
+        data = np.load(data_path)
+        old_count = data['states'].shape[0]
+        assert data['policy_targets'].shape[1] == 8513
+        data.close()
+
+        model = ChessNet(num_channels=13, policy_size=COMPACT_POLICY_SIZE, policy_head="conv")
+        generate_selfplay_data(
+            num_games=2, model=model, device=torch.device("cpu"), data_path=data_path,
+            num_workers=2, max_moves=10, inference_server=True,
+        )
+        data = np.load(data_path)
+        assert data['states'].shape[0] > old_count
+        assert data['policy_targets'].shape[1] == COMPACT_POLICY_SIZE
+        assert np.allclose(data['policy_targets'].sum(axis=1), 1.0, atol=1e-4)
+        data.close()
@@ -0,0 +1,41 @@
+import numpy as np
+import torch
+
+from training.actor_learner import ReplayWindow, async_training
+from training.adjudication import Adjudication
+from training.dataset import _FLIP_INDEX_MAP
+from training.model import ChessNet
+
+
+def test_replay_window_keeps_recent_games_and_mirrors_samples():
+    window = ReplayWindow(max_rows=5, policy_size=8513)
+    for game in range(4):
+        states = np.full((2, 13, 8, 8), game, dtype=np.float32)
+        states[:, :, :, 0] = -1.0
+        policies = np.zeros((2, 8513), dtype=np.float32)
+        policies[:, 0] = 1.0
+        window.add(states, policies, np.full(2, game, dtype=np.float32))
+    assert window.rows == 6 and len(window.chunks) == 3
+
+    states, policies, values = window.sample(64, np.random.default_rng(0))
+    assert set(values.reshape(-1)) <= {1.0, 2.0, 3.0}
+    mirrored = states[:, 0, 0, 7] == -1.0
+    assert mirrored.any() and not mirrored.all()
+    assert np.all(policies[mirrored][:, _FLIP_INDEX_MAP[0]] == 1.0)
+    assert np.all(policies[~mirrored][:, 0] == 1.0)
+
+
+def test_async_training_overlaps_selfplay_and_learning(tmp_path):
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    report = async_training(
+        train_steps=6, num_workers=2, batch_size=8, publish_steps=3, train_ratio=1.0, max_staleness=10,
+        max_moves=8, lockstep_games=2, adjudication=Adjudication(), data_path=str(tmp_path / "data.npz"),
+        model=model, device=torch.device("cpu"), window_size=1000,
+    )
+    assert report["steps"] == 6 and report["versions"] == 3
+    assert report["trained"] == 48 and report["generated"] >= 48 - 2 * 8
+    assert report["buffer_size"] == report["generated"] and report["stale_games"] == 0
+    assert 0.0 < report["actors"]["utilization"] <= 1.0 and 0.0 < report["learner_utilization"] <= 1.0
+    with np.load(tmp_path / "data.npz") as data:
+        assert data["states"].shape[0] == report["generated"]
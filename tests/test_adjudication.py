@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+
+from src import board
+from src.game import Game
+from training.adjudication import Adjudication, GameAdjudicator, summarize_games
+from training.selfplay import generate_selfplay_data
+
+
+def _new_game():
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    return g
+
+
+def test_static_material_is_drawn_after_the_window():
+    g = _new_game()
+    adjudicator = Adjudication(draw_window=3).new_game()
+    plies = 0
+    while not g.is_game_over():
+        g.apply_move(next(a for a in g.get_legal_actions() if a[0] == "collect_gold"))
+        plies += 1
+        adjudicator.after_move(g)
+    assert plies == 4 and g.winner == "draw"
+    assert adjudicator.record(g, plies, 0.0)["reason"] == "static_draw"
+
+
+def test_resignation_and_its_audit():
+    settings = Adjudication(resign_threshold=0.5, resign_plies=2, resign_playthrough=0.0)
+    g = _new_game()
+    adjudicator = settings.new_game()
+    assert not adjudicator.observe_value(g, -0.9, 0)
+    assert adjudicator.observe_value(g, -0.9, 2)
+    assert g.winner == "black" and adjudicator.record(g, 2, 0.0)["reason"] == "resign"
+
+    # Played out instead: White would have resigned but went on to win.
+    g = _new_game()
+    adjudicator = GameAdjudicator(settings, playthrough=True)
+    adjudicator.observe_value(g, -0.9, 0)
+    assert not adjudicator.observe_value(g, -0.9, 2) and not g.is_game_over()
+    g.game_over, g.winner = True, "white"
+    record = adjudicator.record(g, 30, 1.0)
+    assert record["reason"] == "checkmate" and record["resign_ply"] == 2 and record["false_resign"]
+
+    summary = summarize_games([record, {"plies": 10, "seconds": 0.5, "winner": "draw", "reason": "draw"}])
+    assert summary["games"] == 2 and summary["plies"] == 40
+    assert summary["false_resignations"] == 1 and summary["plies_saved_per_resignation"] == 28
+
+
+def test_material_lead_wins():
+    g = _new_game()
+    g.board[7][3] = board.Piece('Q', 'white')
+    adjudicator = Adjudication(material_threshold=8, material_plies=2).new_game()
+    g.apply_move(next(a for a in g.get_legal_actions() if a[0] == "collect_gold"))
+    assert not adjudicator.after_move(g)
+    g.apply_move(next(a for a in g.get_legal_actions() if a[0] == "collect_gold"))
+    assert adjudicator.after_move(g) and g.winner == "white"
+
+
+def test_selfplay_records_every_game():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        game_log = os.path.join(tmpdir, 'games.jsonl')
+        for workers in (0, 2):
+            generate_selfplay_data(num_games=2, data_path=data_path, max_moves=300, num_workers=workers,
+                                   adjudication=Adjudication(draw_window=4), game_log=game_log)
+        with open(game_log) as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 4
+        assert all(r["plies"] <= 300 and r["reason"] for r in records)
+        assert any(r["reason"] == "static_draw" for r in records)
@@ -0,0 +1,28 @@
+import json
+
+from training.bench_selfplay import PhaseTimer, run_benchmark
+
+
+def test_phase_timer_counts_nested_calls_once():
+    timer = PhaseTimer()
+    inner = timer.wrap("legality", lambda: sum(range(10000)))
+    outer = timer.wrap("movegen", lambda: [inner() for _ in range(3)])
+    outer()
+    assert timer.calls == {"legality": 3, "movegen": 1}
+    assert 0.0 <= timer.seconds["movegen"] and 0.0 < timer.seconds["legality"]
+
+
+def test_benchmark_reports_throughput_and_phases(tmp_path):
+    output_path = tmp_path / "bench.json"
+    results = run_benchmark(num_games=2, max_moves=6, output_path=str(output_path),
+                            modes=("random", "model", "pool"))
+    assert json.loads(output_path.read_text()) == results
+    assert results["skipped"] == {"pool": "num_workers is 0"}
+    for row in results["workloads"]:
+        assert row["games"] == 2 and row["examples"] == row["plies"] > 0
+        assert abs(sum(row["phases"].values()) - row["seconds"]) < 1e-6
+        assert row["phases"]["movegen"] > 0 and row["phases"]["buffer_io"] > 0
+    assert results["workloads"][1]["phases"]["inference"] > 0
+    # The methods are unwrapped again afterwards.
+    from src.game import Game
+    assert Game.get_legal_actions.__name__ == "get_legal_actions"
@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import socket
+import threading
+from multiprocessing.connection import Client
+
+import numpy as np
+import pytest
+import torch
+
+from training.coordinator import Coordinator, run_worker
+from training.model import ChessNet
+from training.selfplay import generate_selfplay_data
+
+AUTHKEY = b"test-selfplay"
+SETTINGS = {"max_moves": 4, "iteration": 0, "quantize": None, "calibration_path": None,
+            "stockfish_ratio": 0.0, "stockfish_depth": 1, "opening_book": None,
+            "book_plies": 8, "tablebase_dir": None, "gumbel_simulations": 0,
+            "adjudication": None, "lockstep_games": 1, "seed": None}
+
+
+def _start_daemon(address, num_workers=1):
+    daemon = multiprocessing.Process(target=run_worker, args=(address, AUTHKEY, num_workers))
+    daemon.start()
+    return daemon
+
+
+def test_localhost_daemons_play_a_selfplay_run(tmp_path):
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    data_path = str(tmp_path / "training_data.npz")
+    with Coordinator(("127.0.0.1", 0), authkey=AUTHKEY) as coordinator:
+        daemons = [_start_daemon(coordinator.address) for _ in range(2)]
+        generate_selfplay_data(num_games=4, model=model, device=torch.device("cpu"), data_path=data_path,
+                               max_moves=4, pool=coordinator)
+        assert coordinator.version == 1
+    for daemon in daemons:
+        daemon.join(60)
+        assert daemon.exitcode == 0
+    with np.load(data_path) as data:
+        assert data["states"].shape[0] == 16
+
+
+def test_disconnected_assignments_are_requeued():
+    with Coordinator(("127.0.0.1", 0), authkey=AUTHKEY) as coordinator:
+        coordinator.update_model(None)
+        outcome = {}
+        runner = threading.Thread(target=lambda: outcome.update(zip(("results", "schedule"),
+                                                                    coordinator.run(2, SETTINGS))))
+        runner.start()
+
+        # A worker that takes an assignment and vanishes without a result.
+        conn = Client(coordinator.address, authkey=AUTHKEY)
+        conn.send(("hello", socket.gethostname(), os.getpid(), 1))
+        reply = ("wait",)
+        while reply[0] == "wait":
+            conn.send(("ready",))
+            reply = conn.recv()
+        assert reply[0] == "task"
+        conn.close()
+
+        daemon = _start_daemon(coordinator.address)
+        runner.join(120)
+        assert outcome["schedule"]["requeued"] == 1
+        assert len(outcome["results"]) == 2 and all(result is not None for _, _, result in outcome["results"])
+    daemon.join(60)
+    assert daemon.exitcode == 0
+
+
+def test_coordinator_refuses_to_start_without_an_authkey(monkeypatch):
+    monkeypatch.delenv("SELFPLAY_AUTHKEY", raising=False)
+    with pytest.raises(ValueError, match="SELFPLAY_AUTHKEY"):
+        Coordinator(("127.0.0.1", 0))
+    with pytest.raises(ValueError, match="SELFPLAY_AUTHKEY"):
+        run_worker(("127.0.0.1", 1))
+    monkeypatch.setenv("SELFPLAY_AUTHKEY", "from-the-environment")
+    coordinator = Coordinator()
+    assert coordinator.authkey == b"from-the-environment"
+    assert coordinator.requested_address[0] == "127.0.0.1"
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import torch
+
+import src.ai
+from src.ai import AI
+from src.game import Game
+from training.distill import distill_student
+from training.model import ChessNet
+
+
+def _write_buffer(path, n=48):
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    states, policies, values = [], [], []
+    while len(states) < n:
+        if g.is_game_over():
+            g.new_game()
+        state, policy, _ = g.get_training_example()
+        states.append(state)
+        policies.append(policy)
+        values.append([0.0])
+        g.apply_move(g.get_random_move())
+    np.savez(path, states=np.array(states), policy_targets=np.array(policies),
+             value_targets=np.array(values, dtype=np.float32))
+
+
+def test_distilled_student_is_smaller_and_loads_by_name(tmp_path, monkeypatch):
+    data_path = str(tmp_path / 'training_data.npz')
+    _write_buffer(data_path)
+    torch.manual_seed(0)
+    teacher = ChessNet(num_channels=13, policy_size=8513)
+
+    student, report = distill_student(
+        name="tiny_student", data_path=data_path, teacher=teacher,
+        num_res_blocks=1, hidden_channels=32, epochs=2, batch_size=16,
+        output_dir=str(tmp_path), device=torch.device("cpu"),
+    )
+    assert os.path.exists(tmp_path / "tiny_student.pt")
+    assert report["student_params"] < report["teacher_params"] / 10
+    assert 0.0 <= report["top1_agreement"] <= 1.0
+    assert report["student_ms"] > 0
+
+    monkeypatch.setattr(src.ai, "MODELS_DIR", str(tmp_path))
+    ai = AI("tiny_student", torch.device("cpu"))
+    assert ai.model.config["num_res_blocks"] == 1
+    assert ai.model.config["hidden_channels"] == 32
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    g.ai_color = g.turn
+    assert ai.get_move(g) in g.get_legal_actions()
@@ -0,0 +1,56 @@
+import numpy as np
+import torch
+
+from src.game import Game
+from training.eval_cache import EvalCache
+from training.model import ChessNet
+
+
+def test_cache_hit_miss_counters():
+    cache = EvalCache()
+    assert cache.get("a") is None
+    cache.put("a", [1, 2, 3], [0.1, 0.2, 0.3], 0.5)
+    indices, logits, value = cache.get("a")
+    assert list(indices) == [1, 2, 3]
+    assert np.allclose(logits, [0.1, 0.2, 0.3])
+    assert value == 0.5
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_mismatched_indices_is_miss():
+    cache = EvalCache()
+    cache.put("a", [1, 2, 3], [0.1, 0.2, 0.3], 0.0)
+    assert cache.get("a", [1, 2]) is None
+    assert cache.get("a", [1, 2, 3]) is not None
+
+
+def test_cache_evicts_least_recently_used():
+    entry_size = EvalCache._entry_size("k0", np.zeros(50, np.int64), np.zeros(50, np.float32))
+    cache = EvalCache(max_bytes=entry_size * 3)
+    for i in range(3):
+        cache.put(f"k{i}", np.arange(50), np.zeros(50), 0.0)
+    cache.get("k0")  # k1 is now the oldest
+    cache.put("k3", np.arange(50), np.zeros(50), 0.0)
+    assert "k1" not in cache
+    assert "k0" in cache and "k3" in cache
+    assert cache.current_bytes <= cache.max_bytes
+    assert cache.stats()["evictions"] == 1
+
+
+def test_get_model_move_uses_cache():
+    """Second evaluation of the same position is a hit and picks the same move."""
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    device = torch.device("cpu")
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    cache = EvalCache()
+
+    first = g.get_model_move(model, device, sample=False, cache=cache)
+    second = g.get_model_move(model, device, sample=False, cache=cache)
+    uncached = g.get_model_move(model, device, sample=False)
+    assert first == second == uncached
+    assert cache.hits == 1
+    assert cache.misses == 1
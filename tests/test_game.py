@@ -359,6 +359,23 @@ def test_training_example_only_legal_actions(game_instance):
     assert abs(nonzero.max() - nonzero.min()) < 1e-7
 
 
+def test_training_example_sums_colliding_actions(game_instance):
+    """Every collect_gold maps to one index; a given policy target must still sum to 1."""
+    g = game_instance
+    g.new_game()
+    g.board = [[None]*8 for _ in range(8)]
+    g.board[7][4] = board.Piece('K', 'white')
+    g.board[0][4] = board.Piece('K', 'black')
+    for c in (1, 3, 6):
+        g.board[5][c] = board.Piece('P', 'white')
+    actions = g.get_legal_actions()
+    assert sum(a[0] == "collect_gold" for a in actions) == 3
+
+    probs = {action: 1.0 / len(actions) for action in actions}
+    _, policy, _ = g.get_training_example(action_probs=probs)
+    assert abs(policy.sum() - 1.0) < 1e-5
+
+
 def test_get_legal_actions_returns_list(game_instance):
     """get_legal_actions returns a non-empty list of 4-tuples."""
     g = game_instance
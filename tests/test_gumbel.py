@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from src import board
+from src.game import Game
+from training.gumbel import _batch_values, gumbel_root_search
+from training.model import ChessNet
+from training.search import child_position
+from training.selfplay import generate_selfplay_data
+
+
+def _model():
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513, policy_head="conv")
+    model.train(False)
+    return model
+
+
+def test_gumbel_search_respects_budget_and_returns_a_policy():
+    model = _model()
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    device = torch.device('cpu')
+
+    raw = gumbel_root_search(g, model, device, num_simulations=0, sample=False)
+    assert raw["action"] == g.get_model_move(model, device, sample=False)
+    for n in (4, 16):
+        result = gumbel_root_search(g, model, device, num_simulations=n, rng=np.random.default_rng(0))
+        assert result["action"] in g.get_legal_actions()
+        assert result["evaluations"] <= n
+        assert np.isclose(result["policy"].sum(), 1.0)
+        assert result["actions"] == g.get_legal_actions()
+
+
+def test_gumbel_search_finds_mate_in_one():
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    g.board = [[None] * 8 for _ in range(8)]
+    g.board[0][0] = board.Piece('K', 'black')
+    g.board[2][1] = board.Piece('K', 'white')
+    g.board[1][7] = board.Piece('Q', 'white')
+    result = gumbel_root_search(g, _model(), torch.device('cpu'), num_simulations=64,
+                                max_considered=64, sample=False)
+    assert child_position(g, result["action"]).winner == 'white'
+    best = int(np.argmax(result["policy"]))
+    assert child_position(g, result["actions"][best]).winner == 'white'
+
+
+def test_batch_values_skip_the_policy_head():
+    model = _model()
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    games = [child_position(g, a) for a in g.get_legal_actions()[:3]]
+    with torch.no_grad():
+        _, expected = model(torch.from_numpy(np.stack([c.encode_board_state() for c in games])))
+
+    def no_forward(*args):
+        raise AssertionError("the full forward ran")
+
+    model.forward = no_forward
+    values = _batch_values(model, torch.device('cpu'), games)
+    assert np.allclose(values, expected.reshape(-1).numpy(), atol=1e-6)
+
+
+def test_selfplay_stores_improved_policy_targets():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        generate_selfplay_data(num_games=1, model=_model(), device=torch.device('cpu'),
+                               data_path=data_path, max_moves=4, gumbel_simulations=4)
+        data = np.load(data_path)
+        policies = data['policy_targets']
+        assert np.allclose(policies.sum(axis=1), 1.0, atol=1e-4)
+        # Not the uniform distribution over legal actions.
+        assert any(len(np.unique(p[p > 0])) > 1 for p in policies)
+        data.close()
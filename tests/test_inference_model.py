@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+import torch
+
+from training.model import ChessNet
+from training.inference_model import (
+    build_inference_model,
+    check_inference_model,
+    export_inference_model,
+    inference_path,
+    load_inference_model,
+)
+
+
+def _model_with_nontrivial_bn():
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    for module in model.modules():
+        if isinstance(module, torch.nn.BatchNorm2d):
+            module.running_mean.uniform_(-1, 1)
+            module.running_var.uniform_(0.5, 2.0)
+            module.weight.data.uniform_(0.5, 1.5)
+            module.bias.data.uniform_(-0.5, 0.5)
+    model.train(False)
+    return model
+
+
+def test_folded_model_matches_eager():
+    """BN folding + channels_last + scripting preserves outputs."""
+    model = _model_with_nontrivial_bn()
+    inference_model = build_inference_model(model)
+    assert check_inference_model(model, inference_model, atol=1e-4) <= 1e-4
+
+
+def test_fused_model_has_no_batchnorm_or_dropout():
+    model = _model_with_nontrivial_bn()
+    fused = build_inference_model(model, script=False)
+    kinds = {type(m) for m in fused.modules()}
+    assert torch.nn.BatchNorm2d not in kinds
+    assert torch.nn.Dropout not in kinds
+
+
+def test_export_and_load_round_trip():
+    model = _model_with_nontrivial_bn()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        checkpoint_path = os.path.join(tmpdir, 'chess_model_checkpoint.pt')
+        torch.save({'iteration': 0, 'model_state_dict': model.state_dict()}, checkpoint_path)
+
+        # Loading exports the artifact next to the checkpoint on first use.
+        loaded = load_inference_model(checkpoint_path, torch.device('cpu'))
+        assert loaded is not None
+        assert os.path.exists(inference_path(checkpoint_path))
+
+        x = torch.randn(3, 13, 8, 8)
+        with torch.no_grad():
+            p, v = loaded(x)
+            ref_p, ref_v = model(x)
+        assert torch.allclose(p, ref_p, atol=1e-4)
+        assert torch.allclose(v, ref_v, atol=1e-4)
+
+        assert export_inference_model(checkpoint_path) == inference_path(checkpoint_path)
+
+
+def test_load_inference_model_missing_checkpoint():
+    assert load_inference_model('/nonexistent/checkpoint.pt', torch.device('cpu')) is None
+
+
+def test_scripted_model_keeps_legal_policy():
+    model = _model_with_nontrivial_bn()
+    inference_model = build_inference_model(model)
+    x = torch.randn(1, 13, 8, 8)
+    indices = torch.tensor([3, 4096, 5000])
+    with torch.no_grad():
+        legal_logits, _ = inference_model.legal_policy(x, indices)
+        ref_logits, _ = model(x)
+    assert torch.allclose(legal_logits, ref_logits[:, indices], atol=1e-4)
@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from training.model import ChessNet
+from training.inference_server import InferenceServer, InferenceClient
+
+
+def test_client_matches_local_model():
+    """Logits and value served by the server match a local forward pass."""
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+
+    with InferenceServer(model.state_dict(), num_slots=2) as server:
+        client = InferenceClient(server.handle())
+        try:
+            x = torch.randn(1, 13, 8, 8)
+            logits, value = client(x)
+            with torch.no_grad():
+                ref_logits, ref_value = model(x)
+            assert logits.shape == (1, 8513)
+            assert value.shape == (1, 1)
+            assert torch.allclose(logits, ref_logits, atol=1e-5)
+            assert torch.allclose(value, ref_value, atol=1e-5)
+        finally:
+            client.close()
+    requests, batches, _ = server.stats()
+    assert requests == 1
+    assert batches == 1
+
+
+def test_parallel_selfplay_with_inference_server():
+    """Model-guided parallel selfplay works through the shared server."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        from training.selfplay import generate_selfplay_data
+        model = ChessNet(num_channels=13, policy_size=8513)
+        generate_selfplay_data(
+            num_games=2, model=model, device=torch.device("cpu"),
+            data_path=data_path, num_workers=2, max_moves=20,
+            inference_server=True,
+        )
+        data = np.load(data_path)
+        assert data['states'].shape[0] > 0
+        data.close()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from src.game import Game
+from training.model import ChessNet
+from training.nnue import NNUE, NNUEEvaluator, benchmark_nnue, distill_nnue
+
+
+def test_incremental_accumulator_matches_full_evaluation():
+    """Accumulator updates track moves, captures, purchases and gold exactly."""
+    torch.manual_seed(0)
+    model = NNUE()
+    model.train(False)
+    ev = NNUEEvaluator(model)
+
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    ev.refresh(g.board)
+    start = ev.accumulator.copy()
+    seen = set()
+    for _ in range(300):
+        if g.is_game_over():
+            break
+        action = g.get_random_move()
+        seen.add(action[0])
+        ev.make_move(g, action, simulate=False)
+
+        with torch.no_grad():
+            x = torch.from_numpy(g.encode_board_state()).unsqueeze(0)
+            expected_acc = model.ft(torch.flatten(x, 1))[0].numpy()
+            expected_value = model(x).item()
+        assert np.allclose(ev.accumulator, expected_acc, atol=1e-4)
+        assert abs(ev.evaluate() - expected_value) < 1e-4
+    assert {"move", "collect_gold"} <= seen
+
+    while ev._stack:
+        ev.undo()
+    assert np.array_equal(ev.accumulator, start)
+
+
+def test_distill_nnue_saves_loadable_evaluator():
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    states = []
+    for _ in range(64):
+        if g.is_game_over():
+            g.new_game()
+        states.append(g.encode_board_state())
+        g.apply_move(g.get_random_move())
+
+    torch.manual_seed(0)
+    teacher = ChessNet(num_channels=13, policy_size=8513)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        output_path = os.path.join(tmpdir, 'nnue.pt')
+        np.savez(data_path, states=np.array(states), policy_targets=np.zeros((64, 8513), np.float32),
+                 value_targets=np.zeros((64, 1), np.float32))
+        model, report = distill_nnue(data_path, output_path=output_path, teacher=teacher, epochs=30)
+        assert report["val_mse"] < report["teacher_value_var"] + 1e-3
+
+        ev = NNUEEvaluator.load(output_path)
+        g.new_game()
+        ev.refresh(g.board)
+        x = torch.from_numpy(g.encode_board_state()).unsqueeze(0)
+        with torch.no_grad():
+            assert abs(ev.evaluate() - model(x).item()) < 1e-4
+
+        bench = benchmark_nnue(ev, g, num_moves=20)
+        assert bench["incremental_evals_per_s"] > bench["refresh_evals_per_s"]
@@ -0,0 +1,57 @@
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from src.ai import AI
+from src.game import Game
+from training.opening_book import OpeningBook, build_book, build_book_from_replay
+from training.search import child_position
+from training.selfplay import generate_selfplay_data
+
+
+def test_book_scores_moves_by_the_positions_they_lead_to():
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    actions = g.get_legal_actions()
+    good = child_position(g, actions[0]).encode_board_state()
+    bad = child_position(g, actions[1]).encode_board_state()
+    # Results are stored for the side to move after the book move.
+    book = build_book([good, good, good, bad, bad, g.encode_board_state()],
+                      [-1.0, -1.0, 0.0, 1.0, 1.0, 0.0], min_visits=2)
+    assert len(book) == 2
+
+    found = {a: (visits, score) for a, visits, score in book.candidates(g)}
+    assert found[actions[0]][0] == 3 and np.isclose(found[actions[0]][1], 2 / 3)
+    assert found[actions[1]] == (2, -1.0)
+    assert book.probe(g) == actions[0]
+    assert book.probe(g, sample=True, rng=np.random.default_rng(0)) == actions[0]
+
+    g.apply_move(actions[2])
+    assert book.probe(g) is None
+
+
+def test_book_from_selfplay_is_probed_by_ai_and_selfplay():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        book_path = os.path.join(tmpdir, 'opening_book.npz')
+        generate_selfplay_data(num_games=6, model=None, device=None, data_path=data_path, max_moves=6)
+        book = build_book_from_replay(data_path, book_path, min_visits=2)
+        assert len(book) > 0
+        loaded = OpeningBook.load(book_path)
+        assert np.array_equal(loaded.keys, book.keys)
+
+        ai = AI(os.path.join(tmpdir, 'missing.pt'), torch.device('cpu'), book_path=book_path)
+        g = Game(screen=None, headless=True)
+        g.new_game()
+        g.ai_color = 'white'
+        move = ai.get_move(g)
+        assert move in g.get_legal_actions()
+        assert ai.book.hits == 1
+        g.move_log = ["e4"] * ai.book_plies  # Past the opening: no probe
+        ai.get_move(g)
+        assert ai.book.hits + ai.book.misses == 1
+
+        generate_selfplay_data(num_games=2, model=None, device=None, data_path=data_path,
+                               num_workers=2, max_moves=6, opening_book=book_path)
@@ -0,0 +1,89 @@
+import copy
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from src.game import Game
+from training.model import ChessNet
+from training.quantize import build_quantized_model, compare_quantized
+
+
+def _positions(n=24):
+    """Encoded states and uniform legal-move targets from a random game."""
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    states, policies = [], []
+    while len(states) < n:
+        if g.is_game_over():
+            g.new_game()
+        state, policy, _ = g.get_training_example()
+        states.append(state)
+        policies.append(policy)
+        g.apply_move(g.get_random_move())
+    return np.array(states), np.array(policies)
+
+
+def test_dynamic_quantized_model_tracks_float_model():
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+    states, policies = _positions()
+
+    quantized = build_quantized_model(model, "dynamic")
+    report = compare_quantized(model, quantized, states, policies, latency_samples=4)
+    assert report["samples"] == len(states)
+    assert report["max_value_abs_err"] < 0.1
+    assert report["mean_policy_kl"] < 0.05
+    assert report["quantized_ms"] > 0
+
+
+def test_dynamic_quantized_policy_from_trunk_takes_legal_indices():
+    torch.manual_seed(0)
+    quantized = build_quantized_model(ChessNet(num_channels=13, policy_size=8513), "dynamic")
+    states, _ = _positions()
+    x = torch.from_numpy(states[:2])
+    legal = torch.tensor([0, 17, 4096, 8512])
+    with torch.no_grad():
+        full, _ = quantized(x)
+        _, trunk = quantized.value_and_trunk(x)
+        assert torch.equal(quantized.policy_from_trunk(trunk, legal), full[:, legal])
+    assert quantized.legal_policy is None
+    assert copy.deepcopy(quantized).policy_from_trunk(trunk, legal).shape == (2, 4)
+
+
+def test_static_quantized_model_runs():
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+    states, _ = _positions()
+    quantized = build_quantized_model(model, "static", calibration_states=states)
+    with torch.no_grad():
+        p, v = quantized(torch.from_numpy(states[:2]))
+    assert p.shape == (2, 8513)
+    assert v.shape == (2, 1)
+
+
+def test_parallel_selfplay_with_quantized_workers():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        from training.selfplay import generate_selfplay_data
+        generate_selfplay_data(
+            num_games=2, model=ChessNet(num_channels=13, policy_size=8513),
+            device=torch.device("cpu"), data_path=data_path, num_workers=2,
+            max_moves=10, quantize="dynamic",
+        )
+        data = np.load(data_path)
+        assert data['states'].shape[0] > 0
+        data.close()
+
+
+def test_lockstep_selfplay_with_a_dynamic_quantized_model():
+    from training.selfplay import _play_games
+    torch.manual_seed(0)
+    quantized = build_quantized_model(ChessNet(num_channels=13, policy_size=8513), "dynamic")
+    arrays, records = _play_games(2, 6, 0, quantized, torch.device("cpu"), None, None, 0.0, None, 8,
+                                  None, 0, batch_eval=True, lockstep_games=2)
+    assert len(records) == 2
+    assert arrays[0].shape[0] == sum(r["plies"] for r in records)
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+
+from training.action_space import COMPACT_POLICY_SIZE, LEGACY_POLICY_SIZE, convert_policy
+from training.replay_store import ReplayWriter
+
+
+def _examples(rng, count, policy_size=LEGACY_POLICY_SIZE):
+    return (
+        rng.random((count, 13, 8, 8), dtype=np.float32),
+        rng.random((count, policy_size), dtype=np.float32),
+        rng.choice([-1.0, 0.0, 1.0], size=count).astype(np.float32),
+    )
+
+
+def test_appends_stream_into_a_trimmed_buffer(tmp_path):
+    rng = np.random.default_rng(0)
+    data_path = str(tmp_path / "training_data.npz")
+    old = _examples(rng, 7)
+    np.savez(data_path, states=old[0], policy_targets=old[1], value_targets=old[2].reshape(-1, 1))
+
+    writer = ReplayWriter(data_path, max_buffer_size=12, chunk_bytes=3 * 4 * LEGACY_POLICY_SIZE)
+    games = [_examples(rng, n) for n in (4, 1, 5)]
+    for game in games:
+        writer.append(*game)
+    assert writer.pending_rows == 10
+    assert writer.commit() == 12
+    assert not os.path.exists(writer.spool_dir)
+
+    expected = [np.concatenate([old[i]] + [g[i] for g in games])[-12:] for i in range(3)]
+    with np.load(data_path) as data:
+        assert np.array_equal(data["states"], expected[0])
+        assert np.array_equal(data["policy_targets"], expected[1])
+        assert np.array_equal(data["value_targets"], expected[2].reshape(-1, 1))
+
+
+def test_spooled_games_survive_a_crash_and_follow_the_model_action_space(tmp_path):
+    rng = np.random.default_rng(1)
+    data_path = str(tmp_path / "training_data.npz")
+    game = _examples(rng, 3)
+    ReplayWriter(data_path).append(*game)  # Never committed
+
+    writer = ReplayWriter(data_path, policy_size=COMPACT_POLICY_SIZE)
+    assert writer.pending_rows == 3
+    writer.append(*_examples(rng, 2))
+    assert writer.commit() == 5
+    with np.load(data_path) as data:
+        assert data["policy_targets"].shape == (5, COMPACT_POLICY_SIZE)
+        assert np.array_equal(data["policy_targets"][:3], convert_policy(game[1], COMPACT_POLICY_SIZE))
+
+
+def test_recovery_drops_a_torn_write(tmp_path):
+    rng = np.random.default_rng(2)
+    data_path = str(tmp_path / "training_data.npz")
+    game = _examples(rng, 2)
+    writer = ReplayWriter(data_path)
+    writer.append(*game)
+    # A crash in the middle of the next append: one state and a half written.
+    with open(writer._spool_path("states"), "ab") as f:
+        f.write(b"\x00" * (4 * 13 * 8 * 8 * 3 // 2))
+
+    writer = ReplayWriter(data_path)
+    assert writer.pending_rows == 2
+    later = _examples(rng, 3)
+    writer.append(*later)
+    assert writer.commit() == 5
+    with np.load(data_path) as data:
+        for i, name in enumerate(("states", "policy_targets", "value_targets")):
+            expected = np.concatenate([game[i], later[i]]).reshape(data[name].shape)
+            assert np.array_equal(data[name], expected)
@@ -0,0 +1,101 @@
+import multiprocessing
+
+import torch
+
+from src import board
+from src.game import Game
+from training.lazy_smp import lazy_smp_search
+from training.model import ChessNet
+from training.nnue import NNUE, NNUEEvaluator
+from training.search import AlphaBetaSearch, compare_search, fixed_positions
+from training.transposition import EXACT, LOWER, TranspositionTable, position_hash
+
+
+def test_material_search_takes_a_free_rook():
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    g.board[4][4] = board.Piece('Q', 'white')
+    g.board[4][0] = board.Piece('R', 'black')
+    for depth in (1, 2):
+        result = AlphaBetaSearch().search(g, depth)
+        assert result["best_action"] == ("move", (4, 4), (4, 0), None)
+        assert result["score"] > 0
+        assert [d for d, _, _, _, _ in result["per_depth"]] == list(range(1, depth + 1))
+
+
+def test_policy_guided_search_prunes_nodes():
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513, policy_head="conv")
+    model.train(False)
+    positions = fixed_positions(count=2)
+    rows = compare_search(positions, model, depth=3, prune_mass=0.5)
+    assert len(rows) == 2 * len(positions)
+    for unguided, guided in zip(rows[::2], rows[1::2]):
+        assert unguided["mode"] == "unguided" and guided["mode"] == "guided"
+        assert guided["pruned"] > 0
+        assert guided["nodes"] < unguided["nodes"]
+        assert guided["best_action"] in positions[guided["position"]].get_legal_actions()
+        assert len(guided["time_to_depth"]) == 3
+
+
+def test_nnue_evaluator_follows_the_search_path():
+    torch.manual_seed(0)
+    nnue = NNUE()
+    nnue.train(False)
+    model = ChessNet(num_channels=13, policy_size=8513, policy_head="conv")
+    model.train(False)
+    evaluator = NNUEEvaluator(nnue)
+    errors = []
+
+    def full_value(game):
+        with torch.no_grad():
+            value = nnue(torch.from_numpy(game.encode_board_state()).unsqueeze(0)).item()
+        errors.append(abs(evaluator.evaluate() - value))
+        return value
+
+    for game in fixed_positions(count=2):
+        # Unguided, and guided with the root's children built in a batch.
+        for prior in (None, model):
+            checked = AlphaBetaSearch(prior, evaluator=evaluator, value_fn=full_value,
+                                      prune_mass=0.5).search(game, 3)
+            assert not evaluator._stack
+            incremental = AlphaBetaSearch(prior, evaluator=evaluator, prune_mass=0.5).search(game, 3)
+            assert abs(incremental["score"] - checked["score"]) < 1e-4
+    assert errors and max(errors) < 1e-4
+
+
+def _store_entry(name, num_entries, key):
+    table = TranspositionTable.attach(name, num_entries)
+    table.store(key, 3, LOWER, 4097, -9.5)
+    table.close()
+
+
+def test_transposition_table_is_shared_between_processes():
+    table = TranspositionTable(1024)
+    try:
+        key = (1 << 63) + 12345
+        p = multiprocessing.Process(target=_store_entry, args=(table.name, 1024, key))
+        p.start()
+        p.join()
+        assert table.probe(key) == (3, LOWER, 4097, -9.5)
+        assert table.probe(key + 1024) is None  # same slot, different position
+
+        table.store(key, 2, EXACT, None, 0.25)  # shallower result does not replace
+        assert table.probe(key)[0] == 3
+        table._entries[key % 1024][1] ^= 1  # a torn write reads as a miss
+        assert table.probe(key) is None
+    finally:
+        table.close()
+        table.unlink()
+
+
+def test_lazy_smp_search_agrees_with_single_process():
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    g.board[4][4] = board.Piece('Q', 'white')
+    g.board[4][0] = board.Piece('R', 'black')
+    single = AlphaBetaSearch().search(g, 3)
+    shared = lazy_smp_search(g, 3, num_processes=3)
+    assert shared["best_action"] == single["best_action"] == ("move", (4, 4), (4, 0), None)
+    assert shared["table_hit_rate"] > 0
+    assert position_hash(g) == position_hash(g.copy_for_simulation())
@@ -0,0 +1,78 @@
+import os
+import random
+
+import numpy as np
+import torch
+
+from training.model import ChessNet
+from training.seeding import GameRNG, game_seed, seed_everything
+from training.selfplay import _play_games, generate_selfplay_data
+
+
+def test_game_rng_is_isolated_from_the_caller():
+    random.seed(1)
+    expected = random.random()
+    random.seed(1)
+    rng = GameRNG(game_seed(7, 0, 3))
+    with rng:
+        first = (random.random(), rng.numpy.random(), torch.rand(1).item())
+    assert random.random() == expected
+    with GameRNG(game_seed(7, 0, 3)) as again:
+        assert (random.random(), again.numpy.random(), torch.rand(1).item()) == first
+    assert game_seed(7, 0, 3) != game_seed(7, 1, 3) != game_seed(7, 0, 4)
+
+
+def test_seeded_games_do_not_depend_on_lockstep_interleaving():
+    seeds = [game_seed(0, 0, i) for i in range(4)]
+    alone, alone_records = _play_games(4, 12, 0, None, None, None, None, 0.0, None, 8, None, 0,
+                                       batch_eval=True, seeds=seeds)
+    together, _ = _play_games(4, 12, 0, None, None, None, None, 0.0, None, 8, None, 0,
+                              batch_eval=True, lockstep_games=4, seeds=seeds)
+    # Lockstep games finish in a different order; compare them as sets of games.
+    assert sorted(map(bytes, alone[0])) == sorted(map(bytes, together[0]))
+    assert len(alone_records) == 4
+
+
+def test_same_seed_reproduces_the_buffer_for_any_worker_count(tmp_path):
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    buffers = []
+    for run, (workers, seed) in enumerate([(1, 123), (2, 123), (2, 124)]):
+        data_path = os.path.join(tmp_path, f"run{run}.npz")
+        generate_selfplay_data(num_games=4, model=model, device=torch.device("cpu"), data_path=data_path,
+                               max_moves=10, num_workers=workers, lockstep_games=2, seed=seed)
+        with np.load(data_path) as data:
+            buffers.append({name: data[name] for name in data.files})
+    for name in buffers[0]:
+        assert np.array_equal(buffers[0][name], buffers[1][name])
+    assert not np.array_equal(buffers[0]["states"], buffers[2]["states"])
+
+
+def test_sequential_seeded_games_leave_the_global_rngs_alone(tmp_path):
+    def draws():
+        return random.random(), np.random.random(), torch.rand(1).item()
+
+    seed_everything(5)
+    expected = draws()
+    seed_everything(5)
+    buffers = []
+    for run in range(2):
+        data_path = os.path.join(tmp_path, f"run{run}.npz")
+        generate_selfplay_data(num_games=2, model=None, device=None, data_path=data_path, max_moves=10,
+                               seed=3)
+        with np.load(data_path) as data:
+            buffers.append(data["states"])
+    assert draws() == expected
+    assert np.array_equal(buffers[0], buffers[1])
+
+
+def test_sequential_and_parallel_seeded_random_games_match(tmp_path):
+    buffers = []
+    for workers in (0, 2):
+        data_path = os.path.join(tmp_path, f"workers{workers}.npz")
+        generate_selfplay_data(num_games=4, model=None, device=None, data_path=data_path, max_moves=10,
+                               num_workers=workers, lockstep_games=2, seed=9)
+        with np.load(data_path) as data:
+            buffers.append({name: data[name] for name in data.files})
+    for name in buffers[0]:
+        assert np.array_equal(buffers[0][name], buffers[1][name])
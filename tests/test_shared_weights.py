@@ -0,0 +1,37 @@
+import os
+import pickle
+
+import torch
+
+from training.inference_model import build_inference_model
+from training.model import ChessNet
+from training.shared_weights import SharedWeights, build_model, load_state_dict
+
+
+def test_published_weights_rebuild_the_same_model():
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513, policy_head="conv")
+    model.train(False)
+    x = torch.rand(2, 13, 8, 8)
+    shared = SharedWeights()
+    try:
+        handle = shared.publish(model)
+        # Workers receive the handle, not the tensors.
+        assert len(pickle.dumps(handle)) < 10_000
+        with torch.no_grad():
+            expected = build_inference_model(model)(x)
+            for got in (build_model(handle)(x), build_model(handle, script=False)(x)):
+                assert torch.allclose(got[0], expected[0], atol=1e-5)
+                assert torch.allclose(got[1], expected[1], atol=1e-5)
+
+        state = load_state_dict(handle)
+        conv = next(t for t in state.values() if t.dim() == 4)
+        assert conv.is_contiguous(memory_format=torch.channels_last)
+
+        unfused = shared.publish(model, fused=False)
+        assert unfused.version == 2 and not os.path.exists(handle.path)
+        with torch.no_grad():
+            assert torch.allclose(build_model(unfused)(x)[0], model(x)[0], atol=1e-5)
+    finally:
+        shared.close()
+    assert not os.path.exists(shared.directory)
@@ -0,0 +1,91 @@
+import os
+import random
+import tempfile
+
+import torch
+
+from src.ai import AI
+from src import board
+from src.game import Game
+from training.tablebase import (
+    DRAW,
+    UNKNOWN,
+    Tablebases,
+    adjudicate,
+    game_pieces,
+    generate_tablebases,
+    legal_actions,
+    load_tablebases,
+    mirror,
+    terminal_result,
+)
+from training.search import child_position
+
+
+def test_rules_match_game():
+    """The tablebase move generator agrees with Game on random positions with gold."""
+    random.seed(3)
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    checked = 0
+    for _ in range(120):
+        if g.is_game_over():
+            g.new_game()
+        if g.en_passant is None:
+            pieces = game_pieces(g)
+            actions = dict(legal_actions(pieces, g.turn))
+            assert set(actions) == set(g.get_legal_actions())
+            flipped, stm = mirror(pieces, g.turn)
+            assert len(legal_actions(flipped, stm)) == len(actions)
+            for action, child in actions.items():
+                after = child_position(g, action)
+                assert sorted(game_pieces(after)) == sorted(child)
+                result = terminal_result(child, after.turn)
+                if after.winner == "draw" and after.halfmove_clock < 100:
+                    assert result == DRAW or max(after.position_history.values()) >= 3
+                elif after.game_over:
+                    assert result is not None and after.winner == g.turn
+                else:
+                    assert result is None
+            checked += 1
+        # Favour purchases so positions grow pieces and gold.
+        actions = g.get_legal_actions()
+        purchases = [a for a in actions if a[0] == "purchase"]
+        g.apply_move(random.choice(purchases if purchases and random.random() < 0.5 else actions))
+    assert checked > 50
+
+
+def test_two_king_table_with_gold():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        generate_tablebases(configs=("KvK",), gold_cap=1, directory=tmpdir)
+        assert os.path.exists(os.path.join(tmpdir, "KvK.g1.npy"))
+        tablebases = load_tablebases(tmpdir)
+        assert isinstance(tablebases, Tablebases)
+
+        def pieces(white_gold, black_gold):
+            return (('white', 'K', 60, white_gold), ('black', 'K', 4, black_gold))
+
+        # No gold anywhere: insufficient material.
+        assert tablebases.probe_pieces(pieces(0, 0), 'white') == (DRAW, 0)
+        # A king with gold can buy a piece, which leaves the table.
+        assert tablebases.probe_pieces(pieces(1, 0), 'white')[0] == UNKNOWN
+        assert tablebases.probe_pieces(pieces(0, 1), 'white')[0] == UNKNOWN
+        assert tablebases.probe_pieces(pieces(2, 0), 'white') is None  # Above the cap
+
+        g = Game(screen=None, headless=True)
+        g.new_game()
+        g.board[6][4] = g.board[1][4] = None
+        g.board[7][4].gold = 1
+        assert tablebases.probe(g) is None
+        assert tablebases.best_move(g) is None
+        g.board[7][4].gold = 0
+        assert tablebases.best_move(g) in g.get_legal_actions()
+        assert adjudicate(g, tablebases) and g.winner == "draw"
+
+        g.new_game()
+        g.board[6][4] = g.board[1][4] = None
+        g.board[0][0] = board.Piece('R', 'black')
+        assert tablebases.probe(g) is None  # No KvR table
+
+        ai = AI(os.path.join(tmpdir, 'missing.pt'), torch.device('cpu'), tablebase_dir=tmpdir)
+        assert ai.tablebases is not None
@@ -174,6 +174,110 @@ def test_parallel_selfplay_generates_data():
         data.close()
 
 
+def test_selfplay_pool_reuses_workers_across_calls():
+    """A SelfPlayPool keeps its processes and only reloads weights on a new version."""
+    import tempfile
+    import torch
+    from training.model import ChessNet
+    from training.selfplay import SelfPlayPool, generate_selfplay_data
+    model = ChessNet(num_channels=13, policy_size=8513)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        with SelfPlayPool(num_workers=2) as pool:
+            generate_selfplay_data(num_games=2, model=model, device=torch.device('cpu'),
+                                   data_path=data_path, max_moves=4, pool=pool)
+            assert pool.version == 1 and os.path.exists(pool.weights.path)
+            args = {"max_moves": 4, "iteration": 0, "quantize": None, "calibration_path": None,
+                    "stockfish_ratio": 0.0, "stockfish_depth": 1, "opening_book": None,
+                    "book_plies": 8, "tablebase_dir": None, "gumbel_simulations": 0,
+                    "adjudication": None, "lockstep_games": 1, "seed": None}
+            first, schedule = pool.run(2, args)
+            assert schedule["tasks"] == 2 and 0.0 <= schedule["utilization"] <= 1.0
+            pool.update_model(model)
+            assert pool.version == 2
+            second, _ = pool.run(2, args)
+            pids = {pid for pid, _, _ in first + second}
+            assert len(pids) <= 2
+            assert any(tasks > 1 for _, tasks, _ in second)
+            assert all(result is not None for _, _, result in first + second)
+        assert pool.weights is None
+        data = np.load(data_path)
+        assert data['states'].shape[0] > 0
+        data.close()
+
+
+def test_schedule_report_measures_idle_and_straggler_time():
+    from training.selfplay import schedule_report
+    # Worker 1 plays three short games, worker 2 one long game.
+    timings = [(1, 0.0, 1.0), (1, 1.0, 2.0), (1, 2.0, 3.0), (2, 0.0, 10.0)]
+    report = schedule_report(timings, num_workers=2, started=0.0, finished=10.0)
+    assert report["busy"] == 13.0
+    assert report["idle"] == 7.0
+    assert report["tail"] == 7.0
+    assert report["utilization"] == 0.65
+    # A third worker that never got a game idles for the whole run.
+    report = schedule_report(timings, num_workers=3, started=0.0, finished=10.0)
+    assert report["idle"] == 17.0 and report["tail"] == 10.0
+
+
+def test_lockstep_selfplay_batches_evaluations():
+    """Games played side by side finish independently and share batched forward passes."""
+    import torch
+    from training.model import ChessNet
+    from training.eval_cache import EvalCache
+    from training.selfplay import _play_games
+    model = ChessNet(num_channels=13, policy_size=8513)
+    cache = EvalCache()
+    arrays, records = _play_games(5, 6, 0, model, torch.device('cpu'), cache, None, 0.0, None, 8,
+                                  None, 0, batch_eval=True, lockstep_games=3)
+    states, policies, values = arrays
+    assert len(records) == 5 and all(r["plies"] <= 6 for r in records)
+    assert states.shape[0] == sum(r["plies"] for r in records) == policies.shape[0] == len(values)
+    assert np.allclose(policies.sum(axis=1), 1.0)
+    # Moves were sampled from the batched evaluations in the cache.
+    assert cache.stats()["hits"] > 0
+
+
+def test_interrupted_sequential_selfplay_keeps_finished_games():
+    """Games finished before check_interruption fires are saved; the one in progress is dropped."""
+    import tempfile
+    from training.selfplay import generate_selfplay_data
+    polls = []
+
+    def interrupt():
+        polls.append(None)
+        return len(polls) > 15
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_path = os.path.join(tmpdir, 'training_data.npz')
+        generate_selfplay_data(num_games=5, model=None, device=None, data_path=data_path,
+                               max_moves=6, check_interruption=interrupt, seed=0)
+        with np.load(data_path) as data:
+            assert data['states'].shape[0] == 12  # Two full games of 6 plies
+
+
+def test_train_step_matches_the_training_loss():
+    """train_step returns the policy cross-entropy plus value MSE and steps the optimizer."""
+    import torch
+    from training.model import ChessNet
+    from training.train import train_step
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)  # No dropout, so the loss can be recomputed
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    states = torch.rand(4, 13, 8, 8)
+    policies = torch.softmax(torch.rand(4, 8513), dim=1)
+    values = torch.rand(4, 1) * 2 - 1
+    with torch.no_grad():
+        policy_pred, value_pred = model(states)
+        expected = (-torch.sum(policies * torch.log_softmax(policy_pred, dim=1)) / 4
+                    + torch.nn.functional.mse_loss(value_pred, values)).item()
+    before = model.value_fc2.weight.detach().clone()
+    loss = train_step(model, optimizer, states, policies, values, torch.device('cpu'))
+    assert abs(loss - expected) < 1e-4
+    assert not torch.equal(model.value_fc2.weight, before)
+
+
 def test_full_pipeline_with_improvements():
     """Smoke test: selfplay with replay buffer -> augmented dataset -> residual model training."""
     import tempfile
@@ -249,3 +353,100 @@ def test_parallel_selfplay_matches_sequential():
 
         seq.close()
         par.close()
+
+
+def test_legal_policy_matches_full_forward():
+    """legal_policy() returns exactly the full logits at the requested indices."""
+    from training.model import ChessNet
+    import torch
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+    x = torch.randn(1, 13, 8, 8)
+    indices = torch.tensor([0, 17, 4096, 4100, 8512])
+    with torch.no_grad():
+        logits, value = model(x)
+        legal_logits, legal_value = model.legal_policy(x, indices)
+    assert legal_logits.shape == (1, 5)
+    assert torch.allclose(legal_logits, logits[:, indices], atol=1e-5)
+    assert torch.allclose(legal_value, value)
+
+
+def test_value_only_and_trunk_cache_match_forward():
+    """Value-only and trunk-caching entry points agree with forward()."""
+    from training.model import ChessNet
+    import torch
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+    x = torch.randn(3, 13, 8, 8)
+    indices = torch.tensor([5, 4096, 6000])
+    with torch.no_grad():
+        logits, value = model(x)
+        assert torch.allclose(model.value_only(x), value)
+        trunk_value, h = model.value_and_trunk(x)
+        assert torch.allclose(trunk_value, value)
+        assert torch.allclose(model.policy_from_trunk(h), logits, atol=1e-5)
+        assert torch.allclose(model.policy_from_trunk(h, indices), logits[:, indices], atol=1e-5)
+
+
+def test_game_evaluate_value_matches_model():
+    from training.model import ChessNet
+    import torch
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    x = torch.tensor(g.encode_board_state()).unsqueeze(0)
+    with torch.no_grad():
+        _, value = model(x)
+    assert abs(g.evaluate_value(model, torch.device('cpu')) - value.item()) < 1e-6
+
+
+def test_conv_policy_head_covers_every_legal_action():
+    """The factorized head has a real output for every action a game produces."""
+    from training.model import NUM_POLICY_PLANES, policy_gather_index
+    gather = policy_gather_index()
+    unreachable = NUM_POLICY_PLANES * 64 + 1
+    assert gather.shape == (8513,)
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    for _ in range(200):
+        if g.is_game_over():
+            g.new_game()
+        for action in g.get_legal_actions():
+            idx = g.move_to_index(action[0], action[1], action[2], action[3])
+            assert gather[idx].item() != unreachable
+        g.apply_move(g.get_random_move())
+
+
+def test_conv_policy_head_checkpoint_round_trip(tmp_path):
+    """A conv-head checkpoint records its head type and loads through AI."""
+    from training.model import ChessNet
+    from src.ai import AI
+    import torch
+    torch.manual_seed(0)
+    model = ChessNet(num_channels=13, policy_size=8513, policy_head="conv")
+    model.train(False)
+    assert sum(p.numel() for p in model.parameters()) < 2_000_000
+    path = str(tmp_path / "conv_checkpoint.pt")
+    torch.save({'iteration': 0, 'model_state_dict': model.state_dict(),
+                'model_config': model.config}, path)
+
+    ai = AI(path, torch.device('cpu'))
+    assert ai.model.config["policy_head"] == "conv"
+    assert ai.inference_model is not None
+
+    x = torch.randn(2, 13, 8, 8)
+    indices = torch.tensor([0, 17, 4096, 4100, 8512])
+    with torch.no_grad():
+        logits, value = model(x)
+        legal_logits, legal_value = ai.inference_model.legal_policy(x, indices)
+    assert logits.shape == (2, 8513)
+    assert torch.allclose(legal_logits, logits[:, indices], atol=1e-4)
+    assert torch.allclose(legal_value, value, atol=1e-4)
+
+    g = Game(screen=None, headless=True)
+    g.new_game()
+    assert g.get_model_move(ai.get_eval_model(), torch.device('cpu'), sample=False) in g.get_legal_actions()
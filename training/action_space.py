@@ -0,0 +1,144 @@
+"""Flat action index spaces for the policy.
+
+The legacy space is the one Game.move_to_index produces (8513 slots):
+
+    [0, 4095]     move           (sr*8+sc)*64 + (dr*8+dc)
+    4096          collect_gold
+    [4097, 4416]  purchase       4097 + type_idx*64 + (dr*8+dc)
+    [4417, 8512]  transfer_gold  4417 + (sr*8+sc)*64 + (dr*8+dc)
+
+Most (src, dst) pairs in the move and transfer blocks can never be legal:
+every move and every gold transfer goes along a queen line or a knight jump.
+The compact space keeps only those reachable pairs (1792 per block), plus
+collect_gold and the purchases, in the same block order -- 3905 slots.
+
+A model uses the compact space when it is built with
+``policy_size=COMPACT_POLICY_SIZE``. Game keeps producing legacy indices and
+translates them for such models; replay data is converted with
+convert_policy() / migrate_replay_data().
+
+Usage:
+    python -m training.action_space [data_path] [output_path]
+"""
+
+import os
+import sys
+
+import numpy as np
+
+BOARD_SIZE = 8
+NUM_PURCHASE_TYPES = 5  # P, N, B, R, Q
+
+_QUEEN_DIRS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+_KNIGHT_JUMPS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+# 8 directions x 7 distances + 8 knight jumps.
+MOVE_OFFSETS = [(dr * d, dc * d) for dr, dc in _QUEEN_DIRS for d in range(1, 8)] + _KNIGHT_JUMPS
+
+LEGACY_POLICY_SIZE = 8513
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_DATA_PATH = os.path.join(_SCRIPT_DIR, '..', 'training_data.npz')
+
+
+def reachable_pairs(board_size=BOARD_SIZE):
+    """Sorted (src, dst) flat square pairs some piece could move between."""
+    pairs = []
+    for sr in range(board_size):
+        for sc in range(board_size):
+            for dr, dc in MOVE_OFFSETS:
+                r, c = sr + dr, sc + dc
+                if 0 <= r < board_size and 0 <= c < board_size:
+                    pairs.append((sr * board_size + sc, r * board_size + c))
+    return sorted(pairs)
+
+
+def build_compact_vocab(board_size=BOARD_SIZE):
+    """Return (compact_to_legacy, legacy_to_compact) index arrays.
+
+    legacy_to_compact holds -1 for legacy slots with no compact equivalent.
+    """
+    squares = board_size * board_size
+    moves = [src * squares + dst for src, dst in reachable_pairs(board_size)]
+    collect_gold = squares * squares
+    purchase_start = collect_gold + 1
+    transfer_start = purchase_start + NUM_PURCHASE_TYPES * squares
+
+    compact_to_legacy = np.array(
+        moves
+        + [collect_gold]
+        + list(range(purchase_start, transfer_start))
+        + [transfer_start + m for m in moves],
+        dtype=np.int64,
+    )
+    legacy_to_compact = np.full(transfer_start + squares * squares, -1, dtype=np.int64)
+    legacy_to_compact[compact_to_legacy] = np.arange(len(compact_to_legacy))
+    return compact_to_legacy, legacy_to_compact
+
+
+COMPACT_TO_LEGACY, LEGACY_TO_COMPACT = build_compact_vocab()
+COMPACT_POLICY_SIZE = len(COMPACT_TO_LEGACY)
+
+
+def compact_flip_map(legacy_flip_map):
+    """Translate a legacy-space index permutation into the compact space."""
+    flipped = LEGACY_TO_COMPACT[np.asarray(legacy_flip_map)[COMPACT_TO_LEGACY]]
+    if (flipped < 0).any():
+        raise ValueError("Permutation maps a reachable action to an unreachable one.")
+    return flipped
+
+
+def legacy_to_compact_indices(indices):
+    """Compact indices for legacy indices; raises on unreachable ones."""
+    compact = LEGACY_TO_COMPACT[np.asarray(indices, dtype=np.int64)]
+    if (compact < 0).any():
+        raise ValueError("Index has no slot in the compact action space.")
+    return compact
+
+
+def convert_policy(policy, policy_size):
+    """Convert policy vectors (last axis) to the space with policy_size slots.
+
+    Going legacy -> compact drops only unreachable slots, which legal-move
+    targets never put probability on.
+    """
+    policy = np.asarray(policy)
+    width = policy.shape[-1]
+    if width == policy_size:
+        return policy
+    if width == LEGACY_POLICY_SIZE and policy_size == COMPACT_POLICY_SIZE:
+        return np.ascontiguousarray(policy[..., COMPACT_TO_LEGACY])
+    if width == COMPACT_POLICY_SIZE and policy_size == LEGACY_POLICY_SIZE:
+        legacy = np.zeros(policy.shape[:-1] + (LEGACY_POLICY_SIZE,), dtype=policy.dtype)
+        legacy[..., COMPACT_TO_LEGACY] = policy
+        return legacy
+    raise ValueError(f"Can't convert {width}-slot policies to {policy_size} slots.")
+
+
+def migrate_replay_data(data_path=None, output_path=None, policy_size=COMPACT_POLICY_SIZE):
+    """Rewrite a replay buffer's policy targets in another action space.
+
+    Writes to output_path (default: in place) and returns it.
+    """
+    if data_path is None:
+        data_path = _DATA_PATH
+    if output_path is None:
+        output_path = data_path
+    data = np.load(data_path)
+    states = data['states']
+    policy_targets = data['policy_targets']
+    value_targets = data['value_targets']
+    data.close()
+
+    old_width = policy_targets.shape[-1]
+    policy_targets = convert_policy(policy_targets, policy_size)
+    np.savez(output_path, states=states, policy_targets=policy_targets, value_targets=value_targets)
+    print(f"Migrated {len(states)} examples from {old_width} to {policy_size} policy slots: {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    migrate_replay_data(
+        data_path=args[0] if len(args) > 0 else None,
+        output_path=args[1] if len(args) > 1 else None,
+    )
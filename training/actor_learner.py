@@ -0,0 +1,274 @@
+"""Asynchronous actor-learner training: self-play and training overlap.
+
+iterative_training alternates: every worker plays, then the model trains
+while the self-play cores sit idle. async_training runs both at once:
+
+- Actors are SelfPlayPool workers (training/selfplay.py), each kept busy
+  with one task of lockstep_games games at a time. Finished games come
+  back to this process, go to the replay store (ReplayWriter) and to the
+  learner's in-memory ReplayWindow of recent examples.
+- The learner is this process. It trains on batches sampled from the
+  window and publishes new weights every publish_steps steps. Workers
+  hot-swap them at their next task, so a game is played with one model
+  throughout.
+- train_ratio is the number of samples trained per sample generated.
+  When the learner is more than ratio_slack samples ahead it waits for
+  games; when it is that far behind, no new games are started.
+- Games played with weights more than max_staleness versions behind the
+  learner's when they arrive are discarded.
+
+The final report gives the actors' utilization (SelfPlayPool's schedule
+report) and the learner's: time training, waiting for games, publishing.
+
+Usage:
+    python -m training.actor_learner [train_steps] [num_workers]
+"""
+
+import os
+import queue
+import sys
+import time
+from collections import deque
+
+import numpy as np
+import torch
+
+from .action_space import COMPACT_POLICY_SIZE, convert_policy
+from .dataset import _COMPACT_FLIP_INDEX_MAP, _FLIP_INDEX_MAP
+from .model import ChessNet, checkpoint_model_config
+from .replay_store import ReplayWriter
+from .selfplay import SelfPlayPool, schedule_report
+from .train import train_step
+
+
+class ReplayWindow:
+    """The most recent max_rows examples, in memory, for sampling training batches."""
+
+    def __init__(self, max_rows, policy_size):
+        self.max_rows = max_rows
+        self.policy_size = policy_size
+        self.flip_map = _COMPACT_FLIP_INDEX_MAP if policy_size == COMPACT_POLICY_SIZE else _FLIP_INDEX_MAP
+        self.chunks = deque()
+        self.rows = 0
+
+    def add(self, states, policies, values):
+        chunk = (np.asarray(states, dtype=np.float32),
+                 convert_policy(np.asarray(policies, dtype=np.float32), self.policy_size),
+                 np.asarray(values, dtype=np.float32).reshape(-1, 1))
+        self.chunks.append(chunk)
+        self.rows += len(chunk[0])
+        while self.rows - len(self.chunks[0][0]) >= self.max_rows:
+            self.rows -= len(self.chunks.popleft()[0])
+
+    def sample(self, batch_size, rng, augment=True):
+        """batch_size random examples; with augment, half of them mirrored as in ChessDataset."""
+        ends = np.cumsum([len(chunk[0]) for chunk in self.chunks])
+        rows = rng.integers(0, ends[-1], size=batch_size)
+        which = np.searchsorted(ends, rows, side="right")
+        offsets = rows - (ends[which] - [len(self.chunks[i][0]) for i in which])
+        states = np.stack([self.chunks[c][0][r] for c, r in zip(which, offsets)])
+        policies = np.stack([self.chunks[c][1][r] for c, r in zip(which, offsets)])
+        values = np.stack([self.chunks[c][2][r] for c, r in zip(which, offsets)])
+        if augment:
+            flip = rng.random(batch_size) < 0.5
+            states[flip] = states[flip][:, :, :, ::-1]
+            policies[flip] = policies[flip][:, self.flip_map]
+        return states, policies, values
+
+
+def async_training(
+    train_steps=10_000,
+    num_workers=16,
+    batch_size=256,
+    publish_steps=100,
+    train_ratio=4.0,
+    ratio_slack=None,
+    max_staleness=2,
+    min_buffer=None,
+    games_per_iter=200,
+    lockstep_games=4,
+    max_moves=50_000,
+    stockfish_ratio=0.0,
+    stockfish_depth=1,
+    adjudication=None,
+    max_buffer_size=500_000,
+    window_size=100_000,
+    data_path=None,
+    checkpoint_path=None,
+    model=None,
+    optimizer=None,
+    device=None,
+    seed=None,
+):
+    """Train for train_steps learner steps while self-play runs; returns the report.
+
+    Without model, the model and optimizer come from checkpoint_path (the
+    iterative_training checkpoint by default) when it exists, and the
+    checkpoint is saved back at every weights publish and at the end; with
+    model, pass checkpoint_path to save it at all. games_per_iter games
+    count as one iteration, for the temperature schedule and the saved
+    iteration. ratio_slack defaults to two batches and min_buffer (examples
+    before the first step) to four.
+    """
+    if device is None:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    if data_path is None:
+        data_path = os.path.join(script_dir, "..", "training_data.npz")
+    start_iteration = 0
+    if model is None:
+        if checkpoint_path is None:
+            checkpoint_path = os.path.join(script_dir, "..", "models", "chess_model_checkpoint.pt")
+        checkpoint = None
+        model_config = {"num_channels": 13, "policy_size": 8513}
+        if os.path.exists(checkpoint_path):
+            checkpoint = torch.load(checkpoint_path, map_location=device)
+            model_config = checkpoint_model_config(checkpoint)
+        model = ChessNet(**model_config).to(device)
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+        if checkpoint is not None:
+            model.load_state_dict(checkpoint["model_state_dict"])
+            optimizer.load_state_dict(checkpoint["optimizer_state_dict"])
+            start_iteration = checkpoint.get("iteration", -1) + 1
+            print(f"Resuming from iteration {start_iteration} (loaded {checkpoint_path})")
+    elif optimizer is None:
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    if ratio_slack is None:
+        ratio_slack = 2 * batch_size
+    if min_buffer is None:
+        min_buffer = 4 * batch_size
+
+    settings = {
+        "max_moves": max_moves, "quantize": None, "calibration_path": None,
+        "stockfish_ratio": stockfish_ratio, "stockfish_depth": stockfish_depth,
+        "opening_book": None, "book_plies": 8, "tablebase_dir": None, "gumbel_simulations": 0,
+        "adjudication": adjudication, "lockstep_games": lockstep_games, "seed": seed,
+    }
+    writer = ReplayWriter(data_path, max_buffer_size, policy_size=model.policy_size)
+    window = ReplayWindow(window_size, model.policy_size)
+    rng = np.random.default_rng(seed)
+    results = queue.Queue()
+    timings = []
+    stats = {"games": 0, "generated": 0, "trained": 0, "stale_games": 0, "lag": 0,
+             "train_seconds": 0.0, "wait_seconds": 0.0, "publish_seconds": 0.0}
+    in_flight = 0
+    games_started = 0
+    steps = 0
+    losses = deque(maxlen=publish_steps)
+
+    def iteration():
+        return start_iteration + games_started // games_per_iter
+
+    def save_checkpoint():
+        if checkpoint_path is None:
+            return
+        torch.save({
+            "iteration": iteration(),
+            "model_state_dict": model.state_dict(),
+            "optimizer_state_dict": optimizer.state_dict(),
+            "model_config": model.config,
+        }, checkpoint_path)
+
+    def submit():
+        nonlocal in_flight, games_started
+        version = pool.version
+        pool.submit(lockstep_games, dict(settings, iteration=iteration()), games_started,
+                    callback=lambda task: results.put((version, task, None)),
+                    error_callback=lambda error: results.put((version, None, error)))
+        in_flight += 1
+        games_started += lockstep_games
+
+    def receive(version, task, error):
+        nonlocal in_flight
+        in_flight -= 1
+        if isinstance(error, FileNotFoundError) and version < pool.version:
+            # Newer weights replaced the task's before its worker mapped them.
+            stats["stale_games"] += lockstep_games
+            return
+        if error is not None:
+            raise error
+        pid, _, (examples, records), start, end = task
+        timings.append((pid, start, end))
+        lag = pool.version - version
+        if lag > max_staleness:
+            stats["stale_games"] += len(records)
+            return
+        stats["games"] += len(records)
+        stats["lag"] += lag * len(records)
+        if examples is not None:
+            writer.append(*examples)
+            window.add(*examples)
+            stats["generated"] += len(examples[0])
+
+    # Tasks submitted just before a publish still find their weights.
+    pool = SelfPlayPool(num_workers, keep_versions=max_staleness + 1).start()
+    started = time.time()
+    try:
+        pool.update_model(model)
+        while steps < train_steps:
+            while True:
+                try:
+                    receive(*results.get_nowait())
+                except queue.Empty:
+                    break
+            learner_behind = (window.rows >= min_buffer and
+                              train_ratio * stats["generated"] > stats["trained"] + ratio_slack)
+            while in_flight < num_workers and not learner_behind:
+                submit()
+
+            if window.rows < min_buffer or \
+                    stats["trained"] + batch_size > train_ratio * stats["generated"] + ratio_slack:
+                # Ahead of the actors: wait for the next game.
+                if not in_flight:
+                    submit()
+                t0 = time.time()
+                item = results.get()
+                stats["wait_seconds"] += time.time() - t0
+                receive(*item)
+                continue
+
+            t0 = time.time()
+            model.train()
+            batch = (torch.from_numpy(a) for a in window.sample(batch_size, rng))
+            losses.append(train_step(model, optimizer, *batch, device))
+            stats["train_seconds"] += time.time() - t0
+            stats["trained"] += batch_size
+            steps += 1
+            if steps % publish_steps == 0:
+                t0 = time.time()
+                pool.update_model(model)
+                save_checkpoint()
+                stats["publish_seconds"] += time.time() - t0
+                print(f"Step {steps}: loss {np.mean(losses):.4f}, weights v{pool.version}, "
+                      f"{stats['games']} games, {stats['generated']} examples, "
+                      f"buffer {window.rows}.")
+        # Keep the games already under way.
+        while in_flight:
+            receive(*results.get())
+    finally:
+        pool.stop()
+    finished = time.time()
+    buffer_size = writer.commit()
+    save_checkpoint()
+
+    wall = max(finished - started, 1e-9)
+    report = dict(stats, steps=steps, versions=pool.version, wall=wall, buffer_size=buffer_size)
+    report["actors"] = schedule_report(timings, num_workers, started, finished)
+    report["learner_utilization"] = stats["train_seconds"] / wall
+    report["sample_ratio"] = stats["trained"] / max(stats["generated"], 1)
+    report["mean_lag"] = stats["lag"] / max(stats["games"], 1)
+    print(f"Async training: {steps} steps and {stats['games']} games in {wall:.1f}s "
+          f"({stats['generated'] / wall:.1f} examples/s generated, {stats['trained'] / wall:.1f} trained, "
+          f"ratio {report['sample_ratio']:.2f}).")
+    print(f"Actors: {report['actors']['utilization']:.0%} utilization on {num_workers} workers. "
+          f"Learner: {report['learner_utilization']:.0%} training, {stats['wait_seconds']:.1f}s waiting "
+          f"for games, {stats['publish_seconds']:.1f}s publishing {pool.version} versions. "
+          f"Mean weights lag {report['mean_lag']:.2f}, {stats['stale_games']} stale games dropped.")
+    return report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    train_steps = int(args[0]) if len(args) > 0 else 10_000
+    num_workers = int(args[1]) if len(args) > 1 else min(16, os.cpu_count() or 1)
+    async_training(train_steps=train_steps, num_workers=num_workers)
@@ -0,0 +1,191 @@
+"""Early adjudication of self-play games.
+
+Collecting gold resets the halfmove clock, so a game where both sides just
+collect_gold never reaches the 50-move rule and runs to max_moves before
+it is scored as a draw. Adjudication ends such games early:
+
+- resign: the side to move resigns once its value-head estimate has stayed
+  below -resign_threshold on resign_plies of its own turns in a row. In a
+  resign_playthrough fraction of games the resignation is only recorded
+  and the game is played out, to audit false resignations (the side that
+  would have resigned did not go on to lose).
+- static draw: a draw once the material on the board (piece counts by type
+  and colour) has not changed for draw_window plies. Gold is not compared
+  directly, since collect_gold grows it on every ply of a shuffle; it
+  matters once it is spent on a purchase, which changes the material.
+- material: the side ahead by at least material_threshold (PIECE_COST
+  units, gold included) for material_plies plies in a row wins.
+- tablebase: a position covered by the endgame tables ends with its exact
+  result (training/tablebase.py).
+
+Every game gets a record (plies, seconds, winner, reason, and the audit
+fields for played-out resignations); summarize_games() aggregates them.
+"""
+
+import random
+from collections import Counter
+
+from src.board import PIECE_COST
+
+
+def _other(color):
+    return "black" if color == "white" else "white"
+
+
+def material_signature(game):
+    """Piece counts by colour and type."""
+    return tuple(sorted(Counter(
+        (piece.color, piece.type) for row in game.board for piece in row if piece is not None
+    ).items()))
+
+
+def material_balance(game):
+    """White's material plus gold minus Black's, in PIECE_COST units."""
+    balance = 0
+    for row in game.board:
+        for piece in row:
+            if piece is not None:
+                worth = PIECE_COST.get(piece.type, 0) + piece.gold
+                balance += worth if piece.color == "white" else -worth
+    return balance
+
+
+class Adjudication:
+    """Adjudication settings shared by every game of a run (None disables a rule)."""
+
+    def __init__(self, resign_threshold=None, resign_plies=8, resign_playthrough=0.1,
+                 draw_window=None, material_threshold=None, material_plies=8, use_tablebases=True):
+        self.resign_threshold = resign_threshold
+        self.resign_plies = resign_plies
+        self.resign_playthrough = resign_playthrough
+        self.draw_window = draw_window
+        self.material_threshold = material_threshold
+        self.material_plies = material_plies
+        self.use_tablebases = use_tablebases
+
+    def new_game(self, tablebases=None, rng=random):
+        playthrough = self.resign_threshold is not None and rng.random() < self.resign_playthrough
+        return GameAdjudicator(self, tablebases if self.use_tablebases else None, playthrough)
+
+
+# Suggested settings for self-play (adjudication=DEFAULT_ADJUDICATION in
+# iterative_training or async_training; both default to none): resign at a
+# near-certain loss (audited in 10% of games) and draw long shuffles.
+DEFAULT_ADJUDICATION = Adjudication(resign_threshold=0.95, resign_plies=10, draw_window=300)
+
+
+class GameAdjudicator:
+    """Adjudication state of one game."""
+
+    def __init__(self, settings, tablebases=None, playthrough=False):
+        self.settings = settings
+        self.tablebases = tablebases
+        self.playthrough = playthrough
+        self.low_value_turns = {"white": 0, "black": 0}
+        self.material = None
+        self.static_plies = 0
+        self.leader = None
+        self.lead_plies = 0
+        self.resigned = None  # (color, ply) of the first resignation
+        self.reason = None
+
+    @property
+    def needs_value(self):
+        return self.settings.resign_threshold is not None
+
+    def _end(self, game, winner, reason):
+        game.game_over = True
+        game.winner = winner
+        self.reason = reason
+        return True
+
+    def observe_value(self, game, value, ply):
+        """Value-head estimate for the side to move; returns whether it resigned."""
+        color = game.turn
+        if value < -self.settings.resign_threshold:
+            self.low_value_turns[color] += 1
+        else:
+            self.low_value_turns[color] = 0
+        if self.resigned is None and self.low_value_turns[color] >= self.settings.resign_plies:
+            self.resigned = (color, ply)
+            if not self.playthrough:
+                return self._end(game, _other(color), "resign")
+        return False
+
+    def after_move(self, game):
+        """Check the position after a move; returns whether the game was adjudicated."""
+        if game.is_game_over():
+            return False
+        settings = self.settings
+        if self.tablebases is not None:
+            from .tablebase import adjudicate
+            if adjudicate(game, self.tablebases):
+                self.reason = "tablebase"
+                return True
+
+        if settings.draw_window is not None:
+            material = material_signature(game)
+            self.static_plies = self.static_plies + 1 if material == self.material else 0
+            self.material = material
+            if self.static_plies >= settings.draw_window:
+                return self._end(game, "draw", "static_draw")
+
+        if settings.material_threshold is not None:
+            balance = material_balance(game)
+            leader = None
+            if abs(balance) >= settings.material_threshold:
+                leader = "white" if balance > 0 else "black"
+            self.lead_plies = self.lead_plies + 1 if leader is not None and leader == self.leader else 0
+            self.leader = leader
+            if leader is not None and self.lead_plies + 1 >= settings.material_plies:
+                return self._end(game, leader, "material")
+        return False
+
+    def record(self, game, plies, seconds):
+        """Per-game record of how the game ended."""
+        if self.reason is not None:
+            reason = self.reason
+        elif getattr(game, "max_moves_reached", False):
+            reason = "max_moves"
+        elif game.winner in ("white", "black"):
+            reason = "checkmate"
+        else:
+            reason = "draw"
+        record = {"plies": plies, "seconds": seconds, "winner": game.winner, "reason": reason}
+        if self.resigned is not None and self.playthrough:
+            color, ply = self.resigned
+            record["resign_ply"] = ply
+            record["false_resign"] = game.winner != _other(color)
+        return record
+
+
+def summarize_games(records):
+    """Games, plies and seconds per end reason, plus the resignation audit."""
+    summary = {"games": len(records), "plies": 0, "seconds": 0.0, "reasons": {}}
+    audited = []
+    for record in records:
+        summary["plies"] += record["plies"]
+        summary["seconds"] += record["seconds"]
+        games, plies, seconds = summary["reasons"].get(record["reason"], (0, 0, 0.0))
+        summary["reasons"][record["reason"]] = (games + 1, plies + record["plies"],
+                                                seconds + record["seconds"])
+        if "resign_ply" in record:
+            audited.append(record)
+    summary["audited_resignations"] = len(audited)
+    summary["false_resignations"] = sum(r["false_resign"] for r in audited)
+    # Plies the audited games ran past their resignation point: what each
+    # resignation saves on average.
+    summary["plies_saved_per_resignation"] = (
+        sum(r["plies"] - r["resign_ply"] for r in audited) / len(audited) if audited else None
+    )
+    return summary
+
+
+def format_summary(summary):
+    parts = [f"{reason} {games}" for reason, (games, _, _) in sorted(summary["reasons"].items())]
+    line = (f"Adjudication: {summary['games']} games, {summary['plies']} plies, "
+            f"{summary['seconds']:.1f}s ({', '.join(parts)}).")
+    if summary["audited_resignations"]:
+        line += (f" Resign audit: {summary['false_resignations']} of {summary['audited_resignations']}"
+                 f" false, {summary['plies_saved_per_resignation']:.0f} plies saved per resignation.")
+    return line
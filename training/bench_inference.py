@@ -0,0 +1,73 @@
+"""CPU microbenchmark for ChessNet leaf evaluation.
+
+Compares the per-position cost of the full forward pass against the
+value-only entry point (what a search needs at a leaf) and value_and_trunk
+(value now, policy later from the cached trunk), for the eager and the
+scripted inference builds.
+
+Usage:
+    python -m training.bench_inference
+"""
+
+import time
+
+import torch
+
+from .inference_model import build_inference_model
+from .model import ChessNet
+
+
+def _per_position_us(fn, x, iterations):
+    with torch.no_grad():
+        for _ in range(max(iterations // 10, 3)):
+            fn(x)  # warm-up
+        t0 = time.perf_counter()
+        for _ in range(iterations):
+            fn(x)
+        elapsed = time.perf_counter() - t0
+    return 1e6 * elapsed / (iterations * x.shape[0])
+
+
+def benchmark_leaf_eval(batch_sizes=(1, 8, 64), iterations=100, num_threads=None, model=None):
+    """Time full/value-only/value+trunk evaluation per position.
+
+    Returns a list of dicts, one per (build, batch size).
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if model is None:
+        torch.manual_seed(0)
+        model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+
+    builds = {
+        "eager": build_inference_model(model, script=False),
+        "scripted": build_inference_model(model),
+    }
+    rows = []
+    for build_name, net in builds.items():
+        for batch_size in batch_sizes:
+            x = torch.rand(batch_size, 13, 8, 8)
+            full_us = _per_position_us(net, x, iterations)
+            value_us = _per_position_us(net.value_only, x, iterations)
+            trunk_us = _per_position_us(net.value_and_trunk, x, iterations)
+            rows.append({
+                "build": build_name,
+                "batch_size": batch_size,
+                "full_us": full_us,
+                "value_only_us": value_us,
+                "value_and_trunk_us": trunk_us,
+                "value_only_speedup": full_us / value_us,
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    print(f"torch threads: {torch.get_num_threads()}")
+    print(f"{'build':<10}{'batch':>6}{'full us':>12}{'value us':>12}{'v+trunk us':>12}{'speedup':>10}")
+    for row in benchmark_leaf_eval():
+        print(
+            f"{row['build']:<10}{row['batch_size']:>6}{row['full_us']:>12.1f}"
+            f"{row['value_only_us']:>12.1f}{row['value_and_trunk_us']:>12.1f}"
+            f"{row['value_only_speedup']:>9.2f}x"
+        )
@@ -0,0 +1,293 @@
+"""Self-play throughput benchmark with a per-phase time breakdown.
+
+Plays a fixed, seeded workload per mode and reports games/s, plies/s and
+examples/s, with the wall time split into phases:
+
+- movegen: get_legal_actions (pseudo-legal generation; its king-safety
+  tests count as legality)
+- legality: is_in_check, simulate_move_is_safe, has_any_legal_moves,
+  is_move_legal
+- encoding: encode_board_state and get_training_example
+- inference: network evaluation (evaluate_legal_policy, evaluate_value,
+  PolicyPrior.prefetch), cache lookups included
+- apply_move and end_turn: applying a move and the turn bookkeeping
+  (repetition table, draw rules); their legality tests count as legality
+- stockfish: the Stockfish opponent's moves
+- buffer_io: ReplayWriter.append and commit
+- ipc: pooled mode only, the delay from a task finishing in its worker to
+  its result reaching the parent (SelfPlayPool's schedule delivery)
+- other: everything else (sampling, adjudication, bookkeeping)
+
+Each timed call's phase gets its exclusive time, so nested phases are not
+counted twice. Timing wraps the methods above for the run, which adds a
+little overhead per call; compare numbers from this benchmark with each
+other, not with untimed runs.
+
+Modes: random (no model), model (an untrained, seeded network through
+the inference build), stockfish_mixed (model games, half of them against
+Stockfish depth 1; skipped without the binary), and, with num_workers > 0,
+pool (model games in a SelfPlayPool, where only the parent's phases are
+timed and other is mostly waiting on the workers). Results go to a JSON
+file, to track regressions across commits.
+
+Usage:
+    python -m training.bench_selfplay [output.json] [games] [max_moves] [num_workers]
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import torch
+
+from .seeding import game_seed, seed_everything
+
+PHASES = ("movegen", "legality", "encoding", "inference", "apply_move", "end_turn",
+          "stockfish", "buffer_io", "ipc", "other")
+
+
+class PhaseTimer:
+    """Exclusive time per phase of the wrapped calls."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._children = []  # Time spent in timed calls nested in each open call
+
+    def wrap(self, phase, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            self._children.append(0.0)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.seconds[phase] += elapsed - self._children.pop()
+                self.calls[phase] += 1
+                if self._children:
+                    self._children[-1] += elapsed
+        return timed
+
+
+def _timed_methods():
+    from src.game import Game
+    from .replay_store import ReplayWriter
+    from .search import PolicyPrior
+    methods = [
+        ("movegen", Game, "get_legal_actions"),
+        ("legality", Game, "is_in_check"),
+        ("legality", Game, "simulate_move_is_safe"),
+        ("legality", Game, "has_any_legal_moves"),
+        ("legality", Game, "is_move_legal"),
+        ("encoding", Game, "encode_board_state"),
+        ("encoding", Game, "get_training_example"),
+        ("inference", Game, "evaluate_legal_policy"),
+        ("inference", Game, "evaluate_value"),
+        ("inference", PolicyPrior, "prefetch"),
+        ("apply_move", Game, "apply_move"),
+        ("end_turn", Game, "end_turn"),
+        ("buffer_io", ReplayWriter, "append"),
+        ("buffer_io", ReplayWriter, "commit"),
+    ]
+    try:
+        from .stockfish_opponent import StockfishOpponent
+        methods.append(("stockfish", StockfishOpponent, "get_move"))
+    except ImportError:
+        pass
+    return methods
+
+
+class instrument:
+    """Context manager that times _timed_methods() into timer."""
+
+    def __init__(self, timer):
+        self.timer = timer
+        self.saved = []
+
+    def __enter__(self):
+        for phase, cls, name in _timed_methods():
+            original = cls.__dict__[name]
+            self.saved.append((cls, name, original))
+            setattr(cls, name, self.timer.wrap(phase, original))
+        return self.timer
+
+    def __exit__(self, *exc):
+        for cls, name, original in reversed(self.saved):
+            setattr(cls, name, original)
+        self.saved = []
+        return False
+
+
+def _report(name, records, examples, wall, timer, ipc=0.0):
+    games = len(records)
+    plies = sum(r["plies"] for r in records)
+    phases = {phase: timer.seconds.get(phase, 0.0) for phase in PHASES}
+    phases["ipc"] = ipc
+    phases["other"] = max(wall - sum(phases.values()), 0.0)
+    return {
+        "mode": name,
+        "games": games,
+        "plies": plies,
+        "examples": examples,
+        "seconds": wall,
+        "games_per_s": games / wall,
+        "plies_per_s": plies / wall,
+        "examples_per_s": examples / wall,
+        "phases": phases,
+        "phase_share": {phase: seconds / wall for phase, seconds in phases.items()},
+        "calls": dict(timer.calls),
+    }
+
+
+def run_workload(name, num_games, max_moves, model=None, sf_opponent=None, stockfish_ratio=0.0,
+                 seed=0, lockstep_games=1):
+    """Play one seeded in-process workload and time its phases; returns its report."""
+    from .eval_cache import EvalCache
+    from .replay_store import ReplayWriter
+    from .selfplay import _play_games
+
+    seed_everything(seed)
+    device = torch.device("cpu")
+    cache = EvalCache() if model is not None else None
+    timer = PhaseTimer()
+    with tempfile.TemporaryDirectory() as tmpdir, instrument(timer):
+        writer = ReplayWriter(os.path.join(tmpdir, "training_data.npz"))
+        started = time.perf_counter()
+        arrays, records = _play_games(
+            num_games, max_moves, 0, model, device if model is not None else None, cache,
+            sf_opponent, stockfish_ratio, None, 8, None, 0, batch_eval=True,
+            lockstep_games=lockstep_games, seeds=[game_seed(seed, 0, i) for i in range(num_games)],
+        )
+        examples = 0
+        if arrays is not None:
+            writer.append(*arrays)
+            writer.commit()
+            examples = len(arrays[0])
+        wall = time.perf_counter() - started
+    return _report(name, records, examples, wall, timer)
+
+
+def run_pool_workload(num_games, max_moves, model, num_workers, seed=0, lockstep_games=1):
+    """The model workload through a SelfPlayPool; times the parent's phases only."""
+    from .replay_store import ReplayWriter
+    from .selfplay import SelfPlayPool
+
+    seed_everything(seed)
+    settings = {
+        "max_moves": max_moves, "iteration": 0, "quantize": None, "calibration_path": None,
+        "stockfish_ratio": 0.0, "stockfish_depth": 1, "opening_book": None, "book_plies": 8,
+        "tablebase_dir": None, "gumbel_simulations": 0, "adjudication": None,
+        "lockstep_games": lockstep_games, "seed": seed,
+    }
+    timer = PhaseTimer()
+    records = []
+    examples = [0]
+    # Workers start before the methods are wrapped, so they run untimed code.
+    with SelfPlayPool(num_workers) as pool, tempfile.TemporaryDirectory() as tmpdir:
+        pool.update_model(model)
+        with instrument(timer):
+            writer = ReplayWriter(os.path.join(tmpdir, "training_data.npz"))
+
+            def save(result):
+                arrays, game_records = result
+                records.extend(game_records)
+                if arrays is not None:
+                    writer.append(*arrays)
+                    examples[0] += len(arrays[0])
+
+            started = time.perf_counter()
+            _, schedule = pool.run(num_games, settings, chunksize=lockstep_games, on_result=save,
+                                  ordered=True)
+            writer.commit()
+            wall = time.perf_counter() - started
+    report = _report("pool", records, examples[0], wall, timer, ipc=schedule["delivery"])
+    report["schedule"] = schedule
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(num_games=8, max_moves=80, num_workers=0, seed=0, lockstep_games=1,
+                  output_path=None, modes=("random", "model", "stockfish_mixed", "pool")):
+    """Run the benchmark modes; returns the results and writes them to output_path as JSON."""
+    from .inference_model import build_inference_model
+    from .model import ChessNet
+
+    seed_everything(seed)
+    model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+    net = build_inference_model(model)
+
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "settings": {"games": num_games, "max_moves": max_moves, "num_workers": num_workers,
+                     "seed": seed, "lockstep_games": lockstep_games},
+        "workloads": [],
+        "skipped": {},
+    }
+    workloads = results["workloads"]
+    if "random" in modes:
+        workloads.append(run_workload("random", num_games, max_moves, seed=seed))
+    if "model" in modes:
+        workloads.append(run_workload("model", num_games, max_moves, model=net, seed=seed,
+                                      lockstep_games=lockstep_games))
+    if "stockfish_mixed" in modes:
+        try:
+            from .stockfish_opponent import StockfishOpponent
+            sf_opponent = StockfishOpponent(depth=1)
+        except (ImportError, FileNotFoundError) as e:
+            results["skipped"]["stockfish_mixed"] = str(e)
+        else:
+            try:
+                workloads.append(run_workload("stockfish_mixed", num_games, max_moves, model=net,
+                                              sf_opponent=sf_opponent, stockfish_ratio=0.5,
+                                              seed=seed, lockstep_games=lockstep_games))
+            finally:
+                sf_opponent.close()
+    if "pool" in modes:
+        if num_workers > 0:
+            workloads.append(run_pool_workload(num_games, max_moves, model, num_workers,
+                                               seed=seed, lockstep_games=lockstep_games))
+        else:
+            results["skipped"]["pool"] = "num_workers is 0"
+
+    if output_path is not None:
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    output_path = args[0] if len(args) > 0 else "bench_selfplay.json"
+    num_games = int(args[1]) if len(args) > 1 else 8
+    max_moves = int(args[2]) if len(args) > 2 else 80
+    num_workers = int(args[3]) if len(args) > 3 else 0
+
+    results = run_benchmark(num_games, max_moves, num_workers, output_path=output_path)
+    print(f"torch threads: {results['torch_threads']}, commit {results['commit']}")
+    print(f"{'mode':<16}{'games/s':>9}{'plies/s':>9}{'ex/s':>9}  phases (share of wall time)")
+    for row in results["workloads"]:
+        shares = ", ".join(f"{phase} {share:.0%}" for phase, share in row["phase_share"].items()
+                           if share >= 0.005)
+        print(f"{row['mode']:<16}{row['games_per_s']:>9.2f}{row['plies_per_s']:>9.1f}"
+              f"{row['examples_per_s']:>9.1f}  {shares}")
+    for mode, reason in results["skipped"].items():
+        print(f"{mode:<16}skipped: {reason}")
+    print(f"Wrote {output_path}")
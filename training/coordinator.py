@@ -0,0 +1,337 @@
+"""Multi-node self-play: a TCP coordinator and the worker daemons that feed it.
+
+The Coordinator runs in the training process. It serves the current model
+weights and hands out game assignments (tasks of a few games) to worker
+daemons, which connect to it over TCP from any number of machines. Each
+daemon runs a local SelfPlayPool (training/selfplay.py), republishes the
+weights it receives into that box's shared memory, and keeps every local
+worker busy with one assignment. Finished games go back to the
+coordinator.
+
+The Coordinator has SelfPlayPool's num_workers, update_model() and run(),
+so it can stand in for the pool: generate_selfplay_data(..., pool=coordinator).
+If a daemon disconnects, its unfinished assignments are queued again for
+the other daemons.
+
+Paths in the settings (opening_book, tablebase_dir) must exist on every
+worker box, and static quantization (which calibrates on the
+coordinator's buffer) is not supported.
+
+Trust model: connections use multiprocessing.connection, which unpickles
+every message, so any peer that completes the handshake can run code on
+the coordinator, and the coordinator on every worker. The only gate is
+the shared authkey (an explicit authkey, else the SELFPLAY_AUTHKEY
+environment variable; there is no default, and nothing starts without
+one). Use a long random key, e.g. from secrets.token_hex(32), and keep it
+secret. The key authenticates but does not encrypt: weights and games
+cross the network in the clear. The coordinator listens on 127.0.0.1
+unless given another address; listen on a routable interface only inside
+a trusted network (or reach a loopback coordinator through an SSH tunnel).
+
+Usage:
+    # Everywhere: export SELFPLAY_AUTHKEY=<the same secret key>
+    # Training box: serve weights and collect games on port 6200 of its
+    # private-network address (the default is 127.0.0.1).
+    iterative_training(coordinator_address=("10.0.0.5", 6200))
+    # Each self-play box:
+    python -m training.coordinator 10.0.0.5:6200 [num_workers]
+"""
+
+import io
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+
+import torch
+
+from .selfplay import SelfPlayPool, schedule_report
+
+DEFAULT_PORT = 6200
+
+
+def resolve_authkey(authkey=None):
+    """authkey as bytes, else SELFPLAY_AUTHKEY's; raises ValueError without either."""
+    if authkey is None:
+        authkey = os.environ.get("SELFPLAY_AUTHKEY")
+    if not authkey:
+        raise ValueError("Self-play coordinator needs an authkey: pass authkey= or set SELFPLAY_AUTHKEY "
+                         "(see training/coordinator.py for the trust model).")
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+class Coordinator:
+    """Serves weights and game assignments to worker daemons over TCP."""
+
+    def __init__(self, address=("127.0.0.1", DEFAULT_PORT), authkey=None, wait_timeout=0.5):
+        self.requested_address = address
+        self.authkey = resolve_authkey(authkey)
+        self.wait_timeout = wait_timeout
+        self.address = None
+        self.version = 0
+        self.requeued = 0
+        self._runs = 0
+        self._weights = (0, None, None, True)  # (version, model_config, payload, fused)
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._results = queue.Queue()
+        self._workers = {}  # connection id -> (name, num_workers)
+        self._listener = None
+        self._closing = False
+
+    @property
+    def num_workers(self):
+        with self._cond:
+            return max(1, sum(workers for _, workers in self._workers.values()))
+
+    def start(self):
+        self._listener = Listener(self.requested_address, authkey=self.authkey)
+        self.address = self._listener.address
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def update_model(self, model, fused=True):
+        """Publish model's current weights (None: random play) to the daemons."""
+        config = payload = None
+        if model is not None:
+            buf = io.BytesIO()
+            torch.save({k: v.detach().cpu() for k, v in model.state_dict().items()}, buf)
+            config, payload = dict(model.config), buf.getvalue()
+        with self._cond:
+            self.version += 1
+            self._weights = (self.version, config, payload, fused)
+
+    def run(self, num_games, settings, chunksize=1, on_result=None, ordered=False):
+        """Play num_games games on the connected daemons; same contract as SelfPlayPool.run().
+
+        Blocks until every game is in, waiting for daemons to connect if
+        none are. The report's requeued counts the assignments run again
+        after their daemon disconnected; delivery is not measured, since
+        worker clocks may differ from this one.
+        """
+        chunks = [chunksize] * (num_games // chunksize)
+        if num_games % chunksize:
+            chunks.append(num_games % chunksize)
+        started = time.time()
+        requeued = self.requeued
+        with self._cond:
+            self._runs += 1
+            run_id = self._runs
+            for index, n in enumerate(chunks):
+                self._pending.append(((run_id, index), n, chunksize * index, settings))
+            self._cond.notify_all()
+
+        results = []
+        timings = []
+        done = set()
+        held = {}  # ordered: results waiting for an earlier task's
+        while len(done) < len(chunks):
+            (task_run, index), worker, task, error = self._results.get()
+            if task_run != run_id or index in done:
+                continue
+            if error is not None:
+                raise RuntimeError(f"Self-play task failed on {worker}: {error}")
+            done.add(index)
+            _, tasks_run, result, start, end = task
+            # Worker clocks may be off; place the task by its duration, ending now.
+            received = time.time()
+            timings.append((worker, received - (end - start), received))
+            held[index] = (worker, tasks_run, result)
+            ready = []
+            if ordered:
+                while len(results) + len(ready) in held:
+                    ready.append(held.pop(len(results) + len(ready)))
+            else:
+                ready.append(held.pop(index))
+            for worker, tasks_run, result in ready:
+                if on_result is not None:
+                    on_result(result)
+                    result = None
+                results.append((worker, tasks_run, result))
+        schedule = schedule_report(timings, self.num_workers, started, time.time())
+        schedule["requeued"] = self.requeued - requeued
+        return results, schedule
+
+    def stop(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._listener is not None:
+            try:
+                # Wake the accept loop so it sees _closing.
+                Client(self.address, authkey=self.authkey).close()
+            except OSError:
+                pass
+            self._listener.close()
+            self._listener = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closing:
+                    return
+                continue  # A peer that failed authentication
+            if self._closing:
+                conn.close()
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _next_task(self):
+        with self._cond:
+            if not self._pending and not self._closing:
+                self._cond.wait(self.wait_timeout)
+            if self._closing:
+                return "stop"
+            return self._pending.popleft() if self._pending else None
+
+    def _serve(self, conn):
+        key = id(conn)
+        name = "?"
+        assigned = {}
+        try:
+            while True:
+                message = conn.recv()
+                kind = message[0]
+                if kind == "hello":
+                    _, host, pid, workers = message
+                    name = f"{host}:{pid}"
+                    with self._cond:
+                        self._workers[key] = (name, workers)
+                elif kind == "ready":
+                    task = self._next_task()
+                    if task == "stop":
+                        conn.send(("stop",))
+                    elif task is None:
+                        conn.send(("wait",))
+                    else:
+                        index, n, first_game, settings = task
+                        assigned[index] = task
+                        conn.send(("task", index, n, first_game, settings, self._weights[0]))
+                elif kind == "weights":
+                    conn.send(("weights",) + self._weights)
+                elif kind == "result":
+                    _, index, task = message
+                    assigned.pop(index, None)
+                    self._results.put((index, name, task, None))
+                elif kind == "failed":
+                    _, index, error = message
+                    assigned.pop(index, None)
+                    self._results.put((index, name, None, error))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            with self._cond:
+                self._workers.pop(key, None)
+                if assigned:
+                    # Unfinished assignments go back to the front of the queue.
+                    self._pending.extendleft(reversed(list(assigned.values())))
+                    self.requeued += len(assigned)
+                    self._cond.notify_all()
+            if assigned:
+                print(f"Self-play worker {name} disconnected; re-queued {len(assigned)} assignments.")
+
+
+def _load_weights(config, payload):
+    from .model import ChessNet
+    model = ChessNet(**config)
+    model.load_state_dict(torch.load(io.BytesIO(payload), map_location="cpu"))
+    model.train(False)
+    return model
+
+
+def run_worker(address, authkey=None, num_workers=None, retry_seconds=None):
+    """Worker daemon: play the coordinator's assignments on num_workers local processes.
+
+    Returns when the coordinator stops. retry_seconds keeps trying to
+    connect for that long (the coordinator may not be up yet). authkey
+    as for Coordinator.
+    """
+    authkey = resolve_authkey(authkey)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    deadline = time.time() + (retry_seconds or 0)
+    while True:
+        try:
+            conn = Client(tuple(address), authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.time() >= deadline:
+                raise
+            time.sleep(0.5)
+
+    send_lock = threading.Lock()
+    free = threading.Semaphore(num_workers)
+    version = None
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def finished(index, task):
+        try:
+            send(("result", index, task))
+        except OSError:
+            pass  # The coordinator is gone
+        free.release()
+
+    def failed(index, error):
+        try:
+            send(("failed", index, repr(error)))
+        except OSError:
+            pass
+        free.release()
+
+    # Weights are republished while assignments of the old version may
+    # still be starting; keep the previous file for them.
+    pool = SelfPlayPool(num_workers, keep_versions=2).start()
+    games = 0
+    try:
+        send(("hello", socket.gethostname(), os.getpid(), num_workers))
+        print(f"Connected to {address[0]}:{address[1]} with {num_workers} workers.")
+        while True:
+            free.acquire()
+            send(("ready",))
+            reply = conn.recv()
+            if reply[0] != "task":
+                free.release()
+                if reply[0] == "stop":
+                    break
+                continue
+            _, index, n, first_game, settings, weights_version = reply
+            if weights_version != version:
+                send(("weights",))
+                _, version, config, payload, fused = conn.recv()
+                pool.update_model(_load_weights(config, payload) if payload is not None else None,
+                                  fused=fused)
+            pool.submit(n, settings, first_game,
+                        callback=lambda task, index=index: finished(index, task),
+                        error_callback=lambda error, index=index: failed(index, error))
+            games += n
+    except (EOFError, OSError):
+        print("Coordinator connection closed.")
+    finally:
+        for _ in range(num_workers):
+            free.acquire()  # Let running assignments finish (their results may be lost)
+        pool.stop()
+        conn.close()
+    print(f"Worker daemon done after {games} assigned games.")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    host, _, port = (args[0] if args else "localhost").partition(":")
+    workers = int(args[1]) if len(args) > 1 else None
+    run_worker((host, int(port or DEFAULT_PORT)), num_workers=workers, retry_seconds=60)
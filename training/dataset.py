@@ -4,6 +4,8 @@ from torch.utils.data import Dataset
 import os
 import numpy as np
 
+from .action_space import COMPACT_POLICY_SIZE, compact_flip_map, convert_policy
+
 
 def _build_flip_index_map(board_size=8, policy_size=8513):
     """Precompute mapping from original policy index to horizontally-flipped index."""
@@ -50,10 +52,13 @@ def _build_flip_index_map(board_size=8, policy_size=8513):
 
 # Precompute once at module load
 _FLIP_INDEX_MAP = _build_flip_index_map()
+_COMPACT_FLIP_INDEX_MAP = compact_flip_map(_FLIP_INDEX_MAP)
 
 
 class ChessDataset(Dataset):
-    def __init__(self, data_file=None, augment=False):
+    def __init__(self, data_file=None, augment=False, policy_size=None):
+        """policy_size converts the stored policy targets to that action space
+        (8513 or the compact size) if the file uses the other one."""
         if data_file is None:
             script_dir = os.path.dirname(os.path.abspath(__file__))
             data_file = os.path.join(script_dir, '..', 'training_data.npz')
@@ -62,10 +67,16 @@ class ChessDataset(Dataset):
             self.states = data['states']
             self.policy_targets = data['policy_targets']
             self.value_targets = data['value_targets']
+            if policy_size is not None:
+                self.policy_targets = convert_policy(self.policy_targets, policy_size)
         else:
             raise FileNotFoundError(f"Data file {data_file} not found. Please run training/selfplay.py first.")
 
         self.augment = augment
+        if self.policy_targets.shape[-1] == COMPACT_POLICY_SIZE:
+            self.flip_map = _COMPACT_FLIP_INDEX_MAP
+        else:
+            self.flip_map = _FLIP_INDEX_MAP
         self.base_len = len(self.states)
 
     def __len__(self):
@@ -76,7 +87,7 @@ class ChessDataset(Dataset):
             # Flipped example
             real_idx = idx - self.base_len
             state = np.flip(self.states[real_idx], axis=2).copy()  # flip columns
-            policy = self.policy_targets[real_idx][_FLIP_INDEX_MAP]
+            policy = self.policy_targets[real_idx][self.flip_map]
             value = self.value_targets[real_idx]
             return state, policy, value
         else:
@@ -0,0 +1,197 @@
+"""Distill a smaller, faster ChessNet student from a trained teacher.
+
+The student (fewer residual blocks / channels, conv policy head by default)
+is trained on the replay buffer states to match the teacher's policy over
+the legal actions of each position (read off the stored policy targets) and
+the teacher's value. A held-out slice measures how closely it follows the
+teacher, next to both models' batch-1 latency.
+
+The student is saved as ``models/<name>.pt`` in the usual checkpoint format,
+so ``AI("student", device)`` or ``CHESSBUILDER_MODEL=student`` loads it.
+
+Usage:
+    python -m training.distill [name] [num_res_blocks] [hidden_channels]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch.utils.data import DataLoader, Subset
+
+from .dataset import ChessDataset
+from .inference_model import DEFAULT_CHECKPOINT, build_inference_model
+from .model import ChessNet, checkpoint_model_config
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_DATA_PATH = os.path.join(_SCRIPT_DIR, '..', 'training_data.npz')
+MODELS_DIR = os.path.join(_SCRIPT_DIR, '..', 'models')
+
+
+def load_teacher(checkpoint_path=None, device=torch.device("cpu")):
+    if checkpoint_path is None:
+        checkpoint_path = DEFAULT_CHECKPOINT
+    checkpoint = torch.load(checkpoint_path, map_location=device)
+    teacher = ChessNet(**checkpoint_model_config(checkpoint)).to(device)
+    teacher.load_state_dict(checkpoint["model_state_dict"])
+    teacher.train(False)
+    return teacher
+
+
+def _legal_mask(policy_targets):
+    """Legal actions are the non-zero targets; rows with none keep everything."""
+    legal = policy_targets > 0
+    empty = ~legal.any(dim=1, keepdim=True)
+    return legal | empty
+
+
+def distillation_loss(student_logits, student_values, teacher_logits, teacher_values,
+                      legal, temperature=1.0, value_weight=1.0):
+    """Soft-target cross-entropy over legal actions plus value MSE."""
+    teacher_probs = torch.softmax(
+        teacher_logits.masked_fill(~legal, float("-inf")) / temperature, dim=1)
+    # Finite fill so 0 * log_prob stays 0 on illegal actions.
+    student_logp = F.log_softmax(student_logits.masked_fill(~legal, -1e4) / temperature, dim=1)
+    loss_policy = -(teacher_probs * student_logp).sum(dim=1).mean()
+    loss_value = F.mse_loss(student_values, teacher_values)
+    return loss_policy + value_weight * loss_value, loss_policy, loss_value
+
+
+def compare_to_teacher(student, teacher, states, policy_targets, value_targets, device):
+    """Policy/value agreement of student with teacher on held-out examples."""
+    student.train(False)
+    teacher.train(False)
+    with torch.no_grad():
+        x = states.to(device)
+        legal = _legal_mask(policy_targets.to(device))
+        t_logits, t_values = teacher(x)
+        s_logits, s_values = student(x)
+    neg_inf = torch.tensor(float("-inf"), device=device)
+    t_logp = torch.log_softmax(torch.where(legal, t_logits, neg_inf), dim=1)
+    s_logp = torch.log_softmax(torch.where(legal, s_logits, neg_inf), dim=1)
+    kl = torch.where(legal, t_logp.exp() * (t_logp - s_logp), torch.zeros((), device=device)).sum(dim=1)
+    outcomes = value_targets.to(device)
+    return {
+        "samples": len(states),
+        "top1_agreement": (t_logp.argmax(dim=1) == s_logp.argmax(dim=1)).float().mean().item(),
+        "mean_policy_kl": kl.mean().item(),
+        "value_mse_vs_teacher": F.mse_loss(s_values, t_values).item(),
+        "teacher_outcome_mse": F.mse_loss(t_values, outcomes).item(),
+        "student_outcome_mse": F.mse_loss(s_values, outcomes).item(),
+    }
+
+
+def batch1_latency_ms(model, samples=100):
+    """Mean batch-1 forward time of model's scripted inference build on CPU."""
+    inference_model = build_inference_model(model)
+    x = torch.rand(1, 13, 8, 8)
+    with torch.no_grad():
+        for _ in range(10):
+            inference_model(x)  # warm-up
+        t0 = time.perf_counter()
+        for _ in range(samples):
+            inference_model(x)
+        elapsed = time.perf_counter() - t0
+    return 1000.0 * elapsed / samples
+
+
+def distill_student(name="student", teacher_checkpoint=None, data_path=None, teacher=None,
+                    num_res_blocks=2, hidden_channels=64, policy_head="conv",
+                    epochs=10, batch_size=256, lr=1e-3, temperature=1.0, value_weight=1.0,
+                    val_fraction=0.1, output_dir=None, device=None):
+    """Train a student ChessNet against the teacher and save models/<name>.pt.
+
+    Returns (student, report).
+    """
+    if device is None:
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    if data_path is None:
+        data_path = _DATA_PATH
+    if output_dir is None:
+        output_dir = MODELS_DIR
+    if teacher is None:
+        teacher = load_teacher(teacher_checkpoint, device)
+    teacher = teacher.to(device)
+    teacher.train(False)
+
+    config = dict(teacher.config)
+    config.update(num_res_blocks=num_res_blocks, hidden_channels=hidden_channels,
+                  policy_head=policy_head)
+    torch.manual_seed(0)
+    student = ChessNet(**config).to(device)
+
+    base = ChessDataset(data_file=data_path, augment=False, policy_size=teacher.policy_size)
+    num_val = max(1, int(len(base) * val_fraction)) if len(base) > 1 else 0
+    order = np.random.default_rng(0).permutation(len(base))
+    val_idx = order[:num_val]
+    # Train on the remaining examples and their mirror images.
+    augmented = ChessDataset(data_file=data_path, augment=True, policy_size=teacher.policy_size)
+    train_idx = [int(i) for i in order[num_val:]] + [int(i) + len(base) for i in order[num_val:]]
+    loader = DataLoader(Subset(augmented, train_idx), batch_size=batch_size, shuffle=True)
+
+    optimizer = torch.optim.Adam(student.parameters(), lr=lr)
+    t0 = time.time()
+    for epoch in range(epochs):
+        student.train()
+        epoch_loss = 0.0
+        for states, policy_targets, _ in loader:
+            states = states.to(device)
+            legal = _legal_mask(policy_targets.to(device))
+            with torch.no_grad():
+                t_logits, t_values = teacher(states)
+            s_logits, s_values = student(states)
+            loss, _, _ = distillation_loss(s_logits, s_values, t_logits, t_values, legal,
+                                           temperature, value_weight)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            epoch_loss += loss.item()
+        if epoch == 0 or epoch == epochs - 1:
+            print(f"  Epoch {epoch}: distillation loss {epoch_loss / max(len(loader), 1):.4f}")
+    train_time = time.time() - t0
+
+    report = {"train_examples": len(train_idx), "train_time_s": train_time}
+    if num_val:
+        val = [base[int(i)] for i in val_idx]
+        states = torch.from_numpy(np.stack([v[0] for v in val]))
+        policies = torch.from_numpy(np.stack([v[1] for v in val]))
+        values = torch.from_numpy(np.stack([v[2] for v in val]))
+        report.update(compare_to_teacher(student, teacher, states, policies, values, device))
+
+    report["teacher_params"] = sum(p.numel() for p in teacher.parameters())
+    report["student_params"] = sum(p.numel() for p in student.parameters())
+    report["teacher_ms"] = batch1_latency_ms(teacher)
+    report["student_ms"] = batch1_latency_ms(student)
+    report["speedup"] = report["teacher_ms"] / report["student_ms"] if report["student_ms"] > 0 else 0.0
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"{name}.pt")
+    torch.save({
+        'iteration': 0,
+        'model_state_dict': student.state_dict(),
+        'model_config': student.config,
+        'distill_report': report,
+    }, output_path)
+
+    print(f"Student saved to {output_path}")
+    print(f"  Params: teacher {report['teacher_params']:,}, student {report['student_params']:,}")
+    if num_val:
+        print(f"  Top-1 agreement with teacher: {report['top1_agreement']:.1%}, "
+              f"policy KL {report['mean_policy_kl']:.4f}, value MSE {report['value_mse_vs_teacher']:.4f}")
+        print(f"  Outcome MSE: teacher {report['teacher_outcome_mse']:.4f}, "
+              f"student {report['student_outcome_mse']:.4f}")
+    print(f"  Batch-1 latency: teacher {report['teacher_ms']:.2f}ms, "
+          f"student {report['student_ms']:.2f}ms ({report['speedup']:.2f}x)")
+    return student, report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    distill_student(
+        name=args[0] if len(args) > 0 else "student",
+        num_res_blocks=int(args[1]) if len(args) > 1 else 2,
+        hidden_channels=int(args[2]) if len(args) > 2 else 64,
+    )
@@ -0,0 +1,91 @@
+"""Position-keyed cache for ChessNet evaluations.
+
+Maps a position key (``Game.get_position_key()``) to the policy logits over
+that position's legal action indices plus the value estimate. Entries are
+evicted least-recently-used once the configured memory cap is exceeded.
+
+The cache knows nothing about model weights: call ``clear()`` whenever the
+model it fronts is reloaded or trained further.
+"""
+
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+# Rough per-entry bookkeeping cost (OrderedDict node, tuple, numpy headers).
+_ENTRY_OVERHEAD = 300
+
+
+class EvalCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @staticmethod
+    def _entry_size(key, indices, logits):
+        return sys.getsizeof(key) + indices.nbytes + logits.nbytes + _ENTRY_OVERHEAD
+
+    def get(self, key, legal_indices=None):
+        """Return (indices, logits, value) or None on a miss.
+
+        If legal_indices is given, an entry recorded for a different index
+        list counts as a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and legal_indices is not None:
+            if not np.array_equal(entry[0], legal_indices):
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1], entry[2]
+
+    def put(self, key, indices, logits, value):
+        indices = np.asarray(indices, dtype=np.int64)
+        logits = np.asarray(logits, dtype=np.float32)
+        size = self._entry_size(key, indices, logits)
+        if size > self.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[3]
+        self._entries[key] = (indices, logits, float(value), size)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted[3]
+            self.evictions += 1
+            self.evicted_bytes += evicted[3]
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+        }
@@ -0,0 +1,247 @@
+"""Gumbel top-k root search with sequential halving, for small simulation budgets.
+
+Following Gumbel MuZero's root procedure: sample Gumbel noise g(a) over the
+legal actions, keep the top max_considered actions by g(a) + logit(a), and
+split the simulation budget over log2(k) rounds of sequential halving. Each
+round visits every remaining candidate equally, then keeps the better half
+by g(a) + logit(a) + sigma(q(a)).
+
+There is no tree below the root. One simulation is one network evaluation:
+a candidate's first visit evaluates the position it leads to
+(q = -value); each later visit expands the opponent's next most likely
+reply and q becomes the worst value for us among the replies seen so far.
+The evaluations of one round are batched.
+
+The improved policy target is softmax(logits + sigma(completed q)), with
+unvisited actions completed by the root value; Game.get_training_example
+stores it in place of the uniform target.
+
+benchmark_gumbel() compares the chosen moves' regret against a reference
+alpha-beta search for several simulation counts and for the raw-policy
+get_model_move.
+
+Usage:
+    python -m training.gumbel [checkpoint_path]
+"""
+
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+from .eval_cache import EvalCache
+from .search import AlphaBetaSearch, PolicyPrior, child_position, fixed_positions
+
+
+def _terminal_value(game, player):
+    """Value of a finished game for player."""
+    if game.winner == "draw" or game.winner is None:
+        return 0.0
+    return 1.0 if game.winner == player else -1.0
+
+
+def sigma(q, max_visits, c_visit=50.0, c_scale=1.0):
+    """Monotone transform of values in [-1, 1] onto the logit scale."""
+    return (c_visit + max_visits) * c_scale * (np.asarray(q) + 1.0) / 2.0
+
+
+class _Candidate:
+    """A root action and what its visits have found so far."""
+
+    def __init__(self, game, action):
+        self.action = action
+        self.child = child_position(game, action)
+        self.visits = 0
+        self.q = None
+        self.exact = self.child.game_over
+        if self.exact:
+            self.q = _terminal_value(self.child, game.turn)
+        self.replies = None  # Opponent replies, most likely first
+        self.next_reply = 0
+
+
+def _batch_values(model, device, games):
+    states = np.stack([g.encode_board_state() for g in games])
+    model.eval()
+    with torch.no_grad():
+        x = torch.from_numpy(states).to(device)
+        if getattr(model, "value_only", None) is not None:
+            values = model.value_only(x)  # Skips the policy head
+        else:
+            _, values = model(x)
+    return [float(v) for v in values.reshape(-1)]
+
+
+def _visit(candidates, prior, player, batch):
+    """One visit to each candidate; returns the number of network evaluations."""
+    expand = [c for c in candidates if not c.exact and c.replies is None]
+    deepen = [c for c in candidates if not c.exact and c.replies is not None
+              and c.next_reply < len(c.replies)]
+    for c in candidates:
+        c.visits += 1
+
+    expand_actions = [c.child.get_legal_actions() for c in expand]
+    if batch and expand:
+        prior.prefetch([c.child for c in expand], expand_actions)
+    for c, actions in zip(expand, expand_actions):
+        probs = prior.priors(c.child, actions)
+        c.q = -prior.value(c.child)
+        c.replies = [actions[i] for i in np.argsort(-probs, kind="stable")]
+
+    grandchildren, owners = [], []
+    for c in deepen:
+        reply = c.replies[c.next_reply]
+        c.next_reply += 1
+        g = child_position(c.child, reply)
+        if g.game_over:
+            value = _terminal_value(g, player)
+            c.q = value if c.next_reply == 1 else min(c.q, value)
+        else:
+            grandchildren.append(g)
+            owners.append(c)
+    if grandchildren:
+        if batch:
+            values = _batch_values(prior.model, prior.device, grandchildren)
+        else:
+            values = [prior.value(g) for g in grandchildren]
+        for c, value in zip(owners, values):
+            # The first reply replaces the one-ply estimate; later ones can only lower it.
+            c.q = value if c.next_reply == 1 else min(c.q, value)
+    return len(expand) + len(grandchildren)
+
+
+def gumbel_root_search(game, model, device, num_simulations=32, max_considered=16,
+                       sample=True, c_visit=50.0, c_scale=1.0, cache=None, batch=True, rng=None):
+    """Pick a move for game with num_simulations network evaluations.
+
+    Returns a dict with the chosen action, the legal actions, the improved
+    policy over them, per-action q and visits, and the evaluations used.
+    sample=False drops the Gumbel noise (deterministic play); batch=False
+    evaluates one position at a time (for batch-1 models such as an
+    InferenceClient).
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    prior = PolicyPrior(model, device, cache if cache is not None else EvalCache())
+    actions = game.get_legal_actions()
+    indices = [game.move_to_index(*a) for a in actions]
+    logits_t, root_value = game.evaluate_legal_policy(model, device, indices, cache=prior.cache)
+    logits = logits_t.float().cpu().numpy().astype(np.float64)
+    n = len(actions)
+
+    gumbel = rng.gumbel(size=n) if sample else np.zeros(n)
+    k = min(max_considered, n, max(num_simulations, 1))
+    order = np.argsort(-(gumbel + logits), kind="stable")
+    candidates = {int(i): _Candidate(game, actions[i]) for i in order[:k]}
+    remaining = list(candidates)
+
+    evaluations = 0
+    rounds = max(1, math.ceil(math.log2(k))) if k > 1 else 0
+    for _ in range(rounds):
+        if len(remaining) == 1 or evaluations >= num_simulations:
+            break
+        per_action = max(1, num_simulations // (rounds * len(remaining)))
+        for _ in range(per_action):
+            evaluations += _visit([candidates[i] for i in remaining], prior, game.turn, batch)
+        max_visits = max(c.visits for c in candidates.values())
+        scores = {i: gumbel[i] + logits[i] + sigma(candidates[i].q, max_visits, c_visit, c_scale)
+                  for i in remaining}
+        remaining = sorted(remaining, key=lambda i: -scores[i])[:max(1, len(remaining) // 2)]
+
+    q = np.full(n, float(root_value))
+    visits = np.zeros(n, dtype=np.int64)
+    for i, c in candidates.items():
+        if c.q is not None:
+            q[i] = c.q
+        visits[i] = c.visits
+    max_visits = int(visits.max())
+    improved = logits + sigma(q, max_visits, c_visit, c_scale)
+    improved = np.exp(improved - improved.max())
+    improved /= improved.sum()
+
+    if len(remaining) > 1 or not any(visits):
+        # Budget ran out (or was zero) before one candidate was left.
+        remaining = [max(remaining, key=lambda i: gumbel[i] + logits[i] + sigma(q[i], max_visits,
+                                                                                 c_visit, c_scale))]
+    return {
+        "action": actions[remaining[0]],
+        "actions": actions,
+        "policy": improved,
+        "q": q,
+        "visits": visits,
+        "evaluations": evaluations,
+    }
+
+
+def reference_scores(game, actions, model, device=None, depth=2):
+    """Alpha-beta score of each root action, searched depth - 1 plies below it."""
+    searcher = AlphaBetaSearch(model, device, guided=False)
+    scores = []
+    for action in actions:
+        child = child_position(game, action)
+        if child.game_over or depth <= 1:
+            scores.append(-searcher._negamax(child, 0, -math.inf, math.inf, 1)[0])
+        else:
+            scores.append(-searcher.search(child, depth - 1)["score"])
+    return np.array(scores)
+
+
+def benchmark_gumbel(model, positions, simulation_counts=(4, 8, 16, 32, 64), device=None,
+                     reference_depth=2, seed=0):
+    """Mean regret / top-1 agreement against the reference search, per budget.
+
+    The first row is the raw-policy get_model_move (sample=False).
+    """
+    if device is None:
+        device = torch.device("cpu")
+    references = []
+    for game in positions:
+        actions = game.get_legal_actions()
+        references.append((actions, reference_scores(game, actions, model, device, reference_depth)))
+
+    def score_row(label, pick, budget):
+        regrets, agree, evals = [], [], []
+        t0 = time.perf_counter()
+        for game, (actions, scores) in zip(positions, references):
+            action, used = pick(game)
+            chosen = scores[actions.index(action)]
+            regrets.append(scores.max() - chosen)
+            agree.append(chosen >= scores.max() - 1e-9)
+            evals.append(used)
+        return {"mode": label, "simulations": budget, "mean_regret": float(np.mean(regrets)),
+                "top1": float(np.mean(agree)), "evaluations": float(np.mean(evals)),
+                "ms_per_move": 1000.0 * (time.perf_counter() - t0) / len(positions)}
+
+    rows = [score_row("raw_policy", lambda g: (g.get_model_move(model, device, sample=False), 1), 0)]
+    for n in simulation_counts:
+        rng = np.random.default_rng(seed)
+
+        def pick(g, n=n, rng=rng):
+            result = gumbel_root_search(g, model, device, num_simulations=n, sample=False, rng=rng)
+            return result["action"], result["evaluations"] + 1
+        rows.append(score_row("gumbel", pick, n))
+    return rows
+
+
+if __name__ == "__main__":
+    from .model import ChessNet, checkpoint_model_config
+    from .inference_model import DEFAULT_CHECKPOINT
+
+    args = sys.argv[1:]
+    checkpoint_path = args[0] if args else DEFAULT_CHECKPOINT
+    if os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location="cpu")
+        model = ChessNet(**checkpoint_model_config(checkpoint))
+        model.load_state_dict(checkpoint["model_state_dict"])
+    else:
+        print(f"No checkpoint at {checkpoint_path}; using an untrained model.")
+        model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+
+    print(f"{'mode':<11}{'sims':>5}{'regret':>9}{'top-1':>8}{'evals':>8}{'ms/move':>9}")
+    for row in benchmark_gumbel(model, fixed_positions(count=8)):
+        print(f"{row['mode']:<11}{row['simulations']:>5}{row['mean_regret']:>9.3f}"
+              f"{row['top1']:>8.1%}{row['evaluations']:>8.1f}{row['ms_per_move']:>9.1f}")
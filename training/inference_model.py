@@ -0,0 +1,168 @@
+"""Inference-optimized build of ChessNet.
+
+Folds every BatchNorm into the convolution in front of it (input layer,
+residual blocks, policy and value heads), drops the Dropout modules, switches
+weights to channels_last and compiles the result with TorchScript.
+
+The scripted artifact is cached next to the checkpoint it was built from
+(``models/chess_model_checkpoint.pt`` -> ``models/chess_model_checkpoint.inference.pt``)
+and rebuilt whenever the checkpoint is newer than the artifact.
+
+Usage:
+    python -m training.inference_model [checkpoint_path]
+"""
+
+import copy
+import os
+import sys
+
+import torch
+import torch.nn as nn
+
+from .model import ChessNet, checkpoint_model_config
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CHECKPOINT = os.path.join(_SCRIPT_DIR, '..', 'models', 'chess_model_checkpoint.pt')
+
+# ChessNet entry points besides forward() that must survive freezing.
+INFERENCE_METHODS = ["legal_policy", "value_only", "value_and_trunk", "policy_from_trunk"]
+# Plain attributes callers read off the model (Game checks policy_size to
+# pick the action space).
+INFERENCE_ATTRS = ["policy_size"]
+
+
+def fold_conv_bn(conv, bn):
+    """Return a Conv2d equivalent to ``bn(conv(x))`` in eval mode."""
+    fused = nn.Conv2d(
+        conv.in_channels, conv.out_channels, kernel_size=conv.kernel_size,
+        stride=conv.stride, padding=conv.padding, dilation=conv.dilation,
+        groups=conv.groups, bias=True,
+    )
+    scale = bn.weight.detach() / torch.sqrt(bn.running_var + bn.eps)
+    conv_bias = conv.bias.detach() if conv.bias is not None else torch.zeros_like(bn.running_mean)
+    with torch.no_grad():
+        fused.weight.copy_(conv.weight.detach() * scale.reshape(-1, 1, 1, 1))
+        fused.bias.copy_(bn.bias.detach() + (conv_bias - bn.running_mean) * scale)
+    return fused
+
+
+def fuse_for_inference(model):
+    """Return an eval-mode copy of model with BatchNorm folded and Dropout removed.
+
+    The copy is still a ChessNet, so anything that accepts the eager model
+    accepts the fused one.
+    """
+    fused = copy.deepcopy(model).cpu()
+    fused.train(False)
+
+    fused.conv_input = fold_conv_bn(fused.conv_input, fused.bn_input)
+    fused.bn_input = nn.Identity()
+    for block in fused.res_blocks:
+        block.conv1 = fold_conv_bn(block.conv1, block.bn1)
+        block.bn1 = nn.Identity()
+        block.conv2 = fold_conv_bn(block.conv2, block.bn2)
+        block.bn2 = nn.Identity()
+    fused.policy_conv = fold_conv_bn(fused.policy_conv, fused.policy_bn)
+    fused.policy_bn = nn.Identity()
+    fused.value_conv = fold_conv_bn(fused.value_conv, fused.value_bn)
+    fused.value_bn = nn.Identity()
+    fused.policy_dropout = nn.Identity()
+    fused.value_dropout = nn.Identity()
+
+    fused = fused.to(memory_format=torch.channels_last)
+    fused.train(False)
+    return fused
+
+
+def build_inference_model(model, script=True):
+    """Fuse model and, by default, compile it with TorchScript."""
+    fused = fuse_for_inference(model)
+    if not script:
+        return fused
+    return freeze_for_inference(fused)
+
+
+def freeze_for_inference(fused):
+    """Script and freeze an already fused model."""
+    scripted = torch.jit.script(fused)
+    return torch.jit.freeze(scripted, preserved_attrs=INFERENCE_METHODS + INFERENCE_ATTRS)
+
+
+def check_inference_model(model, inference_model, num_samples=16, atol=1e-4):
+    """Compare inference_model against the eager model on random positions.
+
+    Returns the largest absolute difference over policy logits and values.
+    Raises RuntimeError if it exceeds atol.
+    """
+    model = copy.deepcopy(model).cpu()
+    model.train(False)
+    gen = torch.Generator().manual_seed(0)
+    x = torch.rand(num_samples, 13, 8, 8, generator=gen)
+    x[:, :12] = (x[:, :12] > 0.9).float()  # sparse piece planes
+    x[:, 12] = torch.floor(x[:, 12] * 5)  # small gold amounts
+    with torch.no_grad():
+        ref_p, ref_v = model(x)
+        p, v = inference_model(x)
+    max_diff = max((p - ref_p).abs().max().item(), (v - ref_v).abs().max().item())
+    if max_diff > atol:
+        raise RuntimeError(
+            f"Inference model differs from eager model by {max_diff:.2e} (atol={atol:.0e})"
+        )
+    return max_diff
+
+
+def inference_path(checkpoint_path):
+    """Path of the cached inference artifact for checkpoint_path."""
+    root, _ = os.path.splitext(checkpoint_path)
+    return root + ".inference.pt"
+
+
+def _is_fresh(artifact_path, checkpoint_path):
+    return (
+        os.path.exists(artifact_path)
+        and os.path.getmtime(artifact_path) >= os.path.getmtime(checkpoint_path)
+    )
+
+
+def export_inference_model(checkpoint_path=None, output_path=None, atol=1e-4):
+    """Build, verify and save the scripted inference model for a checkpoint.
+
+    Returns the path of the saved artifact.
+    """
+    if checkpoint_path is None:
+        checkpoint_path = DEFAULT_CHECKPOINT
+    if output_path is None:
+        output_path = inference_path(checkpoint_path)
+
+    checkpoint = torch.load(checkpoint_path, map_location="cpu")
+    model = ChessNet(**checkpoint_model_config(checkpoint))
+    model.load_state_dict(checkpoint["model_state_dict"])
+    model.train(False)
+
+    inference_model = build_inference_model(model)
+    max_diff = check_inference_model(model, inference_model, atol=atol)
+    torch.jit.save(inference_model, output_path)
+    print(f"Inference model saved to {output_path} (max diff vs eager {max_diff:.2e}).")
+    return output_path
+
+
+def load_inference_model(checkpoint_path, device):
+    """Load the cached inference model for checkpoint_path, exporting it if stale.
+
+    Returns None if the checkpoint is missing or the export fails, so callers
+    can fall back to the eager model.
+    """
+    if not os.path.exists(checkpoint_path):
+        return None
+    artifact = inference_path(checkpoint_path)
+    try:
+        if not _is_fresh(artifact, checkpoint_path):
+            export_inference_model(checkpoint_path, artifact)
+        return torch.jit.load(artifact, map_location=device)
+    except Exception as e:
+        print("Inference model unavailable; using eager model.", e)
+        return None
+
+
+if __name__ == "__main__":
+    export_inference_model(sys.argv[1] if len(sys.argv) > 1 else None)
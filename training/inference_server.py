@@ -0,0 +1,240 @@
+"""Shared inference server for self-play workers.
+
+Runs one ChessNet in its own process and serves forward passes to any number
+of worker processes. Each worker owns a slot in a shared-memory block: it
+writes its encoded state into the slot, posts the slot id on the request
+queue and waits for the server to fill in the logits and value. The server
+gathers pending requests into a single batch (up to ``max_batch_size``, or
+until ``max_latency`` seconds have passed since the first request arrived),
+runs one forward pass and answers every slot in the batch.
+
+Usage:
+    server = InferenceServer(model.state_dict(), num_slots=16)
+    server.start()
+    with multiprocessing.Pool(16, initializer=init_worker_client,
+                              initargs=(server.handle(),)) as pool:
+        ...
+    server.stop()
+"""
+
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+
+STATE_SHAPE = (13, 8, 8)
+POLICY_SIZE = 8513
+
+_STATE_SIZE = int(np.prod(STATE_SHAPE))
+
+
+def _slot_size(policy_size):
+    return _STATE_SIZE + policy_size + 1
+
+
+class InferenceHandle:
+    """Everything a worker needs to talk to a running InferenceServer.
+
+    Holds multiprocessing queues, so it must reach workers through process
+    creation (``Process`` args or ``Pool`` initargs), not through ``pool.map``.
+    """
+
+    def __init__(self, shm_name, num_slots, policy_size, request_queue, response_queues, free_slots):
+        self.shm_name = shm_name
+        self.num_slots = num_slots
+        self.policy_size = policy_size
+        self.request_queue = request_queue
+        self.response_queues = response_queues
+        self.free_slots = free_slots
+
+
+def _slot_views(buf, num_slots, policy_size):
+    """Return (states, logits, values) numpy views over the shared block."""
+    block = np.ndarray((num_slots, _slot_size(policy_size)), dtype=np.float32, buffer=buf)
+    states = block[:, :_STATE_SIZE]
+    logits = block[:, _STATE_SIZE:_STATE_SIZE + policy_size]
+    values = block[:, _STATE_SIZE + policy_size:]
+    return states, logits, values
+
+
+def _serve(handle, model_state_dict, model_kwargs, max_batch_size, max_latency,
+           num_threads, request_count, batch_count):
+    """Server process main loop. Exits when it receives a ``None`` request."""
+    from training.model import ChessNet
+    from training.inference_model import build_inference_model
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    model = ChessNet(**model_kwargs)
+    model.load_state_dict(model_state_dict)
+    model.train(False)
+    model = build_inference_model(model)
+
+    shm = shared_memory.SharedMemory(name=handle.shm_name)
+    states, logits_out, values_out = _slot_views(shm.buf, handle.num_slots, handle.policy_size)
+
+    running = True
+    while running:
+        slot = handle.request_queue.get()
+        if slot is None:
+            break
+        slots = [slot]
+
+        # Keep collecting until the batch is full or the deadline passes.
+        deadline = time.monotonic() + max_latency
+        while len(slots) < max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                slot = handle.request_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if slot is None:
+                running = False
+                break
+            slots.append(slot)
+
+        batch = torch.from_numpy(states[slots].reshape(len(slots), *STATE_SHAPE))
+        with torch.no_grad():
+            logits, values = model(batch)
+        logits_out[slots] = logits.numpy()
+        values_out[slots] = values.numpy()
+
+        for s in slots:
+            handle.response_queues[s].put(True)
+
+        with request_count.get_lock():
+            request_count.value += len(slots)
+        with batch_count.get_lock():
+            batch_count.value += 1
+
+    del states, logits_out, values_out
+    shm.close()
+
+
+class InferenceServer:
+    """Owns the shared-memory block, the queues and the server process."""
+
+    def __init__(self, model_state_dict, num_slots, max_batch_size=None,
+                 max_latency=0.002, num_threads=0, model_kwargs=None):
+        self.model_state_dict = {k: v.cpu() for k, v in model_state_dict.items()}
+        self.num_slots = num_slots
+        self.max_batch_size = max_batch_size or num_slots
+        self.max_latency = max_latency
+        self.num_threads = num_threads
+        self.model_kwargs = model_kwargs or {"num_channels": 13, "policy_size": POLICY_SIZE}
+
+        self._shm = None
+        self._process = None
+        self._handle = None
+        self._request_count = multiprocessing.Value("q", 0)
+        self._batch_count = multiprocessing.Value("q", 0)
+
+    def start(self):
+        policy_size = self.model_kwargs.get("policy_size", POLICY_SIZE)
+        nbytes = self.num_slots * _slot_size(policy_size) * np.dtype(np.float32).itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+
+        free_slots = multiprocessing.Queue()
+        for i in range(self.num_slots):
+            free_slots.put(i)
+        self._handle = InferenceHandle(
+            shm_name=self._shm.name,
+            num_slots=self.num_slots,
+            policy_size=policy_size,
+            request_queue=multiprocessing.Queue(),
+            response_queues=[multiprocessing.Queue() for _ in range(self.num_slots)],
+            free_slots=free_slots,
+        )
+
+        self._process = multiprocessing.Process(
+            target=_serve,
+            args=(self._handle, self.model_state_dict, self.model_kwargs,
+                  self.max_batch_size, self.max_latency, self.num_threads,
+                  self._request_count, self._batch_count),
+            daemon=True,
+        )
+        self._process.start()
+        return self
+
+    def handle(self):
+        if self._handle is None:
+            raise RuntimeError("InferenceServer.start() must be called first.")
+        return self._handle
+
+    def stats(self):
+        """Return (requests served, batches run, mean batch size)."""
+        requests = self._request_count.value
+        batches = self._batch_count.value
+        return requests, batches, (requests / batches if batches else 0.0)
+
+    def stop(self):
+        if self._process is not None:
+            self._handle.request_queue.put(None)
+            self._process.join(timeout=10)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class InferenceClient:
+    """Model-like proxy that forwards batch-1 evaluations to the server.
+
+    Quacks like ChessNet as far as ``Game.get_model_move`` is concerned:
+    ``client.eval()`` is a no-op and ``client(x)`` returns ``(logits, value)``.
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.slot = handle.free_slots.get()
+        self._shm = shared_memory.SharedMemory(name=handle.shm_name)
+        self._states, self._logits, self._values = _slot_views(
+            self._shm.buf, handle.num_slots, handle.policy_size)
+        self._response = handle.response_queues[self.slot]
+
+    def eval(self):
+        return self
+
+    def __call__(self, state_tensor):
+        if state_tensor.shape[0] != 1:
+            raise ValueError("InferenceClient evaluates one position at a time.")
+        self._states[self.slot] = state_tensor.detach().cpu().numpy().reshape(-1)
+        self.handle.request_queue.put(self.slot)
+        self._response.get()
+        logits = torch.from_numpy(self._logits[self.slot].copy()).unsqueeze(0)
+        value = torch.from_numpy(self._values[self.slot].copy()).unsqueeze(0)
+        return logits, value
+
+    def close(self):
+        self._states = self._logits = self._values = None
+        self._shm.close()
+        self.handle.free_slots.put(self.slot)
+
+
+# Per-process client used by pool workers (set by init_worker_client).
+_worker_client = None
+
+
+def init_worker_client(handle):
+    """``multiprocessing.Pool`` initializer: claim a slot for this worker."""
+    global _worker_client
+    _worker_client = InferenceClient(handle)
+
+
+def get_worker_client():
+    return _worker_client
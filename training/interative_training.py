@@ -5,9 +5,11 @@ import time
 import torch
 from torch.utils.data import DataLoader
 
-from .selfplay import generate_selfplay_data
+from .selfplay import SelfPlayPool, generate_selfplay_data
 from .dataset import ChessDataset
-from .model import ChessNet
+from .action_space import COMPACT_POLICY_SIZE
+from .model import ChessNet, checkpoint_model_config
+from .train import train_step
 
 
 def _stockfish_depth(iteration):
@@ -30,19 +32,35 @@ def iterative_training(
     num_workers=16,
     stockfish_ratio=0.5,
     stockfish_depth_schedule=None,
+    inference_server=False,
+    quantize=None,
+    policy_head="dense",
+    compact_actions=False,
+    selfplay_student=None,
+    student_iterations=5,
+    adjudication=None,
+    lockstep_games=4,
+    seed=None,
+    coordinator_address=None,
 ):
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     print(f"Training device: {device}")
-    model = ChessNet(num_channels=13, policy_size=8513).to(device)
-    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
-
     script_dir = os.path.dirname(os.path.abspath(__file__))
     checkpoint_path = os.path.join(script_dir, '..', 'models', 'chess_model_checkpoint.pt')
     checkpoint_dir = os.path.dirname(checkpoint_path)
 
-    start_iteration = 0
+    checkpoint = None
+    policy_size = COMPACT_POLICY_SIZE if compact_actions else 8513
+    model_config = {"num_channels": 13, "policy_size": policy_size, "policy_head": policy_head}
     if os.path.exists(checkpoint_path):
         checkpoint = torch.load(checkpoint_path, map_location=device)
+        # A resumed run keeps the architecture it was started with.
+        model_config = checkpoint_model_config(checkpoint)
+    model = ChessNet(**model_config).to(device)
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+
+    start_iteration = 0
+    if checkpoint is not None:
         model.load_state_dict(checkpoint["model_state_dict"])
         optimizer.load_state_dict(checkpoint["optimizer_state_dict"])
         start_iteration = checkpoint.get("iteration", -1) + 1
@@ -54,59 +72,83 @@ def iterative_training(
     if stockfish_depth_schedule is None:
         stockfish_depth_schedule = _stockfish_depth
 
+    # Optional distilled student (training/distill.py) that plays the
+    # self-play games of the first student_iterations iterations, faster.
+    student = None
+    if selfplay_student is not None:
+        from src.ai import resolve_checkpoint
+        student_checkpoint = torch.load(resolve_checkpoint(selfplay_student), map_location=device)
+        student = ChessNet(**checkpoint_model_config(student_checkpoint)).to(device)
+        student.load_state_dict(student_checkpoint["model_state_dict"])
+        if student.policy_size != model.policy_size:
+            raise ValueError("Self-play student must use the same action space as the model.")
+
     end_iteration = start_iteration + num_iterations
-    for iteration in range(start_iteration, end_iteration):
-        # === Self-play phase ===
-        sf_depth = stockfish_depth_schedule(iteration)
-        sf_info = f", stockfish={stockfish_ratio:.0%} depth={sf_depth}" if stockfish_ratio > 0 else ""
-        print(f"\n=== Iteration {iteration}: Generating {games_per_iter} games ({num_workers} workers{sf_info}) ===")
-        t0 = time.time()
-        generate_selfplay_data(
-            num_games=games_per_iter, model=model, device=device,
-            iteration=iteration, num_workers=num_workers,
-            stockfish_ratio=stockfish_ratio, stockfish_depth=sf_depth,
-        )
-        selfplay_time = time.time() - t0
-        print(f"Self-play took {selfplay_time:.1f}s")
-
-        # === Training phase ===
-        print(f"=== Iteration {iteration}: Training on {device} ===")
-        t0 = time.time()
-        dataset = ChessDataset(augment=True)
-        dataloader = DataLoader(
-            dataset, batch_size=batch_size, shuffle=True,
-            num_workers=4, pin_memory=(device.type != "cpu"),
-        )
-
-        model.train()
-        for epoch in range(epochs_per_iter):
-            epoch_loss = 0.0
-            for batch_idx, (states, policy_targets, value_targets) in enumerate(dataloader):
-                states = states.to(device)
-                policy_targets = policy_targets.to(device)
-                value_targets = value_targets.to(device)
-
-                optimizer.zero_grad()
-                policy_pred, value_pred = model(states)
-                log_probs = torch.nn.functional.log_softmax(policy_pred, dim=1)
-                loss_policy = -torch.sum(policy_targets * log_probs) / policy_targets.shape[0]
-                loss_value = torch.nn.functional.mse_loss(value_pred, value_targets)
-                loss = loss_policy + loss_value
-                loss.backward()
-                optimizer.step()
-                epoch_loss += loss.item()
-            avg_loss = epoch_loss / max(len(dataloader), 1)
-            print(f"  Epoch {epoch} avg loss: {avg_loss:.6f}")
-
-        train_time = time.time() - t0
-        print(f"Training took {train_time:.1f}s")
-
-        torch.save({
-            'iteration': iteration,
-            'model_state_dict': model.state_dict(),
-            'optimizer_state_dict': optimizer.state_dict(),
-        }, checkpoint_path)
-        print(f"Checkpoint saved. (selfplay={selfplay_time:.0f}s, train={train_time:.0f}s)")
+    # Self-play workers stay alive for the whole run (training/selfplay.py
+    # SelfPlayPool); each iteration only ships them the new weights.
+    # With coordinator_address, worker daemons on any number of machines
+    # (training/coordinator.py) play the games instead.
+    selfplay_pool = None
+    if coordinator_address is not None:
+        from .coordinator import Coordinator
+        selfplay_pool = Coordinator(coordinator_address).start()
+        print(f"Self-play coordinator listening on {selfplay_pool.address[0]}:{selfplay_pool.address[1]}")
+    elif num_workers > 0 and not inference_server:
+        selfplay_pool = SelfPlayPool(num_workers).start()
+
+    try:
+        for iteration in range(start_iteration, end_iteration):
+            # === Self-play phase ===
+            sf_depth = stockfish_depth_schedule(iteration)
+            sf_info = f", stockfish={stockfish_ratio:.0%} depth={sf_depth}" if stockfish_ratio > 0 else ""
+            print(f"\n=== Iteration {iteration}: Generating {games_per_iter} games ({num_workers} workers{sf_info}) ===")
+            t0 = time.time()
+            selfplay_model = model
+            if student is not None and iteration - start_iteration < student_iterations:
+                selfplay_model = student
+                print(f"Self-play with student {selfplay_student}")
+            generate_selfplay_data(
+                num_games=games_per_iter, model=selfplay_model, device=device,
+                iteration=iteration, num_workers=num_workers,
+                stockfish_ratio=stockfish_ratio, stockfish_depth=sf_depth,
+                inference_server=inference_server, quantize=quantize,
+                pool=selfplay_pool, adjudication=adjudication,
+                game_log=os.path.join(checkpoint_dir, "selfplay_games.jsonl"),
+                lockstep_games=lockstep_games, seed=seed,
+            )
+            selfplay_time = time.time() - t0
+            print(f"Self-play took {selfplay_time:.1f}s")
+
+            # === Training phase ===
+            print(f"=== Iteration {iteration}: Training on {device} ===")
+            t0 = time.time()
+            dataset = ChessDataset(augment=True, policy_size=model.policy_size)
+            dataloader = DataLoader(
+                dataset, batch_size=batch_size, shuffle=True,
+                num_workers=4, pin_memory=(device.type != "cpu"),
+            )
+
+            model.train()
+            for epoch in range(epochs_per_iter):
+                epoch_loss = 0.0
+                for states, policy_targets, value_targets in dataloader:
+                    epoch_loss += train_step(model, optimizer, states, policy_targets, value_targets, device)
+                avg_loss = epoch_loss / max(len(dataloader), 1)
+                print(f"  Epoch {epoch} avg loss: {avg_loss:.6f}")
+
+            train_time = time.time() - t0
+            print(f"Training took {train_time:.1f}s")
+
+            torch.save({
+                'iteration': iteration,
+                'model_state_dict': model.state_dict(),
+                'optimizer_state_dict': optimizer.state_dict(),
+                'model_config': model.config,
+            }, checkpoint_path)
+            print(f"Checkpoint saved. (selfplay={selfplay_time:.0f}s, train={train_time:.0f}s)")
+    finally:
+        if selfplay_pool is not None:
+            selfplay_pool.stop()
 
     print(f"Iterative training complete. Ran iterations {start_iteration}-{end_iteration - 1}.")
 
@@ -0,0 +1,126 @@
+"""Lazy-SMP alpha-beta: several processes search one root through a shared table.
+
+The main process runs the normal iterative-deepening search. Each helper
+process searches the same position independently, alternating between the
+target depth and one ply deeper and starting the root moves at a different
+offset. No work is split explicitly: the helpers only fill the shared
+TranspositionTable (training/transposition.py) with bounds and best moves
+that let the main search cut off or order earlier. The answer is always
+the main search's; helpers are stopped when it finishes.
+
+benchmark_lazy_smp() reports time to depth and speedup for 1..N processes
+on fixed positions.
+
+Usage:
+    python -m training.lazy_smp [depth] [max_processes] [checkpoint_path]
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+import torch
+
+from .search import AlphaBetaSearch, SearchAborted, fixed_positions
+from .transposition import TranspositionTable
+
+
+def _helper(game, depth, helper_id, table_name, table_entries, stop,
+            model_state_dict, model_config, search_kwargs):
+    torch.set_num_threads(1)
+    model = None
+    if model_state_dict is not None:
+        from .model import ChessNet
+        model = ChessNet(**model_config)
+        model.load_state_dict(model_state_dict)
+        model.train(False)
+    table = TranspositionTable.attach(table_name, table_entries)
+    searcher = AlphaBetaSearch(model, table=table, stop=stop, root_shift=helper_id, **search_kwargs)
+    try:
+        while not stop.is_set():
+            searcher.search(game, depth + helper_id % 2)
+            depth += 1
+    except SearchAborted:
+        pass
+    finally:
+        table.close()
+
+
+def lazy_smp_search(game, depth, num_processes=2, model=None, table_entries=1 << 18,
+                    **search_kwargs):
+    """Search game to depth with num_processes processes sharing one table.
+
+    Returns the main search's result dict (see AlphaBetaSearch.search) plus
+    the table's hit rate as seen from the main process.
+    """
+    table = TranspositionTable(table_entries)
+    stop = multiprocessing.Event()
+    state_dict = config = None
+    if model is not None:
+        state_dict = {k: v.cpu() for k, v in model.state_dict().items()}
+        config = model.config
+    helpers = [
+        multiprocessing.Process(
+            target=_helper,
+            args=(game, depth, i, table.name, table_entries, stop, state_dict, config, search_kwargs),
+            daemon=True,
+        )
+        for i in range(1, num_processes)
+    ]
+    try:
+        for p in helpers:
+            p.start()
+        searcher = AlphaBetaSearch(model, table=table, **search_kwargs)
+        result = searcher.search(game, depth)
+        result["table_hit_rate"] = table.hits / table.probes if table.probes else 0.0
+    finally:
+        stop.set()
+        for p in helpers:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+        table.close()
+        table.unlink()
+    return result
+
+
+def benchmark_lazy_smp(positions, depth=3, process_counts=(1, 2, 4), model=None, **search_kwargs):
+    """Time to depth per process count; speedup is relative to the first count."""
+    rows = []
+    for n in process_counts:
+        seconds, nodes = 0.0, 0
+        for game in positions:
+            t0 = time.perf_counter()
+            result = lazy_smp_search(game, depth, num_processes=n, model=model, **search_kwargs)
+            seconds += time.perf_counter() - t0
+            nodes += result["nodes"]
+        rows.append({"processes": n, "seconds": seconds, "main_nodes": nodes})
+    for row in rows:
+        row["speedup"] = rows[0]["seconds"] / row["seconds"] if row["seconds"] > 0 else 0.0
+    return rows
+
+
+if __name__ == "__main__":
+    from .model import ChessNet, checkpoint_model_config
+    from .inference_model import DEFAULT_CHECKPOINT
+
+    args = sys.argv[1:]
+    depth = int(args[0]) if len(args) > 0 else 3
+    max_processes = int(args[1]) if len(args) > 1 else min(8, os.cpu_count() or 1)
+    checkpoint_path = args[2] if len(args) > 2 else DEFAULT_CHECKPOINT
+    model = None
+    if os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location="cpu")
+        model = ChessNet(**checkpoint_model_config(checkpoint))
+        model.load_state_dict(checkpoint["model_state_dict"])
+        model.train(False)
+    else:
+        print(f"No checkpoint at {checkpoint_path}; searching on material.")
+
+    counts = [1]
+    while counts[-1] * 2 <= max_processes:
+        counts.append(counts[-1] * 2)
+    print(f"{'processes':>9}{'seconds':>10}{'main nodes':>12}{'speedup':>9}")
+    for row in benchmark_lazy_smp(fixed_positions(), depth, counts, model):
+        print(f"{row['processes']:>9}{row['seconds']:>10.2f}{row['main_nodes']:>12}{row['speedup']:>8.2f}x")
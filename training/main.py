@@ -7,7 +7,7 @@ from PyQt5.QtCore import QThread, pyqtSignal
 # Import your training components.
 from .selfplay import generate_selfplay_data
 from .dataset import ChessDataset
-from .model import ChessNet
+from .model import ChessNet, checkpoint_model_config
 
 # Worker thread that runs training.
 class TrainingWorker(QThread):
@@ -25,15 +25,19 @@ class TrainingWorker(QThread):
 
     def run(self):
         device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model = ChessNet(num_channels=13, policy_size=8513).to(device)
-        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
-        
         script_dir = os.path.dirname(os.path.abspath(__file__))
         checkpoint_path = os.path.join(script_dir, '..', 'models', 'chess_model_checkpoint.pt')
         checkpoint_dir = os.path.dirname(checkpoint_path)
         
+        checkpoint = None
+        model_config = {"num_channels": 13, "policy_size": 8513}
         if os.path.exists(checkpoint_path):
             checkpoint = torch.load(checkpoint_path, map_location=device)
+            model_config = checkpoint_model_config(checkpoint)
+        model = ChessNet(**model_config).to(device)
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+        
+        if checkpoint is not None:
             model.load_state_dict(checkpoint["model_state_dict"])
             optimizer.load_state_dict(checkpoint["optimizer_state_dict"])
             self.log_signal.emit(f"Loaded model and optimizer from {checkpoint_path}")
@@ -63,7 +67,7 @@ class TrainingWorker(QThread):
             
             self.log_signal.emit(f"=== Iteration {iteration}: Training model ===")
             # Load newly generated data.
-            dataset = ChessDataset(augment=True)  # Loads training_data.npz.
+            dataset = ChessDataset(augment=True, policy_size=model.policy_size)  # Loads training_data.npz.
             dataloader = torch.utils.data.DataLoader(dataset, batch_size=self.batch_size, shuffle=True)
             
             model.train()
@@ -107,6 +111,7 @@ class TrainingWorker(QThread):
                 'iteration': iteration,
                 'model_state_dict': model.state_dict(),
                 'optimizer_state_dict': optimizer.state_dict(),
+                'model_config': model.config,
             }, checkpoint_path)
             self.log_signal.emit(f"Iteration {iteration} checkpoint saved.")
         
@@ -1,8 +1,67 @@
 # training/model.py
+from typing import Optional
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+from .action_space import COMPACT_POLICY_SIZE, COMPACT_TO_LEGACY, MOVE_OFFSETS, NUM_PURCHASE_TYPES
+
+# Constructor arguments for a model when a checkpoint doesn't record them
+# (checkpoints written before policy_head existed all use the dense head).
+DEFAULT_MODEL_CONFIG = {"num_channels": 13, "policy_size": 8513}
+
+POLICY_HEADS = ("dense", "conv")
+
+# Factorized ("conv") policy head layout: one plane per MOVE_OFFSETS entry
+# for moves, the same again for gold transfers, then one plane per
+# purchasable piece type.
+NUM_POLICY_PLANES = 2 * len(MOVE_OFFSETS) + NUM_PURCHASE_TYPES
+# Logit given to action indices the conv head cannot express (e.g. a1->b3
+# isn't a move any piece can make). Finite, so 0 * log_softmax stays 0.
+UNREACHABLE_LOGIT = -50.0
+
+
+def checkpoint_model_config(checkpoint):
+    """ChessNet constructor kwargs recorded in a checkpoint dict."""
+    return dict(checkpoint.get("model_config", DEFAULT_MODEL_CONFIG))
+
+
+def policy_gather_index(board_size=8):
+    """Map each flat action index to its slot in the conv head's output.
+
+    The conv head produces NUM_POLICY_PLANES planes (flattened channel-major,
+    plane * 64 + from_square), then the collect_gold scalar, then a constant
+    UNREACHABLE_LOGIT slot. Entry i of the returned tensor says which of
+    those produces the logit for action index i in the 8513-slot space used
+    by Game.move_to_index.
+    """
+    squares = board_size * board_size
+    num_offsets = len(MOVE_OFFSETS)
+    collect_slot = NUM_POLICY_PLANES * squares
+    unreachable_slot = collect_slot + 1
+
+    purchase_start = squares * squares + 1
+    transfer_start = purchase_start + NUM_PURCHASE_TYPES * squares
+    policy_size = transfer_start + squares * squares
+    index = torch.full((policy_size,), unreachable_slot, dtype=torch.long)
+
+    for sr in range(board_size):
+        for sc in range(board_size):
+            src = sr * board_size + sc
+            for k, (dr, dc) in enumerate(MOVE_OFFSETS):
+                dr, dc = sr + dr, sc + dc
+                if not (0 <= dr < board_size and 0 <= dc < board_size):
+                    continue
+                dst = dr * board_size + dc
+                index[src * squares + dst] = k * squares + src
+                index[transfer_start + src * squares + dst] = (num_offsets + k) * squares + src
+    index[squares * squares] = collect_slot
+    for t in range(NUM_PURCHASE_TYPES):
+        for sq in range(squares):
+            index[purchase_start + t * squares + sq] = (2 * num_offsets + t) * squares + sq
+    return index
+
 
 class ResidualBlock(nn.Module):
     def __init__(self, channels):
@@ -21,8 +80,24 @@ class ResidualBlock(nn.Module):
 
 
 class ChessNet(nn.Module):
-    def __init__(self, board_size=8, num_channels=13, policy_size=8513, num_res_blocks=4, hidden_channels=128):
+    def __init__(self, board_size=8, num_channels=13, policy_size=8513, num_res_blocks=4, hidden_channels=128,
+                 policy_head="dense"):
         super().__init__()
+        if policy_head not in POLICY_HEADS:
+            raise ValueError(f"Unknown policy head: {policy_head}")
+        # Saved with checkpoints so loaders can rebuild the same architecture.
+        self.config = {
+            "board_size": board_size,
+            "num_channels": num_channels,
+            "policy_size": policy_size,
+            "num_res_blocks": num_res_blocks,
+            "hidden_channels": hidden_channels,
+            "policy_head": policy_head,
+        }
+        # Number of policy logits: 8513 (legacy action space) or
+        # COMPACT_POLICY_SIZE (see training/action_space.py).
+        self.policy_size = policy_size
+
         # Initial convolution
         self.conv_input = nn.Conv2d(num_channels, hidden_channels, kernel_size=3, padding=1, bias=False)
         self.bn_input = nn.BatchNorm2d(hidden_channels)
@@ -36,7 +111,20 @@ class ChessNet(nn.Module):
         self.policy_conv = nn.Conv2d(hidden_channels, 32, kernel_size=1, bias=False)
         self.policy_bn = nn.BatchNorm2d(32)
         self.policy_dropout = nn.Dropout(0.3)
-        self.policy_fc = nn.Linear(32 * board_size * board_size, policy_size)
+        if policy_head == "dense":
+            self.policy_fc = nn.Linear(32 * board_size * board_size, policy_size)
+        else:
+            # Factorized head: per-square logits for each action plane plus
+            # a scalar for collect_gold, gathered into the flat action space.
+            self.policy_planes = nn.Conv2d(32, NUM_POLICY_PLANES, kernel_size=1)
+            self.policy_gold = nn.Linear(32, 1)
+            gather = policy_gather_index(board_size)
+            if policy_size == COMPACT_POLICY_SIZE:
+                gather = gather[torch.from_numpy(COMPACT_TO_LEGACY)]
+            elif gather.numel() != policy_size:
+                raise ValueError(f"conv policy head needs policy_size={gather.numel()} or {COMPACT_POLICY_SIZE}")
+            self.register_buffer("policy_gather", gather, persistent=False)
+            self.unreachable_logit = UNREACHABLE_LOGIT
 
         # Value head
         self.value_conv = nn.Conv2d(hidden_channels, 4, kernel_size=1, bias=False)
@@ -45,22 +133,70 @@ class ChessNet(nn.Module):
         self.value_dropout = nn.Dropout(0.3)
         self.value_fc2 = nn.Linear(64, 1)
 
-    def forward(self, x):
-        # Shared trunk
+    def trunk(self, x):
+        """Shared trunk: input convolution and residual tower."""
         x = F.relu(self.bn_input(self.conv_input(x)))
-        x = self.res_blocks(x)
+        return self.res_blocks(x)
 
-        # Policy head
-        p = F.relu(self.policy_bn(self.policy_conv(x)))
-        p = p.view(p.size(0), -1)
-        p = self.policy_dropout(p)
-        p = self.policy_fc(p)
+    def policy_features(self, h):
+        """Policy head up to (not including) policy_fc / policy_planes."""
+        p = F.relu(self.policy_bn(self.policy_conv(h)))
+        if not hasattr(self, "policy_planes"):
+            p = torch.flatten(p, 1)
+        return self.policy_dropout(p)
 
-        # Value head
-        v = F.relu(self.value_bn(self.value_conv(x)))
-        v = v.view(v.size(0), -1)
+    def value_head(self, h):
+        v = F.relu(self.value_bn(self.value_conv(h)))
+        v = torch.flatten(v, 1)
         v = F.relu(self.value_fc1(v))
         v = self.value_dropout(v)
-        v = torch.tanh(self.value_fc2(v))
+        return torch.tanh(self.value_fc2(v))
 
+    def forward(self, x):
+        h = self.trunk(x)
+        p = self.policy_from_trunk(h, None)
+        v = self.value_head(h)
         return p, v
+
+    @torch.jit.export
+    def legal_policy(self, x, legal_indices):
+        """Policy logits at legal_indices only, plus the value.
+
+        With the dense head, multiplies the policy features by just the
+        policy_fc rows we need instead of computing all policy_size logits.
+        """
+        h = self.trunk(x)
+        return self.policy_from_trunk(h, legal_indices), self.value_head(h)
+
+    @torch.jit.export
+    def value_only(self, x):
+        """Value estimate without running the policy head at all."""
+        return self.value_head(self.trunk(x))
+
+    @torch.jit.export
+    def value_and_trunk(self, x):
+        """Value plus the trunk features, for search leaves.
+
+        Keep the returned trunk for nodes that may be expanded later and pass
+        it to policy_from_trunk() then, so the trunk is never recomputed.
+        """
+        h = self.trunk(x)
+        return self.value_head(h), h
+
+    @torch.jit.export
+    def policy_from_trunk(self, h, legal_indices: Optional[torch.Tensor] = None):
+        """Policy logits from cached trunk features (all, or legal_indices only)."""
+        features = self.policy_features(h)
+        if hasattr(self, "policy_planes"):
+            planes = torch.flatten(self.policy_planes(features), 1)
+            gold = self.policy_gold(torch.mean(features, dim=(2, 3)))
+            slots = F.pad(torch.cat([planes, gold], dim=1), (0, 1), value=self.unreachable_logit)
+            gather = self.policy_gather
+            if legal_indices is not None:
+                gather = gather.index_select(0, legal_indices)
+            return slots.index_select(1, gather)
+        if legal_indices is None:
+            return self.policy_fc(features)
+        weight = self.policy_fc.weight.index_select(0, legal_indices)
+        bias = self.policy_fc.bias.index_select(0, legal_indices)
+        return F.linear(features, weight, bias)
@@ -0,0 +1,334 @@
+"""NNUE-style value evaluator for CPU search.
+
+The first layer (the "feature transformer") is linear in the 13x8x8 input
+that Game.encode_board_state produces: one feature per (piece plane,
+square) plus one per gold square, scaled by the gold amount. Its output,
+the accumulator, therefore changes by a handful of weight rows when a piece
+moves, is captured, promoted or purchased, or when gold changes hands, and
+NNUEEvaluator updates it in place instead of re-running a network. Only the
+tiny 128 -> 32 -> 1 head runs per evaluation.
+
+The network is distilled from ChessNet's value head on the replay buffer
+(distill_nnue), and evaluated from NumPy, so search needs no torch calls.
+
+Usage:
+    python -m training.nnue [data_path] [teacher_checkpoint] [output_path]
+"""
+
+import copy
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from .inference_model import DEFAULT_CHECKPOINT
+from .model import ChessNet, checkpoint_model_config
+
+BOARD_SIZE = 8
+_SQUARES = BOARD_SIZE * BOARD_SIZE
+GOLD_PLANE = 12
+NUM_FEATURES = 13 * _SQUARES
+
+# Same plane order as Game.encode_board_state.
+PIECE_PLANES = {
+    ('white', 'K'): 0, ('white', 'Q'): 1, ('white', 'R'): 2,
+    ('white', 'B'): 3, ('white', 'N'): 4, ('white', 'P'): 5,
+    ('black', 'K'): 6, ('black', 'Q'): 7, ('black', 'R'): 8,
+    ('black', 'B'): 9, ('black', 'N'): 10, ('black', 'P'): 11,
+}
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_DATA_PATH = os.path.join(_SCRIPT_DIR, '..', 'training_data.npz')
+DEFAULT_NNUE_PATH = os.path.join(_SCRIPT_DIR, '..', 'models', 'nnue.pt')
+
+
+class NNUE(nn.Module):
+    def __init__(self, accumulator_size=128, hidden_size=32):
+        super().__init__()
+        self.config = {"accumulator_size": accumulator_size, "hidden_size": hidden_size}
+        self.ft = nn.Linear(NUM_FEATURES, accumulator_size)
+        self.fc1 = nn.Linear(accumulator_size, hidden_size)
+        self.fc2 = nn.Linear(hidden_size, 1)
+
+    def forward(self, x):
+        return self.head(self.ft(torch.flatten(x, 1)))
+
+    def head(self, accumulator):
+        h = torch.clamp(accumulator, 0.0, 1.0)
+        h = torch.clamp(self.fc1(h), 0.0, 1.0)
+        return torch.tanh(self.fc2(h))
+
+
+def square_state(board_rows, sq):
+    """(piece plane or None, gold) on flat square sq."""
+    piece = board_rows[sq // BOARD_SIZE][sq % BOARD_SIZE]
+    if piece is None:
+        return None, 0
+    return PIECE_PLANES.get((piece.color, piece.type)), piece.gold
+
+
+def touched_squares(game, action):
+    """Flat squares whose piece or gold the action can change."""
+    action_type, src, dst, _ = action
+    squares = []
+    if action_type == "move":
+        squares = [src, dst]
+        mover = game.board[src[0]][src[1]]
+        if mover is not None and mover.type == 'P' and game.en_passant is not None \
+                and tuple(dst) == tuple(game.en_passant[0]):
+            squares.append(game.en_passant[1])
+    elif action_type == "collect_gold":
+        squares = [src]
+    elif action_type == "purchase":
+        squares = [dst]
+        for r in range(BOARD_SIZE):  # the king pays for the piece
+            for c in range(BOARD_SIZE):
+                piece = game.board[r][c]
+                if piece is not None and piece.color == game.turn and piece.type == 'K':
+                    squares.append((r, c))
+    elif action_type == "transfer_gold":
+        squares = [src, dst]
+    return [r * BOARD_SIZE + c for r, c in squares]
+
+
+class NNUEEvaluator:
+    """NumPy NNUE inference with an incrementally updated accumulator.
+
+    Typical search use:
+        ev.refresh(game.board)
+        ev.make_move(sim, action)   # applies action, updates accumulator
+        score = ev.evaluate()
+        ev.undo()                   # restores the accumulator only
+    """
+
+    def __init__(self, model):
+        model = model.cpu()
+        # Feature rows contiguous, so each update is one row add.
+        self.ft_weight = model.ft.weight.detach().numpy().T.astype(np.float32).copy()
+        self.ft_bias = model.ft.bias.detach().numpy().astype(np.float32).copy()
+        self.fc1_weight = model.fc1.weight.detach().numpy().astype(np.float32).copy()
+        self.fc1_bias = model.fc1.bias.detach().numpy().astype(np.float32).copy()
+        self.fc2_weight = model.fc2.weight.detach().numpy()[0].astype(np.float32).copy()
+        self.fc2_bias = float(model.fc2.bias.detach().numpy()[0])
+        self.accumulator = self.ft_bias.copy()
+        self._stack = []
+
+    @classmethod
+    def load(cls, path=None):
+        if path is None:
+            path = DEFAULT_NNUE_PATH
+        checkpoint = torch.load(path, map_location="cpu")
+        model = NNUE(**checkpoint.get("nnue_config", {}))
+        model.load_state_dict(checkpoint["nnue_state_dict"])
+        return cls(model)
+
+    def refresh(self, board_rows):
+        """Recompute the accumulator from scratch and clear the undo stack."""
+        acc = self.ft_bias.copy()
+        for sq in range(_SQUARES):
+            plane, gold = square_state(board_rows, sq)
+            if plane is not None:
+                acc += self.ft_weight[plane * _SQUARES + sq]
+            if gold:
+                acc += gold * self.ft_weight[GOLD_PLANE * _SQUARES + sq]
+        self.accumulator = acc
+        self._stack = []
+
+    def snapshot(self, board_rows, squares):
+        """Record the state of squares before they change (see update)."""
+        return [(sq,) + square_state(board_rows, sq) for sq in squares]
+
+    def update(self, board_rows, before):
+        """Apply the feature deltas between a snapshot and the board now."""
+        self._stack.append(self.accumulator)
+        acc = self.accumulator.copy()
+        w = self.ft_weight
+        for sq, old_plane, old_gold in before:
+            new_plane, new_gold = square_state(board_rows, sq)
+            if new_plane != old_plane:
+                if old_plane is not None:
+                    acc -= w[old_plane * _SQUARES + sq]
+                if new_plane is not None:
+                    acc += w[new_plane * _SQUARES + sq]
+            if new_gold != old_gold:
+                acc += (new_gold - old_gold) * w[GOLD_PLANE * _SQUARES + sq]
+        self.accumulator = acc
+
+    def make_move(self, game, action, simulate=True):
+        """Apply action to game (via Game.apply_move) and update the accumulator."""
+        before = self.snapshot(game.board, touched_squares(game, action))
+        game.apply_move(action, simulate=simulate)
+        self.update(game.board, before)
+
+    def undo(self):
+        self.accumulator = self._stack.pop()
+
+    def evaluate(self):
+        """Value of the current accumulator, in [-1, 1] like ChessNet's value."""
+        h = np.clip(self.accumulator, 0.0, 1.0)
+        h = np.clip(self.fc1_weight @ h + self.fc1_bias, 0.0, 1.0)
+        return float(np.tanh(h @ self.fc2_weight + self.fc2_bias))
+
+
+def teacher_values(teacher, states, batch_size=256):
+    """ChessNet value outputs for encoded states, as a (N, 1) float32 array."""
+    teacher.train(False)
+    values = []
+    with torch.no_grad():
+        for start in range(0, len(states), batch_size):
+            batch = torch.from_numpy(np.asarray(states[start:start + batch_size], dtype=np.float32))
+            if getattr(teacher, "value_only", None) is not None:
+                values.append(teacher.value_only(batch).numpy())
+            else:
+                values.append(teacher(batch)[1].numpy())
+    return np.concatenate(values, axis=0).astype(np.float32)
+
+
+def _load_teacher(checkpoint_path):
+    if os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location="cpu")
+        teacher = ChessNet(**checkpoint_model_config(checkpoint))
+        teacher.load_state_dict(checkpoint["model_state_dict"])
+    else:
+        print(f"No checkpoint at {checkpoint_path}; distilling from an untrained model.")
+        teacher = ChessNet(num_channels=13, policy_size=8513)
+    teacher.train(False)
+    return teacher
+
+
+def distill_nnue(data_path=None, teacher_checkpoint=None, output_path=None, teacher=None,
+                 epochs=20, batch_size=256, lr=1e-3, accumulator_size=128, hidden_size=32,
+                 val_fraction=0.1):
+    """Train an NNUE to match the teacher's value on the replay buffer states.
+
+    Each state is used as stored and mirrored left-right (the same board
+    augmentation ChessDataset uses). Returns (model, report).
+    """
+    if data_path is None:
+        data_path = _DATA_PATH
+    if teacher_checkpoint is None:
+        teacher_checkpoint = DEFAULT_CHECKPOINT
+    if output_path is None:
+        output_path = DEFAULT_NNUE_PATH
+    if teacher is None:
+        teacher = _load_teacher(teacher_checkpoint)
+
+    data = np.load(data_path)
+    states = data['states'].astype(np.float32)
+    data.close()
+    states = np.concatenate([states, np.flip(states, axis=3)], axis=0)
+    targets = teacher_values(teacher, states)
+
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(states))
+    num_val = max(1, int(len(states) * val_fraction)) if len(states) > 1 else 0
+    val_idx, train_idx = order[:num_val], order[num_val:]
+    x_train = torch.from_numpy(states[train_idx])
+    y_train = torch.from_numpy(targets[train_idx])
+
+    torch.manual_seed(0)
+    model = NNUE(accumulator_size, hidden_size)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    loss_fn = nn.MSELoss()
+    for epoch in range(epochs):
+        model.train()
+        perm = torch.randperm(len(x_train))
+        epoch_loss = 0.0
+        for start in range(0, len(perm), batch_size):
+            idx = perm[start:start + batch_size]
+            loss = loss_fn(model(x_train[idx]), y_train[idx])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            epoch_loss += loss.item() * len(idx)
+        if epoch == 0 or epoch == epochs - 1:
+            print(f"  Epoch {epoch}: train MSE {epoch_loss / max(len(perm), 1):.5f}")
+
+    model.train(False)
+    report = {"train_examples": len(train_idx), "val_examples": num_val}
+    if num_val:
+        with torch.no_grad():
+            pred = model(torch.from_numpy(states[val_idx])).numpy()
+        report["val_mse"] = float(np.mean((pred - targets[val_idx]) ** 2))
+        report["teacher_value_var"] = float(np.var(targets[val_idx]))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    torch.save({
+        "nnue_state_dict": model.state_dict(),
+        "nnue_config": model.config,
+        "teacher_checkpoint": teacher_checkpoint,
+        "report": report,
+    }, output_path)
+    print(f"NNUE saved to {output_path}: {report}")
+    return model, report
+
+
+def benchmark_nnue(evaluator, game, num_moves=200, teacher=None):
+    """Time NNUE evaluation along a random line of play from game's position.
+
+    "incremental" is update + evaluate + undo for one action (the per-node
+    cost inside search, move generation excluded), "refresh" recomputes the
+    accumulator from the board. With a teacher, its batch-1 value_only time
+    is reported for comparison. Returns evaluations per second.
+    """
+    sim = game.copy_for_simulation()
+    steps = []
+    for _ in range(num_moves):
+        legal = sim.get_legal_actions()
+        if not legal or sim.game_over:
+            break
+        action = legal[np.random.randint(len(legal))]
+        before = evaluator.snapshot(sim.board, touched_squares(sim, action))
+        sim.apply_move(action)
+        steps.append((before, copy.deepcopy(sim.board), sim.encode_board_state()))
+
+    n = max(len(steps), 1)
+    t0 = time.perf_counter()
+    for before, board_rows, _ in steps:
+        evaluator.update(board_rows, before)
+        evaluator.evaluate()
+        evaluator.undo()
+    incremental_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _, board_rows, _ in steps:
+        evaluator.refresh(board_rows)
+        evaluator.evaluate()
+    refresh_s = time.perf_counter() - t0
+
+    report = {
+        "positions": len(steps),
+        "incremental_evals_per_s": n / incremental_s if incremental_s else 0.0,
+        "refresh_evals_per_s": n / refresh_s if refresh_s else 0.0,
+    }
+    if teacher is not None:
+        teacher.train(False)
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            for _, _, state in steps:
+                teacher.value_only(torch.from_numpy(state).unsqueeze(0))
+        teacher_s = time.perf_counter() - t0
+        report["teacher_evals_per_s"] = n / teacher_s if teacher_s else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    from src.game import Game
+
+    args = sys.argv[1:]
+    model, _ = distill_nnue(
+        data_path=args[0] if len(args) > 0 else None,
+        teacher_checkpoint=args[1] if len(args) > 1 else None,
+        output_path=args[2] if len(args) > 2 else None,
+    )
+    game = Game(screen=None, headless=True)
+    game.new_game()
+    bench = benchmark_nnue(NNUEEvaluator(model), game,
+                           teacher=_load_teacher(args[1] if len(args) > 1 else DEFAULT_CHECKPOINT))
+    print(f"NNUE incremental: {bench['incremental_evals_per_s']:,.0f} evals/s "
+          f"({60 * bench['incremental_evals_per_s'] / 1e6:.1f}M/min), "
+          f"refresh: {bench['refresh_evals_per_s']:,.0f} evals/s, "
+          f"ChessNet value_only: {bench['teacher_evals_per_s']:,.0f} evals/s")
@@ -0,0 +1,140 @@
+"""Opening book built from stored self-play / match positions.
+
+The replay buffer holds every position a side moved from together with the
+game's result for that side. The book aggregates those rows per position:
+a visit count and the mean result. Positions seen fewer than min_visits
+times are dropped, which leaves the openings (every game starts from the
+same new_game position) and discards one-off middlegame positions.
+
+Probing a game looks up the position each legal action leads to. A move's
+score is the negated mean result of that position (the result is stored for
+the side to move there, i.e. the opponent), and its weight is the position's
+visit count. The book therefore needs no record of which moves were played.
+
+Positions are keyed by a 64-bit hash of encode_board_state(), which does
+not include the side to move; in the opening the ply parity fixes it.
+
+On disk the book is an .npz of sorted uint64 keys with matching visit
+counts and result sums, probed by binary search.
+
+Usage:
+    python -m training.opening_book [data_path] [output_path] [min_visits]
+"""
+
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_DATA_PATH = os.path.join(_SCRIPT_DIR, '..', 'training_data.npz')
+DEFAULT_BOOK_PATH = os.path.join(_SCRIPT_DIR, '..', 'models', 'opening_book.npz')
+
+
+def state_hash(state):
+    """64-bit key of an encoded board state (float32 array)."""
+    digest = hashlib.blake2b(np.ascontiguousarray(state, dtype=np.float32).tobytes(),
+                             digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class OpeningBook:
+    def __init__(self, keys, visits, result_sums):
+        self.keys = np.asarray(keys, dtype=np.uint64)
+        self.visits = np.asarray(visits, dtype=np.uint32)
+        self.result_sums = np.asarray(result_sums, dtype=np.float32)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, state):
+        """(visits, mean result for the side to move) of a position, or None."""
+        key = np.uint64(state_hash(state))
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        return int(self.visits[i]), float(self.result_sums[i]) / int(self.visits[i])
+
+    def candidates(self, game):
+        """[(action, visits, score)] for the legal actions whose result is in the book."""
+        from training.search import child_position
+        found = []
+        for action in game.get_legal_actions():
+            entry = self.lookup(child_position(game, action).encode_board_state())
+            if entry is not None:
+                visits, mean = entry
+                found.append((action, visits, -mean))
+        return found
+
+    def probe(self, game, sample=False, rng=None):
+        """A book move for game, or None when the position is out of book.
+
+        Deterministic probes play the best-scoring move (ties to the most
+        visited); sample=True draws moves in proportion to visits times
+        the expected score mapped to [0, 1], for varied self-play openings.
+        """
+        found = self.candidates(game)
+        if not found:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if not sample:
+            return max(found, key=lambda c: (c[2], c[1]))[0]
+        rng = rng or np.random
+        weights = np.array([visits * (score + 1.0) / 2.0 for _, visits, score in found]) + 1e-6
+        return found[rng.choice(len(found), p=weights / weights.sum())][0]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, keys=self.keys, visits=self.visits, result_sums=self.result_sums)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["keys"], data["visits"], data["result_sums"])
+
+
+def load_book(path):
+    """OpeningBook at path, or None if there is no book there."""
+    if path is None or not os.path.exists(path):
+        return None
+    return OpeningBook.load(path)
+
+
+def build_book(states, value_targets, min_visits=2):
+    """Aggregate (state, result for the side to move) rows into an OpeningBook."""
+    keys = np.fromiter((state_hash(s) for s in states), dtype=np.uint64, count=len(states))
+    results = np.asarray(value_targets, dtype=np.float32).reshape(-1)
+    unique, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    sums = np.zeros(len(unique), dtype=np.float64)
+    np.add.at(sums, inverse, results)
+    keep = counts >= min_visits
+    return OpeningBook(unique[keep], counts[keep], sums[keep])
+
+
+def build_book_from_replay(data_path=None, output_path=None, min_visits=2):
+    """Build the book from a replay buffer file and save it; returns the book."""
+    if data_path is None:
+        data_path = _DATA_PATH
+    if output_path is None:
+        output_path = DEFAULT_BOOK_PATH
+    with np.load(data_path) as data:
+        states, values = data["states"], data["value_targets"]
+        book = build_book(states, values, min_visits=min_visits)
+        total = len(states)
+    book.save(output_path)
+    print(f"Opening book: {len(book)} positions (>= {min_visits} visits) from {total} examples, "
+          f"saved to {output_path}")
+    return book
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    build_book_from_replay(
+        data_path=args[0] if len(args) > 0 else None,
+        output_path=args[1] if len(args) > 1 else None,
+        min_visits=int(args[2]) if len(args) > 2 else 2,
+    )
@@ -22,10 +22,10 @@ from torch.utils.data import DataLoader
 
 from training.selfplay import generate_selfplay_data
 from training.dataset import ChessDataset
-from training.model import ChessNet
+from training.model import ChessNet, checkpoint_model_config
 
 
-def proof_run():
+def proof_run(policy_head="dense"):
     # --- Configuration ---
     num_iterations = 3
     games_per_iter = 30  # 30 games × 3 iters = 90 total (small but meaningful)
@@ -51,7 +51,7 @@ def proof_run():
         print(f"  GPU: {torch.cuda.get_device_name(0)}")
         print(f"  HIP: {torch.version.hip}")
 
-    model = ChessNet(num_channels=13, policy_size=8513).to(device)
+    model = ChessNet(num_channels=13, policy_size=8513, policy_head=policy_head).to(device)
     param_count = sum(p.numel() for p in model.parameters())
     print(f"Model: {param_count:,} parameters")
     optimizer = torch.optim.Adam(model.parameters(), lr=lr)
@@ -89,7 +89,7 @@ def proof_run():
         # --- Training phase ---
         print(f"\nTraining: {epochs_per_iter} epochs, batch_size={batch_size}...")
         t0 = time.time()
-        dataset = ChessDataset(data_file=data_path, augment=True)
+        dataset = ChessDataset(data_file=data_path, augment=True, policy_size=model.policy_size)
         print(f"  Dataset size: {len(dataset)} examples ({len(dataset)//2} base + augmented)")
         dataloader = DataLoader(
             dataset,
@@ -135,6 +135,7 @@ def proof_run():
                 "iteration": iteration,
                 "model_state_dict": model.state_dict(),
                 "optimizer_state_dict": optimizer.state_dict(),
+                "model_config": model.config,
             },
             checkpoint_path,
         )
@@ -173,7 +174,7 @@ def proof_run():
     print(f"  Checkpoint loads correctly: ", end="")
     try:
         ckpt = torch.load(checkpoint_path, map_location="cpu")
-        test_model = ChessNet(num_channels=13, policy_size=8513)
+        test_model = ChessNet(**checkpoint_model_config(ckpt))
         test_model.load_state_dict(ckpt["model_state_dict"])
         print("PASS")
     except Exception as e:
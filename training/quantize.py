@@ -0,0 +1,209 @@
+"""Int8 quantized ChessNet for CPU self-play.
+
+Two opt-in variants, both built on the BN-folded model from inference_model:
+
+- "dynamic": Linear layers (mostly the 2048->8513 policy_fc of the dense
+  policy head) get int8 weights with activations quantized on the fly. No
+  calibration needed.
+- "static": the whole network, conv trunk included, is quantized with FX
+  graph mode after calibrating activation ranges on real positions. Falls
+  back to "dynamic" if the backend can't quantize the graph.
+
+compare_quantized() checks a quantized model against the float model on a
+held-out slice of the replay buffer and times both.
+
+Usage:
+    python -m training.quantize [dynamic|static] [data_path] [checkpoint_path]
+"""
+
+import copy
+import os
+import sys
+import time
+import types
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from .action_space import convert_policy
+from .inference_model import DEFAULT_CHECKPOINT, fuse_for_inference
+from .model import DEFAULT_MODEL_CONFIG, ChessNet, checkpoint_model_config
+
+QUANTIZE_MODES = ("dynamic", "static")
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_DATA_PATH = os.path.join(_SCRIPT_DIR, '..', 'training_data.npz')
+
+
+def _float_base(model):
+    """Fused, contiguous-format copy (quantized kernels expect NCHW)."""
+    return fuse_for_inference(model).to(memory_format=torch.contiguous_format)
+
+
+def _policy_from_all_logits(self, h, legal_indices=None):
+    """policy_from_trunk for a quantized policy_fc: all logits, then the legal ones."""
+    logits = self.policy_fc(self.policy_features(h))
+    return logits if legal_indices is None else logits.index_select(1, legal_indices)
+
+
+def quantize_dynamic_model(model):
+    base = _float_base(model)
+    quantized = torch.ao.quantization.quantize_dynamic(base, {nn.Linear}, dtype=torch.qint8)
+    if hasattr(quantized, "policy_fc"):
+        # A quantized policy_fc has no weight rows to slice. Callers that
+        # check legal_policy use the full forward pass; policy_from_trunk
+        # computes every logit and then selects, so legal_indices stay safe.
+        quantized.legal_policy = None
+        quantized.policy_from_trunk = types.MethodType(_policy_from_all_logits, quantized)
+    return quantized
+
+
+def quantize_static_model(model, calibration_states, backend="x86"):
+    """Statically quantize the whole network, calibrating on calibration_states."""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    torch.backends.quantized.engine = backend
+    base = _float_base(model)
+    example = torch.from_numpy(np.asarray(calibration_states[:1], dtype=np.float32))
+    prepared = prepare_fx(base, get_default_qconfig_mapping(backend), (example,))
+    with torch.no_grad():
+        for start in range(0, len(calibration_states), 64):
+            batch = np.asarray(calibration_states[start:start + 64], dtype=np.float32)
+            prepared(torch.from_numpy(batch))
+    return convert_fx(prepared)
+
+
+def build_quantized_model(model, mode="dynamic", calibration_states=None):
+    """Return a quantized copy of model. mode is "dynamic" or "static"."""
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantize mode: {mode}")
+    if mode == "static" and calibration_states is not None and len(calibration_states) > 0:
+        try:
+            return quantize_static_model(model, calibration_states)
+        except Exception as e:
+            print("Static quantization failed; using dynamic.", e)
+    return quantize_dynamic_model(model)
+
+
+def load_calibration_states(data_path=None, num_samples=256):
+    """Return up to num_samples states from the start of the replay buffer, or None."""
+    if data_path is None:
+        data_path = _DATA_PATH
+    if not os.path.exists(data_path):
+        return None
+    data = np.load(data_path)
+    states = data['states'][:num_samples].copy()
+    data.close()
+    return states
+
+
+def _batch1_latency_ms(model, states, repeats=1):
+    with torch.no_grad():
+        model(torch.from_numpy(states[:1]))  # warm-up
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            for i in range(len(states)):
+                model(torch.from_numpy(states[i:i + 1]))
+        elapsed = time.perf_counter() - t0
+    return 1000.0 * elapsed / (repeats * len(states))
+
+
+def compare_quantized(model, quantized, states, policy_targets, value_targets=None,
+                      latency_samples=100):
+    """Measure policy/value fidelity and batch-1 latency of quantized vs model.
+
+    Legal actions are read off the policy targets (non-zero entries), and the
+    policy is compared after restricting both softmaxes to them, as
+    get_model_move does.
+    """
+    model = copy.deepcopy(model).cpu()
+    model.train(False)
+    states = np.asarray(states, dtype=np.float32)
+
+    with torch.no_grad():
+        x = torch.from_numpy(states)
+        ref_logits, ref_values = model(x)
+        q_logits, q_values = quantized(x)
+
+    legal = torch.from_numpy(np.asarray(policy_targets) > 0)
+    neg_inf = torch.tensor(float("-inf"))
+    ref_logp = torch.log_softmax(torch.where(legal, ref_logits, neg_inf), dim=1)
+    q_logp = torch.log_softmax(torch.where(legal, q_logits, neg_inf), dim=1)
+    kl = torch.where(legal, ref_logp.exp() * (ref_logp - q_logp), torch.zeros(())).sum(dim=1)
+    top1 = (ref_logp.argmax(dim=1) == q_logp.argmax(dim=1)).float()
+    value_err = (ref_values - q_values).abs()
+
+    report = {
+        "samples": len(states),
+        "top1_agreement": top1.mean().item(),
+        "mean_policy_kl": kl.mean().item(),
+        "mean_value_abs_err": value_err.mean().item(),
+        "max_value_abs_err": value_err.max().item(),
+    }
+    if value_targets is not None:
+        targets = torch.from_numpy(np.asarray(value_targets, dtype=np.float32)).reshape(-1, 1)
+        report["float_value_mse"] = torch.mean((ref_values - targets) ** 2).item()
+        report["quantized_value_mse"] = torch.mean((q_values - targets) ** 2).item()
+
+    timing_states = states[:latency_samples]
+    float_ms = _batch1_latency_ms(fuse_for_inference(model), timing_states)
+    quant_ms = _batch1_latency_ms(quantized, timing_states)
+    report["float_ms"] = float_ms
+    report["quantized_ms"] = quant_ms
+    report["speedup"] = float_ms / quant_ms if quant_ms > 0 else 0.0
+    return report
+
+
+def run_comparison(mode="dynamic", data_path=None, checkpoint_path=None,
+                   held_out=1000, calibration=256):
+    """Quantize the checkpoint and compare it on the last held_out buffer examples.
+
+    Calibration (static mode) uses the start of the buffer, so the evaluation
+    slice is never seen during calibration.
+    """
+    if data_path is None:
+        data_path = _DATA_PATH
+    if checkpoint_path is None:
+        checkpoint_path = DEFAULT_CHECKPOINT
+
+    if os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location="cpu")
+        model = ChessNet(**checkpoint_model_config(checkpoint))
+        model.load_state_dict(checkpoint["model_state_dict"])
+    else:
+        print(f"No checkpoint at {checkpoint_path}; comparing an untrained model.")
+        model = ChessNet(**DEFAULT_MODEL_CONFIG)
+    model.train(False)
+
+    data = np.load(data_path)
+    n = data['states'].shape[0]
+    held_out = min(held_out, n // 2) if n > 1 else n
+    states = data['states'][n - held_out:]
+    policy_targets = data['policy_targets'][n - held_out:]
+    value_targets = data['value_targets'][n - held_out:]
+    calibration_states = data['states'][:min(calibration, n - held_out)]
+    data.close()
+    policy_targets = convert_policy(policy_targets, model.policy_size)
+
+    quantized = build_quantized_model(model, mode, calibration_states)
+    report = compare_quantized(model, quantized, states, policy_targets, value_targets)
+    report["mode"] = mode
+
+    print(f"Quantized ({mode}) vs float on {report['samples']} held-out positions:")
+    print(f"  Top-1 legal move agreement: {report['top1_agreement']:.1%}")
+    print(f"  Mean policy KL:             {report['mean_policy_kl']:.4f}")
+    print(f"  Value abs err (mean/max):   {report['mean_value_abs_err']:.4f} / {report['max_value_abs_err']:.4f}")
+    print(f"  Batch-1 latency: float {report['float_ms']:.2f}ms, "
+          f"quantized {report['quantized_ms']:.2f}ms ({report['speedup']:.2f}x)")
+    return report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run_comparison(
+        mode=args[0] if len(args) > 0 else "dynamic",
+        data_path=args[1] if len(args) > 1 else None,
+        checkpoint_path=args[2] if len(args) > 2 else None,
+    )
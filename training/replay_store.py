@@ -0,0 +1,200 @@
+"""Incremental, bounded-memory appends to the replay buffer.
+
+The replay buffer stays a plain ``training_data.npz`` (states,
+policy_targets, value_targets) for every reader. ReplayWriter adds to it
+in two steps:
+
+- append() writes each finished game's examples straight to a spool
+  directory next to the buffer (``training_data.npz.pending/``), one raw
+  file per array, flushed per call. Nothing accumulates in memory, and a
+  crash loses at most the game being written: the next writer on the same
+  buffer picks the spool up again, cutting every file back to the rows
+  complete in all of them.
+- commit() streams the existing buffer and the spool, chunk_bytes (16MB)
+  at a time, into a new .npz that keeps the most recent max_buffer_size
+  rows, then atomically replaces the old file and clears the spool.
+
+Peak memory is one chunk of rows rather than several copies of the buffer.
+"""
+
+import json
+import os
+import shutil
+import zipfile
+
+import numpy as np
+
+from .action_space import convert_policy
+
+_ARRAYS = ("states", "policy_targets", "value_targets")
+
+
+def _member_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(f)
+    return np.lib.format.read_array_header_2_0(f)
+
+
+def npz_layout(path):
+    """{name: (shape, dtype)} of the arrays in an uncompressed .npz, or None."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            layout = {}
+            for name in _ARRAYS:
+                with zf.open(name + ".npy") as f:
+                    shape, fortran_order, dtype = _member_header(f)
+                if fortran_order:
+                    return None
+                layout[name] = (shape, dtype)
+            return layout
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def _npz_rows(path, name, start, chunk_bytes):
+    """Rows start: of one .npz member, about chunk_bytes at a time."""
+    with zipfile.ZipFile(path) as zf, zf.open(name + ".npy") as f:
+        shape, _, dtype = _member_header(f)
+        row_bytes = int(np.prod(shape[1:], dtype=np.int64)) * dtype.itemsize
+        chunk_rows = max(1, chunk_bytes // row_bytes)
+        f.seek(f.tell() + start * row_bytes)
+        for begin in range(start, shape[0], chunk_rows):
+            count = min(chunk_rows, shape[0] - begin)
+            data = f.read(count * row_bytes)
+            yield np.frombuffer(data, dtype=dtype).reshape((count,) + tuple(shape[1:]))
+
+
+class ReplayWriter:
+    """Appends examples to data_path's spool; commit() folds them into the buffer.
+
+    policy_size fixes the action space policies are stored in (the
+    model's); by default the existing buffer's, else the first append's.
+    """
+
+    def __init__(self, data_path, max_buffer_size=500_000, policy_size=None, chunk_bytes=16 << 20):
+        self.data_path = data_path
+        self.max_buffer_size = max_buffer_size
+        self.chunk_bytes = chunk_bytes
+        self.spool_dir = data_path + ".pending"
+        self.existing = npz_layout(data_path) if os.path.exists(data_path) else None
+        self.meta = self._read_meta()
+        if policy_size is None and self.existing is not None:
+            policy_size = self.existing["policy_targets"][0][-1]
+        if policy_size is None and self.meta is not None:
+            policy_size = self.meta["policy_size"]
+        self.policy_size = policy_size
+        self.appended = 0
+        self._truncate_spool()
+        if self.pending_rows:
+            print(f"Recovered {self.pending_rows} uncommitted examples from {self.spool_dir}.")
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.spool_dir, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _spool_path(self, name):
+        return os.path.join(self.spool_dir, name + ".bin")
+
+    def _row_shapes(self):
+        return {
+            "states": tuple(self.meta["state_shape"]),
+            "policy_targets": (self.meta["policy_size"],),
+            "value_targets": (1,),
+        }
+
+    def _truncate_spool(self):
+        """Drop a torn write's tail, so the next append lines up in every file."""
+        if self.meta is None:
+            return
+        rows = self.pending_rows
+        for name, shape in self._row_shapes().items():
+            path = self._spool_path(name)
+            size = rows * 4 * int(np.prod(shape))
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    @property
+    def pending_rows(self):
+        """Complete examples in the spool (a torn final row is ignored)."""
+        if self.meta is None:
+            return 0
+        rows = []
+        for name, shape in self._row_shapes().items():
+            path = self._spool_path(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            rows.append(size // (4 * int(np.prod(shape))))
+        return min(rows)
+
+    def append(self, states, policies, values):
+        """Spool one batch of examples (typically one game's)."""
+        states = np.asarray(states, dtype=np.float32)
+        policies = np.asarray(policies, dtype=np.float32)
+        values = np.asarray(values, dtype=np.float32).reshape(-1, 1)
+        if self.policy_size is None:
+            self.policy_size = policies.shape[-1]
+        if self.meta is None:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self.meta = {"policy_size": int(self.policy_size), "state_shape": list(states.shape[1:])}
+            with open(os.path.join(self.spool_dir, "meta.json"), "w") as f:
+                json.dump(self.meta, f)
+        policies = convert_policy(policies, self.meta["policy_size"]).astype(np.float32, copy=False)
+        for name, array in zip(_ARRAYS, (states, policies, values)):
+            with open(self._spool_path(name), "ab") as f:
+                f.write(np.ascontiguousarray(array).tobytes())
+        self.appended += len(states)
+
+    def _spool_rows(self, name, start, count):
+        shape = self._row_shapes()[name]
+        row_bytes = 4 * int(np.prod(shape))
+        chunk_rows = max(1, self.chunk_bytes // row_bytes)
+        with open(self._spool_path(name), "rb") as f:
+            f.seek(start * row_bytes)
+            for begin in range(start, count, chunk_rows):
+                rows = min(chunk_rows, count - begin)
+                data = f.read(rows * row_bytes)
+                yield np.frombuffer(data, dtype=np.float32).reshape((rows,) + shape)
+
+    def commit(self):
+        """Fold the spool into data_path; returns the buffer size (rows)."""
+        new_rows = self.pending_rows
+        old_rows = self.existing["states"][0][0] if self.existing is not None else 0
+        if new_rows == 0:
+            return old_rows
+        if self.existing is not None and self.existing["states"][0][1:] != tuple(self.meta["state_shape"]):
+            self.existing = None  # Incompatible buffer: start over, as a failed load did before
+            old_rows = 0
+        total = min(old_rows + new_rows, self.max_buffer_size)
+        # Keep the most recent rows: drop from the old buffer first.
+        skip = old_rows + new_rows - total
+        skip_old, skip_new = min(skip, old_rows), max(skip - old_rows, 0)
+
+        row_shapes = self._row_shapes()
+        row_shapes["policy_targets"] = (self.policy_size,)
+        tmp_path = self.data_path + ".tmp.npz"
+        with zipfile.ZipFile(tmp_path, "w", allowZip64=True) as zf:
+            for name in _ARRAYS:
+                header = {
+                    "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+                    "fortran_order": False,
+                    "shape": (total,) + row_shapes[name],
+                }
+                with zf.open(name + ".npy", "w", force_zip64=True) as f:
+                    np.lib.format.write_array_header_1_0(f, header)
+                    chunks = []
+                    if self.existing is not None:
+                        chunks.append(_npz_rows(self.data_path, name, skip_old, self.chunk_bytes))
+                    chunks.append(self._spool_rows(name, skip_new, new_rows))
+                    for source in chunks:
+                        for chunk in source:
+                            if name == "policy_targets":
+                                chunk = convert_policy(chunk, self.policy_size)
+                            f.write(np.ascontiguousarray(chunk, dtype=np.float32).tobytes())
+        os.replace(tmp_path, self.data_path)
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+        self.existing = npz_layout(self.data_path)
+        self.meta = None
+        return total
@@ -0,0 +1,406 @@
+"""Alpha-beta search over ChessBuilder positions.
+
+Negamax alpha-beta with iterative deepening. Scores are from the side to
+move's perspective, in ChessNet value units ([-1, 1]), with mates scored
+beyond that range (MATE_SCORE minus the distance in plies).
+
+Two move-ordering modes:
+
+- unguided: legal actions in generation order, nothing pruned.
+- policy-guided (a model is given and guided=True): actions are ordered by
+  the ChessNet policy prior, looked up through an EvalCache. At the first
+  ``batch_plies`` plies the children of a node are evaluated in one batched
+  forward pass, which fills the cache with their priors and values before
+  the search descends. Below the root, actions beyond the smallest prefix
+  holding ``prune_mass`` of the prior are not searched at all.
+
+An optional TranspositionTable (training/transposition.py) caches bounds
+and best moves between iterations and, in a lazy-SMP search
+(training/lazy_smp.py), between processes.
+
+With an NNUEEvaluator (training/nnue.py) as evaluator, leaves are scored
+by the NNUE instead: its accumulator follows the search path, updated for
+each move made and restored when the search backs up, so a leaf costs only
+the small NNUE head.
+
+compare_search() runs both modes on fixed test positions and reports nodes
+and time to each depth.
+
+Usage:
+    python -m training.search [depth] [checkpoint_path]
+"""
+
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import torch
+
+from .eval_cache import EvalCache
+from .nnue import touched_squares
+from .transposition import EXACT, LOWER, UPPER, position_hash
+
+MATE_SCORE = 10.0
+MATE_THRESHOLD = MATE_SCORE / 2  # Scores beyond this are mates
+
+
+class SearchAborted(Exception):
+    """Raised inside a search when its stop event is set."""
+
+
+def material_value(game):
+    """Material plus gold balance for the side to move, squashed to [-1, 1]."""
+    from src.board import PIECE_COST
+    balance = 0.0
+    for row in game.board:
+        for piece in row:
+            if piece is None:
+                continue
+            worth = PIECE_COST.get(piece.type, 0) + piece.gold
+            balance += worth if piece.color == game.turn else -worth
+    return math.tanh(balance / 10.0)
+
+
+def child_position(game, action):
+    child = game.copy_for_simulation()
+    child.apply_move(action)
+    return child
+
+
+def score_to_table(score, ply):
+    """Store mate scores relative to the node, not the root."""
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def tablebase_score(found, ply):
+    """Search score of a tablebase (result, plies) probe at ply."""
+    from .tablebase import LOSS, WIN
+    result, plies = found
+    if result == WIN:
+        return MATE_SCORE - (ply + plies)
+    if result == LOSS:
+        return -(MATE_SCORE - (ply + plies))
+    return 0.0
+
+
+def terminal_score(game, ply):
+    """Score of a finished game for the side to move (who has just been mated)."""
+    if game.winner == "draw" or game.winner is None:
+        return 0.0
+    if game.winner == game.turn:
+        return MATE_SCORE - ply
+    return -(MATE_SCORE - ply)
+
+
+class PolicyPrior:
+    """ChessNet move priors and values behind an EvalCache."""
+
+    def __init__(self, model, device, cache=None):
+        self.model = model
+        self.device = device
+        self.cache = cache if cache is not None else EvalCache()
+        self.batches = 0
+        self.batched_positions = 0
+
+    def priors(self, game, actions):
+        """Softmax prior over actions (a list of legal actions of game)."""
+        indices = [game.move_to_index(*a) for a in actions]
+        logits, _ = game.evaluate_legal_policy(self.model, self.device, indices, cache=self.cache)
+        return torch.softmax(logits.float(), dim=0).cpu().numpy()
+
+    def value(self, game):
+        return game.evaluate_value(self.model, self.device, cache=self.cache)
+
+    def prefetch(self, games, actions_per_game):
+        """Evaluate every uncached, unfinished position in games in one batch."""
+        pending = []
+        for game, actions in zip(games, actions_per_game):
+            if game.game_over or not actions:
+                continue
+            key = game.get_position_key()
+            if key in self.cache:
+                continue
+            pending.append((game, key, [game.move_to_index(*a) for a in actions]))
+        if not pending:
+            return
+
+        states = torch.from_numpy(np.stack([g.encode_board_state() for g, _, _ in pending])).to(self.device)
+        self.model.eval()
+        with torch.no_grad():
+            if getattr(self.model, "legal_policy", None) is not None:
+                # Only the logits some position in the batch needs: the policy
+                # head over the union of their legal moves, not all of it.
+                policy_size = getattr(self.model, "policy_size", 8513)
+                index_tensors = [game._policy_index_tensor(indices, policy_size, self.device)
+                                 for game, _, indices in pending]
+                union = torch.unique(torch.cat(index_tensors))
+                values, trunk = self.model.value_and_trunk(states)
+                logits = self.model.policy_from_trunk(trunk, union)
+                index_tensors = [torch.searchsorted(union, t) for t in index_tensors]
+            else:
+                # No legal-index support (quantized builds): the full forward.
+                logits, values = self.model(states)
+                index_tensors = [game._policy_index_tensor(indices, logits.shape[1], self.device)
+                                 for game, _, indices in pending]
+        for row, (game, key, indices) in enumerate(pending):
+            legal_logits = logits[row].index_select(0, index_tensors[row])
+            self.cache.put(key, indices, legal_logits.cpu().numpy(), float(values[row].reshape(-1)[0]))
+        self.batches += 1
+        self.batched_positions += len(pending)
+
+
+class AlphaBetaSearch:
+    """Negamax alpha-beta, optionally ordered and pruned by a policy prior.
+
+    value_fn(game) scores leaves for the side to move; it defaults to the
+    evaluator's NNUE value when an NNUEEvaluator is given (the model, if
+    any, then only orders moves), else to the model's value (sharing the
+    prior's cache) or to material_value without a model. tablebases (training/tablebase.py) score covered positions
+    exactly. table is an optional TranspositionTable; stop an optional
+    event that aborts the search (SearchAborted) once set; root_shift
+    rotates the root moves after the first, so lazy-SMP helpers start on
+    different subtrees.
+    """
+
+    def __init__(self, model=None, device=None, guided=True, prune_mass=0.95, min_moves=2,
+                 batch_plies=1, prune_root=False, value_fn=None, cache=None,
+                 table=None, stop=None, root_shift=0, tablebases=None, evaluator=None):
+        if device is None:
+            device = torch.device("cpu")
+        self.prior = PolicyPrior(model, device, cache) if model is not None else None
+        self.guided = guided and self.prior is not None
+        self.prune_mass = prune_mass
+        self.min_moves = min_moves
+        self.batch_plies = batch_plies
+        self.prune_root = prune_root
+        self.evaluator = evaluator
+        if value_fn is None:
+            if evaluator is not None:
+                value_fn = self._nnue_value
+            else:
+                value_fn = self.prior.value if self.prior is not None else material_value
+        self.value_fn = value_fn
+        self.table = table
+        self.tablebases = tablebases
+        self.stop = stop
+        self.root_shift = root_shift
+        self._root_first = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.pruned = 0
+        self.table_cutoffs = 0
+        self.tablebase_hits = 0
+
+    def _nnue_value(self, game):
+        # The accumulator already holds game's position (see _negamax).
+        return self.evaluator.evaluate()
+
+    def order_actions(self, game, actions, ply):
+        """Actions to search, best-first; the low-prior tail is dropped when guided."""
+        if not self.guided:
+            return list(actions)
+        probs = self.prior.priors(game, actions)
+        order = np.argsort(-probs, kind="stable")
+        keep = len(order)
+        if self.prune_mass is not None and (ply > 0 or self.prune_root):
+            cumulative = np.cumsum(probs[order])
+            keep = int(np.searchsorted(cumulative, self.prune_mass)) + 1
+            keep = min(len(order), max(keep, self.min_moves))
+            self.pruned += len(order) - keep
+        return [actions[i] for i in order[:keep]]
+
+    def _negamax(self, game, depth, alpha, beta, ply, actions=None):
+        self.nodes += 1
+        if self.stop is not None and self.nodes % 64 == 0 and self.stop.is_set():
+            raise SearchAborted()
+        if game.game_over:
+            return terminal_score(game, ply), None
+        if ply > 0 and self.tablebases is not None:
+            found = self.tablebases.probe(game)
+            if found is not None:
+                self.tablebase_hits += 1
+                return tablebase_score(found, ply), None
+        if depth == 0:
+            self.leaf_evals += 1
+            return self.value_fn(game), None
+
+        key = table_move = None
+        alpha_orig = alpha
+        if self.table is not None:
+            key = position_hash(game)
+            entry = self.table.probe(key)
+            if entry is not None:
+                entry_depth, bound, table_move, score = entry
+                if ply > 0 and entry_depth >= depth:
+                    score = score_from_table(score, ply)
+                    if bound == EXACT:
+                        self.table_cutoffs += 1
+                        return score, None
+                    if bound == LOWER:
+                        alpha = max(alpha, score)
+                    elif bound == UPPER:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        self.table_cutoffs += 1
+                        return score, None
+
+        if actions is None:
+            actions = game.get_legal_actions()
+        if not actions:
+            return 0.0, None
+
+        ordered = self.order_actions(game, actions, ply)
+        first = self._root_first if ply == 0 else None
+        if table_move is not None:
+            first = next((a for a in actions if game.move_to_index(*a) == table_move), first)
+        if first is not None:
+            if first in ordered:
+                ordered.remove(first)
+            ordered.insert(0, first)
+        if ply == 0 and self.root_shift and len(ordered) > 2:
+            shift = self.root_shift % (len(ordered) - 1)
+            ordered = ordered[:1] + ordered[1 + shift:] + ordered[1:1 + shift]
+
+        children = child_actions = None
+        if self.guided and ply < self.batch_plies:
+            children = [child_position(game, a) for a in ordered]
+            child_actions = [[] if c.game_over else c.get_legal_actions() for c in children]
+            self.prior.prefetch(children, child_actions)
+
+        best_score, best_action = -math.inf, None
+        for i, action in enumerate(ordered):
+            if children is not None:
+                child, actions = children[i], child_actions[i]
+            else:
+                child, actions = child_position(game, action), None
+            if self.evaluator is not None:
+                # Make the move on the accumulator too; undone after the subtree.
+                self.evaluator.update(child.board,
+                                      self.evaluator.snapshot(game.board, touched_squares(game, action)))
+            score = -self._negamax(child, depth - 1, -beta, -alpha, ply + 1, actions)[0]
+            if self.evaluator is not None:
+                self.evaluator.undo()
+            if score > best_score:
+                best_score, best_action = score, action
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if key is not None:
+            if best_score <= alpha_orig:
+                bound = UPPER
+            elif best_score >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            self.table.store(key, depth, bound, game.move_to_index(*best_action),
+                             score_to_table(best_score, ply))
+        return best_score, best_action
+
+    def search(self, game, depth, time_limit=None):
+        """Iteratively deepen to depth (or until time_limit seconds pass).
+
+        Returns a dict with the best action, its score, the depth reached and
+        per-depth (depth, nodes, seconds, best_action, score) progress.
+        """
+        self.reset_stats()
+        self._root_first = None
+        if self.evaluator is not None:
+            self.evaluator.refresh(game.board)
+        start = time.perf_counter()
+        result = {"best_action": None, "score": 0.0, "depth": 0, "per_depth": []}
+        for d in range(1, depth + 1):
+            score, action = self._negamax(game, d, -math.inf, math.inf, 0)
+            elapsed = time.perf_counter() - start
+            result.update(best_action=action, score=score, depth=d)
+            result["per_depth"].append((d, self.nodes, elapsed, action, score))
+            self._root_first = action  # search the previous best first
+            if time_limit is not None and elapsed >= time_limit:
+                break
+        result.update(nodes=self.nodes, leaf_evals=self.leaf_evals, pruned=self.pruned,
+                      table_cutoffs=self.table_cutoffs, tablebase_hits=self.tablebase_hits,
+                      seconds=time.perf_counter() - start)
+        return result
+
+
+def fixed_positions(count=4, plies=12, seed=0):
+    """Fixed positions reached by seeded random play from the start."""
+    from src.game import Game
+    state = random.getstate()
+    positions = []
+    try:
+        for i in range(count):
+            random.seed(seed + i)
+            game = Game(screen=None, headless=True)
+            game.new_game()
+            for _ in range(plies * (i + 1) // count + plies // 2):
+                if game.is_game_over():
+                    break
+                game.apply_move(game.get_random_move())
+            if not game.is_game_over():
+                positions.append(game)
+    finally:
+        random.setstate(state)
+    return positions
+
+
+def compare_search(positions, model, device=None, depth=3, prune_mass=0.95, batch_plies=1):
+    """Search each position unguided and policy-guided; return one row per (position, mode)."""
+    rows = []
+    for p, game in enumerate(positions):
+        for mode in ("unguided", "guided"):
+            searcher = AlphaBetaSearch(model, device, guided=(mode == "guided"),
+                                       prune_mass=prune_mass, batch_plies=batch_plies)
+            result = searcher.search(game, depth)
+            rows.append({
+                "position": p,
+                "mode": mode,
+                "nodes": result["nodes"],
+                "seconds": result["seconds"],
+                "pruned": result["pruned"],
+                "best_action": result["best_action"],
+                "score": result["score"],
+                "time_to_depth": [round(t, 3) for _, _, t, _, _ in result["per_depth"]],
+                "nodes_to_depth": [n for _, n, _, _, _ in result["per_depth"]],
+            })
+    return rows
+
+
+if __name__ == "__main__":
+    from .model import ChessNet, checkpoint_model_config
+    from .inference_model import DEFAULT_CHECKPOINT
+
+    args = sys.argv[1:]
+    depth = int(args[0]) if len(args) > 0 else 3
+    checkpoint_path = args[1] if len(args) > 1 else DEFAULT_CHECKPOINT
+    if os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location="cpu")
+        model = ChessNet(**checkpoint_model_config(checkpoint))
+        model.load_state_dict(checkpoint["model_state_dict"])
+    else:
+        print(f"No checkpoint at {checkpoint_path}; using an untrained model.")
+        model = ChessNet(num_channels=13, policy_size=8513)
+    model.train(False)
+
+    print(f"{'pos':>4} {'mode':<9}{'nodes':>9}{'pruned':>8}{'seconds':>9}  time to depth")
+    for row in compare_search(fixed_positions(), model, depth=depth):
+        print(f"{row['position']:>4} {row['mode']:<9}{row['nodes']:>9}{row['pruned']:>8}"
+              f"{row['seconds']:>9.2f}  {row['time_to_depth']}")
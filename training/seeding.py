@@ -0,0 +1,66 @@
+"""Seeds for reproducible self-play.
+
+A master seed fixes every game of a run. game_seed() derives each game's
+seed from (master seed, iteration, game index), and GameRNG holds that
+game's own randomness: Python and torch RNG states, swapped in only while
+the game is being played, and a NumPy Generator for the callers that take
+an rng (opening book sampling, the Gumbel search). Swapping NumPy's global
+state would cost far more per move than the other two together. A game
+therefore draws the same random numbers whether it is played alone, side
+by side with others (lockstep) or on any worker, so the same seed and
+settings reproduce the same games whatever the worker count.
+"""
+
+import random
+
+import numpy as np
+import torch
+
+
+def game_seed(master_seed, iteration, game_index):
+    """Seed of one game, independent of which worker plays it."""
+    return int(np.random.SeedSequence([master_seed, iteration, game_index]).generate_state(1)[0])
+
+
+def seed_everything(seed):
+    """Seed the global Python, NumPy and torch RNGs."""
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def _capture():
+    return random.getstate(), torch.get_rng_state()
+
+
+def _restore(state):
+    python_state, torch_state = state
+    random.setstate(python_state)
+    torch.set_rng_state(torch_state)
+
+
+class GameRNG:
+    """One game's RNG states; ``with rng:`` plays with them, then puts the caller's back.
+
+    numpy is the game's NumPy Generator, to pass as rng explicitly.
+    """
+
+    def __init__(self, seed):
+        outer = _capture()
+        random.seed(seed)
+        torch.manual_seed(seed)
+        self.state = _capture()
+        _restore(outer)
+        self.numpy = np.random.default_rng(seed)
+        self._outer = None
+
+    def __enter__(self):
+        self._outer = _capture()
+        _restore(self.state)
+        return self
+
+    def __exit__(self, *exc):
+        self.state = _capture()
+        _restore(self._outer)
+        self._outer = None
+        return False
@@ -1,5 +1,6 @@
 # training/selfplay.py
 import sys, os
+import json
 import numpy as np
 import multiprocessing
 
@@ -21,97 +22,105 @@ def _get_temperature(iteration):
 global_game_counter = 0
 
 
-def _selfplay_worker(args):
-    """Worker function that plays N games and returns collected examples.
+def _build_worker_model(weights, quantize, calibration_states):
+    """Inference model on the shared weights (training/shared_weights.py).
 
-    Runs in a subprocess -- creates its own headless Game instance.
-    Each worker is independent with no shared state.
+    A quantized model is a private int8 copy built from unfused weights.
     """
-    (
-        num_games, max_moves, iteration, model_state_dict, worker_id,
-        stockfish_ratio, stockfish_depth,
-    ) = args
-
-    # Nice this process down so it doesn't compete with priority jobs
-    try:
-        os.nice(10)
-    except OSError:
-        pass
-
+    from training.shared_weights import build_model
+    model = build_model(weights)
+    if quantize:
+        from training.quantize import build_quantized_model
+        return build_quantized_model(model, quantize, calibration_states)
+    return model
+
+
+class _GameSlot:
+    """A game in progress in _play_games."""
+
+    def __init__(self, game, rng, numpy_rng):
+        import time
+        self.game = game
+        self.rng = rng
+        self.numpy_rng = numpy_rng
+        self.adjudicator = None
+        self.use_stockfish = False
+        self.sf_color = None
+        self.move_count = 0
+        self.examples = []
+        self.started = time.perf_counter()
+        self.done = False
+
+
+def _play_games(num_games, max_moves, iteration, model, device, cache, sf_opponent,
+                stockfish_ratio, book, book_plies, tablebases, gumbel_simulations, batch_eval,
+                adjudication=None, lockstep_games=1, seeds=None, check_interruption=None):
+    """Play num_games headless games.
+
+    Returns ((states, policies, values) arrays or None, per-game records);
+    see training/adjudication.py for the records and the adjudication
+    rules. batch_eval=False keeps the Gumbel search to one position per
+    forward pass (for an InferenceClient).
+
+    lockstep_games > 1 advances that many games together: each ply, the
+    positions of every game waiting on the network are evaluated in one
+    batch (into cache), then each game samples its own move from the
+    cached outputs. A finished game is replaced by a new one until
+    num_games have been started.
+
+    seeds: one seed per game (training/seeding.py); each game then plays
+    with its own RNG states.
+
+    check_interruption() is polled before every ply; once it returns True,
+    the games in progress are dropped and only finished ones are returned.
+    """
+    import contextlib
     import random as _random
+    import time
     from src.game import Game
+    from training.adjudication import Adjudication
+    from training.eval_cache import EvalCache
+    from training.search import PolicyPrior
+    from training.seeding import GameRNG
+    if adjudication is None:
+        adjudication = Adjudication()
+    if cache is None and model is not None:
+        cache = EvalCache()
+    prior = None
+    if model is not None and batch_eval and lockstep_games > 1:
+        prior = PolicyPrior(model, device, cache)
 
     states = []
     policy_targets = []
     value_targets = []
+    records = []
 
-    model = None
-    device = None
-    if model_state_dict is not None:
-        import torch
-        from training.model import ChessNet
-        device = torch.device("cpu")
-        model = ChessNet(num_channels=13, policy_size=8513).to(device)
-        model.load_state_dict(model_state_dict)
-        model.train(False)
-
-    # Open one Stockfish engine per worker (reused across games)
-    sf_opponent = None
-    if stockfish_ratio > 0:
-        try:
-            from training.stockfish_opponent import StockfishOpponent
-            sf_opponent = StockfishOpponent(depth=stockfish_depth)
-        except FileNotFoundError:
-            pass  # Stockfish not installed — fall back to pure self-play
-
-    for game_idx in range(num_games):
+    def new_slot(index):
         game_instance = Game(screen=None, headless=True)
         game_instance.new_game()
-        move_count = 0
-        game_examples = []
-
-        # Decide if this game uses Stockfish and which side it plays
-        use_stockfish = sf_opponent is not None and _random.random() < stockfish_ratio
-        sf_color = _random.choice(["white", "black"]) if use_stockfish else None
-
-        while not game_instance.is_game_over() and move_count < max_moves:
-            current_turn = game_instance.turn
-
-            if use_stockfish and current_turn == sf_color:
-                # Stockfish's turn — get its move, don't collect training example
-                move = sf_opponent.get_move(game_instance)
-            elif model is not None:
-                temp = _get_temperature(iteration)
-                move = game_instance.get_model_move(
-                    model, device, temperature=temp,
-                    use_dirichlet=True, epsilon=0.25, alpha=0.3, sample=True,
-                )
-            else:
-                move = game_instance.get_random_move()
-
-            if move is None:
-                game_instance.game_over = True
-                game_instance.winner = "draw"
-                break
-
-            # Only collect training examples from the model's turns
-            if not (use_stockfish and current_turn == sf_color):
-                example = game_instance.get_training_example()
-                game_examples.append(example)
-
-            game_instance.apply_move(move)
-            move_count += 1
-
-        if move_count >= max_moves and not game_instance.is_game_over():
+        if seeds is not None:
+            rng = GameRNG(seeds[index])
+            slot = _GameSlot(game_instance, rng, rng.numpy)
+        else:
+            slot = _GameSlot(game_instance, contextlib.nullcontext(), None)
+        with slot.rng:
+            # Decide if this game uses Stockfish and which side it plays
+            slot.use_stockfish = sf_opponent is not None and _random.random() < stockfish_ratio
+            slot.sf_color = _random.choice(["white", "black"]) if slot.use_stockfish else None
+            slot.adjudicator = adjudication.new_game(tablebases)
+        return slot
+
+    def finish(slot):
+        game_instance = slot.game
+        slot.done = True
+        if slot.move_count >= max_moves and not game_instance.is_game_over():
             game_instance.game_over = True
             game_instance.winner = "draw"
             game_instance.max_moves_reached = True
-
-        if not game_instance.is_game_over():
-            continue
-
+        records.append(slot.adjudicator.record(game_instance, slot.move_count,
+                                               time.perf_counter() - slot.started))
         outcome = game_instance.get_outcome()
-        for state, policy, player in game_examples:
+        for state, policy, player in slot.examples:
             if game_instance.winner == "draw":
                 adjusted_outcome = outcome
             else:
@@ -120,17 +129,368 @@ def _selfplay_worker(args):
             policy_targets.append(policy)
             value_targets.append(adjusted_outcome)
 
-    if sf_opponent is not None:
-        sf_opponent.close()
+    def plan(slot):
+        """How slot's game makes its next move: (kind, move, legal_actions)."""
+        game_instance = slot.game
+        if slot.use_stockfish and game_instance.turn == slot.sf_color:
+            # Stockfish's turn — get its move, don't collect training example
+            return "stockfish", None, None
+        book_move = None
+        if book is not None and slot.move_count < book_plies:
+            book_move = book.probe(game_instance, sample=True, rng=slot.numpy_rng)
+        if book_move is not None:
+            return "book", book_move, None
+        if model is not None:
+            return "model", None, game_instance.get_legal_actions()
+        return "random", None, None
+
+    def play(slot, kind, move, legal_actions):
+        game_instance = slot.game
+        adjudicator = slot.adjudicator
+        action_probs = None
+        if kind == "stockfish":
+            move = sf_opponent.get_move(game_instance)
+        elif kind == "model" and gumbel_simulations > 0:
+            from training.gumbel import gumbel_root_search
+            result = gumbel_root_search(
+                game_instance, model, device, num_simulations=gumbel_simulations,
+                cache=cache, batch=batch_eval, rng=slot.numpy_rng,
+            )
+            move = result["action"]
+            action_probs = dict(zip(result["actions"], result["policy"]))
+        elif kind == "model":
+            temp = _get_temperature(iteration)
+            move = game_instance.get_model_move(
+                model, device, temperature=temp,
+                use_dirichlet=True, epsilon=0.25, alpha=0.3, sample=True,
+                cache=cache, legal_actions=legal_actions,
+            )
+            if legal_actions:
+                # The uniform target over the actions already generated.
+                action_probs = dict.fromkeys(legal_actions, 1.0 / len(legal_actions))
+        elif kind == "random":
+            move = game_instance.get_random_move()
+
+        if move is None:
+            game_instance.game_over = True
+            game_instance.winner = "draw"
+            finish(slot)
+            return
+
+        if kind == "model" and adjudicator.needs_value:
+            # The move's evaluation is in the cache, so this is free.
+            value = game_instance.evaluate_value(model, device, cache=cache)
+            if adjudicator.observe_value(game_instance, value, slot.move_count):
+                finish(slot)
+                return
+
+        # Only collect training examples from the model's turns
+        if kind != "stockfish":
+            slot.examples.append(game_instance.get_training_example(action_probs))
+
+        game_instance.apply_move(move)
+        slot.move_count += 1
+        adjudicator.after_move(game_instance)
+        if game_instance.is_game_over() or slot.move_count >= max_moves:
+            finish(slot)
+
+    slots = []
+    games_started = 0
+    while slots or games_started < num_games:
+        if check_interruption is not None and check_interruption():
+            break
+        while len(slots) < lockstep_games and games_started < num_games:
+            slots.append(new_slot(games_started))
+            games_started += 1
+
+        # Decide who moves how; games waiting on the network share one batch.
+        plans = []
+        for slot in slots:
+            with slot.rng:
+                plans.append(plan(slot))
+        if prior is not None:
+            waiting = [(slot.game, actions) for slot, (kind, _, actions) in zip(slots, plans)
+                       if kind == "model"]
+            if len(waiting) > 1:
+                prior.prefetch([g for g, _ in waiting], [a for _, a in waiting])
+
+        for slot, slot_plan in zip(slots, plans):
+            with slot.rng:
+                play(slot, *slot_plan)
+
+        slots = [slot for slot in slots if not slot.done]
 
     if not states:
-        return None
+        return None, records
 
     return (
         np.array(states, dtype=np.float32),
         np.array(policy_targets, dtype=np.float32),
         np.array(value_targets, dtype=np.float32).reshape(-1, 1),
+    ), records
+
+
+# State of a SelfPlayPool worker process, kept between tasks.
+_pool_worker = None
+
+
+def _init_pool_worker(server_handle=None):
+    """SelfPlayPool initializer: pay the import cost once per process."""
+    global _pool_worker
+    try:
+        os.nice(10)
+    except OSError:
+        pass
+    import torch  # noqa: F401
+    import src.game  # noqa: F401
+    import training.model  # noqa: F401
+    from training.eval_cache import EvalCache
+    client = None
+    if server_handle is not None:
+        # Evaluate through a shared InferenceServer instead of a local model.
+        from training.inference_server import get_worker_client, init_worker_client
+        init_worker_client(server_handle)
+        client = get_worker_client()
+    _pool_worker = {
+        "version": None,
+        "model": None,
+        "client": client,
+        "cache": EvalCache(),
+        "stockfish": None,
+        "stockfish_missing": False,
+        "book": (None, None),
+        "tablebases": (None, None),
+        "tasks": 0,
+    }
+
+
+def _close_pool_stockfish():
+    if _pool_worker is not None and _pool_worker["stockfish"] is not None:
+        _pool_worker["stockfish"].close()
+        _pool_worker["stockfish"] = None
+
+
+def _pool_task(args):
+    """Play one game (or a small chunk) of a generate_selfplay_data call.
+
+    first_game is the index of the task's first game in the call, which
+    fixes the games' seeds when settings["seed"] is set.
+    """
+    num_games, settings, first_game = args
+    import time
+    import torch
+    started = time.time()
+    state = _pool_worker
+    state["tasks"] += 1
+
+    # Rebuild the model only when the parent has published new weights.
+    weights = settings["weights"]
+    version = weights.version if weights is not None else None
+    if version != state["version"]:
+        state["model"] = None
+        if weights is not None:
+            calibration_states = None
+            if settings["quantize"] == "static":
+                from training.quantize import load_calibration_states
+                calibration_states = load_calibration_states(settings["calibration_path"])
+            state["model"] = _build_worker_model(weights, settings["quantize"], calibration_states)
+        state["cache"].clear()
+        state["version"] = version
+
+    opening_book = settings["opening_book"]
+    if opening_book != state["book"][0]:
+        book = None
+        if opening_book is not None:
+            from training.opening_book import load_book
+            book = load_book(opening_book)
+        state["book"] = (opening_book, book)
+
+    tablebase_dir = settings["tablebase_dir"]
+    if tablebase_dir != state["tablebases"][0]:
+        tablebases = None
+        if tablebase_dir is not None:
+            from training.tablebase import load_tablebases
+            tablebases = load_tablebases(tablebase_dir)
+        state["tablebases"] = (tablebase_dir, tablebases)
+
+    # One engine for the life of the process; only its depth follows the schedule.
+    sf_opponent = None
+    if settings["stockfish_ratio"] > 0 and not state["stockfish_missing"]:
+        if state["stockfish"] is None:
+            try:
+                from training.stockfish_opponent import StockfishOpponent
+                state["stockfish"] = StockfishOpponent(depth=settings["stockfish_depth"])
+                from multiprocessing import util
+                util.Finalize(None, _close_pool_stockfish, exitpriority=10)
+            except FileNotFoundError:
+                state["stockfish_missing"] = True
+        sf_opponent = state["stockfish"]
+        if sf_opponent is not None:
+            sf_opponent.depth = settings["stockfish_depth"]
+
+    seeds = None
+    if settings["seed"] is not None:
+        from training.seeding import game_seed
+        seeds = [game_seed(settings["seed"], settings["iteration"], first_game + i)
+                 for i in range(num_games)]
+        # Batched and single evaluations can differ in the last bits, so
+        # a cache filled by whichever tasks ran here before would too.
+        state["cache"].clear()
+
+    model = state["model"]
+    batch_eval = True
+    if model is None and weights is None and state["client"] is not None:
+        # A server-backed client evaluates one position at a time.
+        model = state["client"]
+        batch_eval = False
+    result = _play_games(
+        num_games, settings["max_moves"], settings["iteration"], model,
+        torch.device("cpu") if model is not None else None, state["cache"], sf_opponent,
+        settings["stockfish_ratio"], state["book"][1], settings["book_plies"],
+        state["tablebases"][1], settings["gumbel_simulations"], batch_eval=batch_eval,
+        adjudication=settings["adjudication"], lockstep_games=settings["lockstep_games"],
+        seeds=seeds,
     )
+    return os.getpid(), state["tasks"], result, started, time.time()
+
+
+def schedule_report(timings, num_workers, started, finished):
+    """Busy/idle breakdown of one run from per-task (pid, start, end) times.
+
+    idle is worker time not spent playing between started and finished;
+    tail is the straggler wait, from the first worker running out of games
+    to the last game finishing.
+    """
+    wall = max(finished - started, 1e-9)
+    busy = {}
+    last_end = {}
+    for pid, start, end in timings:
+        busy[pid] = busy.get(pid, 0.0) + end - start
+        last_end[pid] = max(last_end.get(pid, end), end)
+    total_busy = sum(busy.values())
+    # A worker that never got a game was idle from the start.
+    first_idle = min(last_end.values()) if len(last_end) >= num_workers else started
+    return {
+        "tasks": len(timings),
+        "workers": num_workers,
+        "wall": wall,
+        "busy": total_busy,
+        "idle": max(num_workers * wall - total_busy, 0.0),
+        "tail": max(finished - first_idle, 0.0) if timings else 0.0,
+        "utilization": min(total_busy / (num_workers * wall), 1.0),
+    }
+
+
+class SelfPlayPool:
+    """Self-play worker processes that live across generate_selfplay_data calls.
+
+    Each worker imports torch and the game once, keeps its EvalCache and
+    Stockfish engine between calls, and rebuilds its model only when
+    update_model() publishes a new weight version.
+
+        with SelfPlayPool(num_workers=8) as pool:
+            for iteration in range(iterations):
+                generate_selfplay_data(..., model=model, pool=pool)
+                train(model)
+
+    Weights are published once per version into shared memory
+    (training/shared_weights.py); tasks carry only the small handle.
+    Games are handed out one task at a time (imap_unordered), so a worker
+    that finishes a short game picks up the next one instead of waiting on
+    a fixed share. server_handle makes every worker an InferenceClient of
+    that InferenceServer. keep_versions weight versions stay mapped for
+    tasks submitted before newer ones were published (see submit()).
+    """
+
+    def __init__(self, num_workers, server_handle=None, keep_versions=1):
+        self.num_workers = num_workers
+        self.server_handle = server_handle
+        self.keep_versions = keep_versions
+        self.version = 0
+        self.weights = None
+        self._pool = None
+        self._shared = None
+
+    def start(self):
+        from training.shared_weights import SharedWeights
+        self._shared = SharedWeights(keep=self.keep_versions)
+        self._pool = multiprocessing.Pool(
+            processes=self.num_workers, initializer=_init_pool_worker,
+            initargs=(self.server_handle,),
+        )
+        return self
+
+    def update_model(self, model, fused=True):
+        """Publish model's current weights (None: random play) to the workers.
+
+        fused=False publishes the unfused weights quantized workers need.
+        """
+        self.weights = None
+        if model is not None:
+            self.weights = self._shared.publish(model, fused=fused)
+        self.version += 1
+
+    def run(self, num_games, settings, chunksize=1, on_result=None, ordered=False):
+        """Play num_games games, chunksize games per task.
+
+        settings holds _pool_task's per-call options (the current weights
+        are added here). Returns ([(pid, tasks_run, result)], schedule_report).
+        With on_result, each result is passed to on_result(result) as soon
+        as its task finishes and is not kept in the returned list.
+        The report's delivery is the total time from tasks finishing in
+        their worker to their results reaching this process (pickling, the
+        pipe, and waiting behind earlier results). ordered=True delivers
+        results in task order rather than as tasks finish.
+        """
+        import time
+        settings = dict(settings, weights=self.weights)
+        chunks = [chunksize] * (num_games // chunksize)
+        if num_games % chunksize:
+            chunks.append(num_games % chunksize)
+        started = time.time()
+        results = []
+        timings = []
+        delivery = 0.0
+        tasks = [(n, settings, chunksize * i) for i, n in enumerate(chunks)]
+        imap = self._pool.imap if ordered else self._pool.imap_unordered
+        for pid, tasks_run, result, start, end in imap(_pool_task, tasks):
+            delivery += max(time.time() - end, 0.0)
+            if on_result is not None:
+                on_result(result)
+                result = None
+            results.append((pid, tasks_run, result))
+            timings.append((pid, start, end))
+        schedule = schedule_report(timings, self.num_workers, started, time.time())
+        schedule["delivery"] = delivery
+        return results, schedule
+
+    def submit(self, num_games, settings, first_game=0, callback=None, error_callback=None):
+        """Start one task of num_games games with the current weights, without waiting.
+
+        callback gets the task's (pid, tasks_run, result, start, end) and
+        error_callback its exception, on the pool's result thread.
+        """
+        settings = dict(settings, weights=self.weights)
+        return self._pool.apply_async(_pool_task, ((num_games, settings, first_game),),
+                                      callback=callback, error_callback=error_callback)
+
+    def stop(self):
+        if self._pool is not None:
+            # close()+join() rather than terminate(): see generate_selfplay_data.
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+            self.weights = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
 
 
 def generate_selfplay_data(
@@ -138,71 +498,132 @@ def generate_selfplay_data(
     max_moves=50_000, data_path=None, max_buffer_size=500_000,
     iteration=0, num_workers=0,
     stockfish_ratio=0.0, stockfish_depth=1,
+    inference_server=False, max_latency=0.002, quantize=None,
+    opening_book=None, book_plies=8, tablebase_dir=None, gumbel_simulations=0,
+    pool=None, adjudication=None, game_log=None, lockstep_games=1, seed=None,
 ):
     """
     Simulate self-play games, optionally in parallel.
 
-    num_workers=0: sequential (original behavior).
-    num_workers>0: parallel using multiprocessing.Pool.
+    num_workers=0: sequential, in this process, through the same per-task
+    game loop (_play_games) the workers run.
+    num_workers>0: parallel on a SelfPlayPool; games are dispatched one per
+    task to whichever worker is free, and the busy/idle/straggler time of
+    the run is printed.
+
+    inference_server=True (parallel mode with a model only): workers share one
+    InferenceServer process that batches their forward passes, instead of each
+    loading its own copy of the model. max_latency bounds how long the server
+    waits to fill a batch.
+
+    quantize="dynamic" or "static" (parallel mode with a model only): workers
+    play with an int8 quantized copy of the model (see training/quantize.py).
+    Static mode calibrates on the first examples of the existing buffer.
+
+    opening_book: path of an opening book (training/opening_book.py); for the
+    first book_plies plies of each game, moves are sampled from the book
+    while the position is in it, instead of running the model.
+
+    tablebase_dir: endgame tables (training/tablebase.py); a game ends with
+    the exact result as soon as its position is covered.
+
+    gumbel_simulations > 0 (with a model): moves come from the Gumbel root
+    search of training/gumbel.py with that many evaluations per move, and
+    its improved policy replaces the uniform policy target.
+
+    pool: a started SelfPlayPool; games run on its persistent workers
+    (num_workers is ignored) after model's weights are published to them.
+    Not combined with inference_server.
+
+    adjudication: an Adjudication (training/adjudication.py) that ends
+    games early by resignation, static-material draw or material lead;
+    endgame tables (tablebase_dir) adjudicate unless it disables them.
+    Every game's record (plies, seconds, result, end reason) goes into the
+    printed summary and, with game_log, is appended to that JSONL file.
+
+    lockstep_games > 1: each task plays that many games side by side,
+    batching their network evaluations.
+
+    seed: master seed (training/seeding.py). Each game's Python, NumPy and
+    torch randomness comes from a seed derived from (seed, iteration, game
+    index), and parallel results are stored in game order, so the same
+    seed and settings reproduce the same games and buffer whatever the
+    worker count. Sequential mode plays the same tasks with the same
+    seeds, but evaluates with the unfused model, so its games can differ
+    from parallel mode's in the last bits of the network's outputs.
     """
     global global_game_counter
     if data_path is None:
         data_path = _DATA_PATH
+    if pool is not None and inference_server:
+        raise ValueError("inference_server is not supported with a SelfPlayPool")
 
-    if num_workers > 0 and num_games > 1:
-        # Parallel mode
-        model_state_dict = None
-        if model is not None:
-            model_state_dict = {k: v.cpu() for k, v in model.state_dict().items()}
-
-        # Distribute games across workers
-        games_per_worker = [num_games // num_workers] * num_workers
-        for i in range(num_games % num_workers):
-            games_per_worker[i] += 1
-        # Filter out workers with 0 games
-        games_per_worker = [g for g in games_per_worker if g > 0]
-        actual_workers = len(games_per_worker)
-
-        worker_args = [
-            (gpw, max_moves, iteration, model_state_dict, i,
-             stockfish_ratio, stockfish_depth)
-            for i, gpw in enumerate(games_per_worker)
-        ]
-
-        with multiprocessing.Pool(processes=actual_workers) as pool:
-            results = pool.map(_selfplay_worker, worker_args)
-
-        # Merge results from all workers
-        all_states = []
-        all_policies = []
-        all_values = []
-        for result in results:
-            if result is not None:
-                s, p, v = result
-                all_states.append(s)
-                all_policies.append(p)
-                all_values.append(v)
+    if pool is not None:
+        num_workers = pool.num_workers
 
-        global_game_counter += num_games
+    # Finished games go straight to the replay spool (training/replay_store.py)
+    # and are folded into the buffer once, at the end.
+    from training.replay_store import ReplayWriter
+    writer = ReplayWriter(
+        data_path, max_buffer_size, policy_size=model.policy_size if model is not None else None,
+    )
+    progress_every = max(1, num_games // 10)
+    game_records = []
+
+    def save_game(result):
+        examples, records = result
+        if examples is not None:
+            writer.append(*examples)
+        for record in records:
+            game_records.append(record)
+            if game_log is not None:
+                with open(game_log, "a") as f:
+                    f.write(json.dumps(dict(record, iteration=iteration)) + "\n")
+            if len(game_records) % progress_every == 0:
+                print(f"  {len(game_records)}/{num_games} games, {writer.appended} examples spooled.")
+
+    if pool is not None or (num_workers > 0 and num_games > 1):
+        # Parallel mode: one game per task, handed to whichever worker is free.
+        use_server = inference_server and model is not None
+        server = None
+        temporary_pool = None
+        if pool is None:
+            server_handle = None
+            workers = min(num_workers, num_games)
+            if use_server:
+                from training.inference_server import InferenceServer
+                server = InferenceServer(
+                    {k: v.cpu() for k, v in model.state_dict().items()}, num_slots=workers,
+                    max_latency=max_latency, model_kwargs=model.config,
+                ).start()
+                server_handle = server.handle()
+            temporary_pool = pool = SelfPlayPool(workers, server_handle=server_handle).start()
 
-        if not all_states:
-            print("No new examples generated, skipping save.")
-            return
+        try:
+            # Quantized workers fuse themselves and need the raw weights.
+            pool.update_model(None if use_server else model, fused=not quantize)
+            _, schedule = pool.run(num_games, {
+                "max_moves": max_moves, "iteration": iteration, "quantize": quantize,
+                "calibration_path": data_path, "stockfish_ratio": stockfish_ratio,
+                "stockfish_depth": stockfish_depth, "opening_book": opening_book,
+                "book_plies": book_plies, "tablebase_dir": tablebase_dir,
+                "gumbel_simulations": gumbel_simulations, "adjudication": adjudication,
+                "lockstep_games": lockstep_games, "seed": seed,
+            }, chunksize=lockstep_games, on_result=save_game, ordered=seed is not None)
+        finally:
+            if temporary_pool is not None:
+                temporary_pool.stop()
+            if server is not None:
+                server.stop()
+                requests, batches, mean_batch = server.stats()
+                print(f"Inference server: {requests} requests in {batches} batches (mean batch {mean_batch:.1f}).")
+        print(f"Self-play schedule: {schedule['tasks']} games on {schedule['workers']} workers in "
+              f"{schedule['wall']:.1f}s; busy {schedule['busy']:.1f}s, idle {schedule['idle']:.1f}s "
+              f"({schedule['utilization']:.0%} utilization), straggler tail {schedule['tail']:.1f}s.")
 
-        new_states = np.concatenate(all_states, axis=0)
-        new_policy = np.concatenate(all_policies, axis=0)
-        new_values = np.concatenate(all_values, axis=0)
+        global_game_counter += num_games
     else:
-        # Sequential mode (original behavior)
-        import random as _random
-        import pygame
-        import src.board as board
-        from src.game import Game
-
-        pygame.init()
-        screen = pygame.Surface((board.WINDOW_WIDTH, board.WINDOW_HEIGHT))
-
-        # Open Stockfish for sequential mode if needed
+        # Sequential mode: the tasks a pool would run, played here in turn.
         sf_opponent = None
         if stockfish_ratio > 0:
             try:
@@ -211,115 +632,58 @@ def generate_selfplay_data(
             except FileNotFoundError:
                 pass
 
-        states = []
-        policy_targets = []
-        value_targets = []
-
-        for _ in range(num_games):
-            game_idx = global_game_counter
-            global_game_counter += 1
-
-            if check_interruption is not None and check_interruption():
-                print(f"Self-play interrupted before game {game_idx}.")
-                break
+        cache = None
+        if model is not None:
+            from training.eval_cache import EvalCache
+            cache = EvalCache()
 
-            game_instance = Game(screen)
-            move_count = 0
-            game_examples = []
-            game_instance.new_game()
+        book = None
+        if opening_book is not None:
+            from training.opening_book import load_book
+            book = load_book(opening_book)
 
-            use_stockfish = (
-                sf_opponent is not None and _random.random() < stockfish_ratio
-            )
-            sf_color = _random.choice(["white", "black"]) if use_stockfish else None
+        tablebases = None
+        if tablebase_dir is not None:
+            from training.tablebase import load_tablebases
+            tablebases = load_tablebases(tablebase_dir)
 
-            while not game_instance.is_game_over() and move_count < max_moves:
+        try:
+            for first_game in range(0, num_games, lockstep_games):
                 if check_interruption is not None and check_interruption():
-                    print(f"Self-play interrupted during game {game_idx}.")
+                    print(f"Self-play interrupted after {first_game} games.")
                     break
-
-                pygame.event.pump()
-                game_instance.update()
-
-                current_turn = game_instance.turn
-
-                if use_stockfish and current_turn == sf_color:
-                    move = sf_opponent.get_move(game_instance)
-                elif model is not None:
-                    temp = _get_temperature(iteration)
-                    move = game_instance.get_model_move(
-                        model, device, temperature=temp,
-                        use_dirichlet=True, epsilon=0.25, alpha=0.3, sample=True,
-                    )
-                else:
-                    move = game_instance.get_random_move()
-
-                if move is None:
-                    game_instance.game_over = True
-                    game_instance.winner = "draw"
+                n = min(lockstep_games, num_games - first_game)
+                seeds = None
+                if seed is not None:
+                    from training.seeding import game_seed
+                    seeds = [game_seed(seed, iteration, first_game + i) for i in range(n)]
+                    if cache is not None:
+                        cache.clear()  # As in _pool_task
+                result = _play_games(
+                    n, max_moves, iteration, model, device, cache, sf_opponent, stockfish_ratio,
+                    book, book_plies, tablebases, gumbel_simulations, batch_eval=True,
+                    adjudication=adjudication, lockstep_games=lockstep_games, seeds=seeds,
+                    check_interruption=check_interruption,
+                )
+                save_game(result)
+                global_game_counter += len(result[1])
+                if len(result[1]) < n:
+                    print(f"Self-play interrupted during games {first_game}-{first_game + n - 1}.")
                     break
+        finally:
+            if sf_opponent is not None:
+                sf_opponent.close()
 
-                if not (use_stockfish and current_turn == sf_color):
-                    example = game_instance.get_training_example()
-                    game_examples.append(example)
-
-                game_instance.apply_move(move)
-                game_instance.update()
-                move_count += 1
-
-            if move_count >= max_moves and not game_instance.is_game_over():
-                game_instance.game_over = True
-                game_instance.winner = "draw"
-                game_instance.max_moves_reached = True
-                print(f"Game {game_idx} terminated due to max moves reached.")
-
-            if not game_instance.is_game_over():
-                print(f"Game {game_idx} terminated early due to interruption.")
-                continue
-
-            outcome = game_instance.get_outcome()
-            for state, policy, player in game_examples:
-                if game_instance.winner == "draw":
-                    adjusted_outcome = outcome
-                else:
-                    adjusted_outcome = outcome if player == "white" else -outcome
-                states.append(state)
-                policy_targets.append(policy)
-                value_targets.append(adjusted_outcome)
-
-        if sf_opponent is not None:
-            sf_opponent.close()
-
-        if not states:
-            print("No new examples generated, skipping save.")
-            return
+    if game_records:
+        from training.adjudication import format_summary, summarize_games
+        print(format_summary(summarize_games(game_records)))
 
-        new_states = np.array(states, dtype=np.float32)
-        new_policy = np.array(policy_targets, dtype=np.float32)
-        new_values = np.array(value_targets, dtype=np.float32).reshape(-1, 1)
+    if writer.pending_rows == 0:
+        print("No new examples generated, skipping save.")
+        return
 
-    # Replay buffer: load existing data and append
-    if os.path.exists(data_path):
-        try:
-            existing = np.load(data_path)
-            old_states = existing['states']
-            old_policy = existing['policy_targets']
-            old_values = existing['value_targets']
-            existing.close()
-            new_states = np.concatenate([old_states, new_states], axis=0)
-            new_policy = np.concatenate([old_policy, new_policy], axis=0)
-            new_values = np.concatenate([old_values, new_values], axis=0)
-        except Exception:
-            pass
-
-    # Trim to max buffer size (keep most recent)
-    if new_states.shape[0] > max_buffer_size:
-        new_states = new_states[-max_buffer_size:]
-        new_policy = new_policy[-max_buffer_size:]
-        new_values = new_values[-max_buffer_size:]
-
-    np.savez(data_path, states=new_states, policy_targets=new_policy, value_targets=new_values)
-    print(f"Generated self-play data from {num_games} games. Buffer size: {new_states.shape[0]}. Total games so far: {global_game_counter}.")
+    buffer_size = writer.commit()
+    print(f"Generated self-play data from {num_games} games. Buffer size: {buffer_size}. Total games so far: {global_game_counter}.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+"""Model weights published once into shared memory for self-play workers.
+
+SharedWeights.publish() writes a model's tensors into one memory-mapped
+file (under /dev/shm where available) and returns a small WeightsHandle:
+path, version, tensor layout and model config. Workers receive the handle
+instead of a pickled state_dict, map the file read-only and build their
+model directly on top of the mapping, so every worker shares one physical
+copy of the weights.
+
+By default the parent folds BatchNorm once (inference_model.fuse_for_inference)
+and publishes the fused weights; TorchScript freezing keeps pointing at the
+mapped tensors. Quantized workers need the unfused weights (fused=False)
+and build a private int8 copy from them.
+
+Each publish() writes a new file and removes the one keep versions back
+(by default the previous one); a worker still holding an old mapping keeps
+it valid until it lets go. Keeping more lets tasks queued with an older
+handle still map it after newer versions are out.
+"""
+
+import os
+import shutil
+import tempfile
+import warnings
+
+import numpy as np
+import torch
+
+from .inference_model import freeze_for_inference, fuse_for_inference
+from .model import ChessNet
+
+_SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+_ALIGN = 64
+
+
+class WeightsHandle:
+    """Picklable description of one published weight version."""
+
+    def __init__(self, path, version, layout, model_config, fused):
+        self.path = path
+        self.version = version
+        self.layout = layout  # [(key, dtype, shape, offset, channels_last)]
+        self.model_config = model_config
+        self.fused = fused
+
+
+class SharedWeights:
+    """Publisher side: owns the directory holding the current weights file."""
+
+    def __init__(self, keep=1):
+        self.directory = tempfile.mkdtemp(prefix="chess_weights_", dir=_SHM_DIR)
+        self.keep = keep
+        self.version = 0
+        self.handle = None
+        self._published = []
+
+    def publish(self, model, fused=True):
+        """Write model's weights as a new version; returns its WeightsHandle."""
+        source = fuse_for_inference(model) if fused else model
+        tensors = []
+        layout = []
+        offset = 0
+        for key, tensor in source.state_dict().items():
+            tensor = tensor.detach().cpu()
+            channels_last = tensor.dim() == 4 and tensor.is_contiguous(memory_format=torch.channels_last)
+            # Store channels_last tensors in NHWC order so workers get the
+            # same strides back as a view.
+            data = tensor.permute(0, 2, 3, 1) if channels_last else tensor
+            data = data.contiguous().numpy()
+            layout.append((key, data.dtype.str, tuple(tensor.shape), offset, channels_last))
+            tensors.append((offset, data))
+            offset += -(-data.nbytes // _ALIGN) * _ALIGN
+
+        self.version += 1
+        path = os.path.join(self.directory, f"weights_v{self.version}.bin")
+        buf = np.memmap(path, dtype=np.uint8, mode="w+", shape=(max(offset, 1),))
+        for start, data in tensors:
+            buf[start:start + data.nbytes] = data.reshape(-1).view(np.uint8)
+        buf.flush()
+        del buf
+
+        self._published.append(path)
+        while len(self._published) > self.keep:
+            os.remove(self._published.pop(0))
+        self.handle = WeightsHandle(path, self.version, layout, dict(model.config), fused)
+        return self.handle
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.handle = None
+        self._published = []
+
+
+def load_state_dict(handle):
+    """Read-only tensors viewing the mapped weights file."""
+    buf = np.memmap(handle.path, dtype=np.uint8, mode="r")
+    state = {}
+    with warnings.catch_warnings():
+        # torch warns that the mapping is not writable; nothing writes to it.
+        warnings.simplefilter("ignore", UserWarning)
+        for key, dtype, shape, offset, channels_last in handle.layout:
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape, dtype=np.int64))
+            if channels_last:
+                n, c, h, w = shape
+                array = buf[offset:offset + count * dtype.itemsize].view(dtype).reshape(n, h, w, c)
+                state[key] = torch.from_numpy(array).permute(0, 3, 1, 2)
+            else:
+                array = buf[offset:offset + count * dtype.itemsize].view(dtype).reshape(shape)
+                state[key] = torch.from_numpy(array)
+    return state
+
+
+def build_model(handle, script=True):
+    """Inference model whose parameters live in the mapped weights file.
+
+    A fused handle gives the scripted, frozen model of
+    build_inference_model (eager with script=False); an unfused one gives
+    a plain eval-mode ChessNet.
+    """
+    model = ChessNet(**handle.model_config)
+    model.train(False)
+    if handle.fused:
+        model = fuse_for_inference(model)
+    model.load_state_dict(load_state_dict(handle), assign=True)
+    for param in model.parameters():
+        param.requires_grad_(False)
+    if handle.fused and script:
+        return freeze_for_inference(model)
+    return model
@@ -0,0 +1,577 @@
+"""Retrograde endgame tablebases for small ChessBuilder material.
+
+A table covers one material configuration, named like "KQvK" (white pieces
+v black pieces), with every piece's gold capped at gold_cap. Each position
+(side to move, piece squares, piece gold) maps to an O(1) index; the table
+stores, per index, whether the side to move wins, loses or draws and in how
+many plies (distance to mate).
+
+Generation follows the game's rules (moves, promotions, collect_gold,
+purchases, gold transfers, and end_turn's mate / stalemate / insufficient
+material checks) with a compact move generator, then solves the table
+backwards from the mates by counting each position's unresolved successors.
+Captures and promotions lead into other tables, which are generated first.
+
+Gold is what keeps these endings open: pawns collect it without limit and
+kings spend it on new pieces. A move that takes a piece's gold past the cap
+or buys a piece leaves the table. Wins and losses are exact regardless,
+since they are proven through positions inside the tables; a position
+with neither is only called a draw when no sequence of moves from it can
+leave the tables, otherwise it stays unknown. Like other tablebases, the
+values ignore the 50-move and repetition rules.
+
+Tables are saved as ``<name>.g<gold_cap>.npy`` int16 arrays and memory-mapped
+by Tablebases, whose probe() / best_move() are used by AI, by the search and
+by self-play adjudication.
+
+Usage:
+    python -m training.tablebase [gold_cap] [config ...]
+"""
+
+import heapq
+import itertools
+import os
+import re
+import sys
+import time
+from array import array
+
+import numpy as np
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TABLEBASE_DIR = os.path.join(_SCRIPT_DIR, '..', 'models', 'tablebases')
+DEFAULT_CONFIGS = ("KQvK", "KRvK", "KPvK")
+
+UNKNOWN, DRAW, WIN, LOSS = 0, 1, 2, 3  # For the side to move
+PIECE_ORDER = "KQRBNP"
+PIECE_COST = {'P': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9}  # Same as src.board
+PROMOTIONS = ('Q', 'R', 'B', 'N')
+_TABLE_FILE = re.compile(r"^(K[QRBNP]*vK[QRBNP]*)\.g(\d+)\.npy$")
+
+
+def _steps(sq, deltas):
+    r, c = divmod(sq, 8)
+    return [(r + dr) * 8 + c + dc for dr, dc in deltas if 0 <= r + dr < 8 and 0 <= c + dc < 8]
+
+
+def _ray(sq, dr, dc):
+    r, c = divmod(sq, 8)
+    out = []
+    while 0 <= r + dr < 8 and 0 <= c + dc < 8:
+        r, c = r + dr, c + dc
+        out.append(r * 8 + c)
+    return out
+
+
+_KING_DELTAS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+_KNIGHT_DELTAS = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+_DIAGONAL = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+_ORTHOGONAL = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+_KING_STEPS = [_steps(sq, _KING_DELTAS) for sq in range(64)]
+_KNIGHT_STEPS = [_steps(sq, _KNIGHT_DELTAS) for sq in range(64)]
+_PAWN_CAPTURES = {
+    'white': [_steps(sq, [(-1, -1), (-1, 1)]) for sq in range(64)],
+    'black': [_steps(sq, [(1, -1), (1, 1)]) for sq in range(64)],
+}
+_RAYS = {
+    'B': [[_ray(sq, *d) for d in _DIAGONAL] for sq in range(64)],
+    'R': [[_ray(sq, *d) for d in _ORTHOGONAL] for sq in range(64)],
+    'Q': [[_ray(sq, *d) for d in _DIAGONAL + _ORTHOGONAL] for sq in range(64)],
+}
+
+
+def _other(color):
+    return 'black' if color == 'white' else 'white'
+
+
+# --- Rules on piece lists ---------------------------------------------------
+# A position is a tuple of (color, type, square, gold) pieces plus the side
+# to move; squares are row * 8 + col as on Game.board.
+
+def _attacks(piece, target, occupied):
+    color, ptype, sq, _ = piece
+    if ptype == 'K':
+        return target in _KING_STEPS[sq]
+    if ptype == 'N':
+        return target in _KNIGHT_STEPS[sq]
+    if ptype == 'P':
+        return target in _PAWN_CAPTURES[color][sq]
+    for ray in _RAYS[ptype][sq]:
+        for s in ray:
+            if s == target:
+                return True
+            if s in occupied:
+                break
+    return False
+
+
+def _in_check(color, pieces):
+    occupied = {p[2]: p for p in pieces}
+    king = next(p[2] for p in pieces if p[0] == color and p[1] == 'K')
+    return any(p[0] != color and _attacks(p, king, occupied) for p in pieces)
+
+
+def _piece_moves(piece, occupied):
+    """Destination squares as board.get_valid_moves (no en passant)."""
+    color, ptype, sq, _ = piece
+
+    def open_to(s):
+        return s not in occupied or occupied[s][0] != color
+
+    if ptype == 'K':
+        return [s for s in _KING_STEPS[sq] if open_to(s)]
+    if ptype == 'N':
+        return [s for s in _KNIGHT_STEPS[sq] if open_to(s)]
+    if ptype == 'P':
+        r, c = divmod(sq, 8)
+        direction = -1 if color == 'white' else 1
+        out = []
+        if 0 <= r + direction < 8:
+            forward = sq + 8 * direction
+            if forward not in occupied:
+                out.append(forward)
+                start = 6 if color == 'white' else 1
+                double = forward + 8 * direction
+                if r == start and double not in occupied:
+                    out.append(double)
+            out.extend(s for s in _PAWN_CAPTURES[color][sq]
+                       if s in occupied and occupied[s][0] != color)
+        return out
+    out = []
+    for ray in _RAYS[ptype][sq]:
+        for s in ray:
+            if s not in occupied:
+                out.append(s)
+            else:
+                if occupied[s][0] != color:
+                    out.append(s)
+                break
+    return out
+
+
+def _visible(piece, occupied):
+    """Squares of friendly pieces piece can pass gold to (board.get_visible_squares)."""
+    color, ptype, sq, _ = piece
+    if ptype in ('K', 'N', 'P'):
+        steps = {'K': _KING_STEPS, 'N': _KNIGHT_STEPS}.get(ptype) or _PAWN_CAPTURES[color]
+        return [s for s in steps[sq] if s in occupied and occupied[s][0] == color]
+    out = []
+    for ray in _RAYS[ptype][sq]:
+        for s in ray:
+            if s in occupied:
+                if occupied[s][0] == color:
+                    out.append(s)
+                break
+    return out
+
+
+def _coords(sq):
+    return divmod(sq, 8)
+
+
+def legal_actions(pieces, stm):
+    """[(action, child_pieces)] for stm, as Game.get_legal_actions would list them."""
+    occupied = {p[2]: p for p in pieces}
+    in_check = _in_check(stm, pieces)
+    out = []
+    own = [p for p in pieces if p[0] == stm]
+
+    for piece in own:
+        color, ptype, sq, gold = piece
+        for dst in _piece_moves(piece, occupied):
+            captured = occupied.get(dst)
+            rest = [p for p in pieces if p is not piece and p is not captured]
+            moved = (color, ptype, dst, gold + (captured[3] if captured else 0))
+            if _in_check(stm, rest + [moved]):
+                continue
+            action = ("move", _coords(sq), _coords(dst))
+            if ptype == 'P' and dst // 8 in (0, 7):
+                for promo in PROMOTIONS:
+                    out.append((action + (promo,), tuple(rest + [(color, promo, dst, moved[3])])))
+            else:
+                out.append((action + (None,), tuple(rest + [moved])))
+
+    if not in_check:
+        for piece in own:
+            if piece[1] == 'P':
+                child = [p for p in pieces if p is not piece] + [piece[:3] + (piece[3] + 1,)]
+                out.append((("collect_gold", _coords(piece[2]), None, None), tuple(child)))
+
+    king = next(p for p in own if p[1] == 'K')
+    if king[3] > 0:
+        for dst in _KING_STEPS[king[2]]:
+            if dst in occupied:
+                continue
+            for ptype in ('P', 'N', 'B', 'R', 'Q'):
+                cost = PIECE_COST[ptype]
+                if king[3] < cost or (ptype == 'P' and dst // 8 in (0, 7)):
+                    continue
+                child = ([p for p in pieces if p is not king]
+                         + [king[:3] + (king[3] - cost,), (stm, ptype, dst, 0)])
+                if not _in_check(stm, child):
+                    out.append((("purchase", _coords(king[2]), _coords(dst), ptype), tuple(child)))
+
+    if not in_check:
+        for piece in own:
+            if piece[3] <= 0:
+                continue
+            for dst in _visible(piece, occupied):
+                target = occupied[dst]
+                rest = [p for p in pieces if p is not piece and p is not target]
+                child = rest + [piece[:3] + (0,), target[:3] + (target[3] + piece[3],)]
+                out.append((("transfer_gold", _coords(piece[2]), _coords(dst), None), tuple(child)))
+    return out
+
+
+def _insufficient_material(pieces):
+    """Game.has_insufficient_material on a piece list."""
+    if any(p[3] > 0 for p in pieces):
+        return False
+    if len(pieces) == 2:
+        return True
+    non_kings = [p for p in pieces if p[1] != 'K']
+    if len(pieces) == 3:
+        return non_kings[0][1] in ('N', 'B')
+    if len(pieces) == 4 and all(p[1] == 'B' for p in non_kings):
+        return sum(p[2] // 8 + p[2] % 8 for p in non_kings) % 2 == 0
+    return False
+
+
+def terminal_result(pieces, stm):
+    """Result end_turn assigns on arrival, or None if play continues."""
+    if _insufficient_material(pieces):
+        return DRAW
+    occupied = {p[2]: p for p in pieces}
+    for piece in pieces:
+        if piece[0] != stm:
+            continue
+        for dst in _piece_moves(piece, occupied):
+            captured = occupied.get(dst)
+            rest = [p for p in pieces if p is not piece and p is not captured]
+            if not _in_check(stm, rest + [piece[:2] + (dst, piece[3])]):
+                return None
+    return LOSS if _in_check(stm, pieces) else DRAW
+
+
+# --- Indexing -----------------------------------------------------------------
+
+def _sort_key(piece):
+    return (piece[0] != 'white', PIECE_ORDER.index(piece[1]), piece[2])
+
+
+def config_name(pieces):
+    white = "".join(sorted((p[1] for p in pieces if p[0] == 'white'), key=PIECE_ORDER.index))
+    black = "".join(sorted((p[1] for p in pieces if p[0] == 'black'), key=PIECE_ORDER.index))
+    return f"{white}v{black}"
+
+
+def config_pieces(name):
+    """"KQvK" -> [('white', 'K'), ('white', 'Q'), ('black', 'K')]."""
+    white, black = name.split("v")
+    return [('white', t) for t in white] + [('black', t) for t in black]
+
+
+def mirror_name(name):
+    white, black = name.split("v")
+    return f"{black}v{white}"
+
+
+def mirror(pieces, stm):
+    """Swap colours and flip the board vertically (pawns keep their direction)."""
+    return tuple((_other(c), t, sq ^ 56, g) for c, t, sq, g in pieces), _other(stm)
+
+
+def position_index(pieces, stm, gold_cap):
+    """Index of a position in its configuration's table, or None if gold exceeds the cap."""
+    ordered = sorted(pieces, key=_sort_key)
+    index = 0 if stm == 'white' else 1
+    for p in ordered:
+        index = index * 64 + p[2]
+    for p in ordered:
+        if p[3] > gold_cap:
+            return None
+        index = index * (gold_cap + 1) + p[3]
+    return index
+
+
+def table_size(name, gold_cap):
+    n = len(name) - 1
+    return 2 * 64 ** n * (gold_cap + 1) ** n
+
+
+def _encode(result, plies):
+    if result == DRAW:
+        return 1
+    if result == WIN:
+        return 2 + 2 * plies
+    if result == LOSS:
+        return 3 + 2 * plies
+    return 0
+
+
+def _decode(value):
+    value = int(value)
+    if value == 0:
+        return UNKNOWN, 0
+    if value == 1:
+        return DRAW, 0
+    return (WIN if value % 2 == 0 else LOSS), (value - 2) // 2
+
+
+class Tablebases:
+    """Loaded tables by configuration name, with probes on pieces or games."""
+
+    def __init__(self, directory=None):
+        self.tables = {}  # name -> (gold_cap, int16 values)
+        if directory is not None and os.path.isdir(directory):
+            for filename in sorted(os.listdir(directory)):
+                match = _TABLE_FILE.match(filename)
+                if match:
+                    values = np.load(os.path.join(directory, filename), mmap_mode="r")
+                    self.add(match.group(1), int(match.group(2)), values)
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.tables)
+
+    def add(self, name, gold_cap, values):
+        # Keep the table with the highest gold cap per configuration.
+        if name not in self.tables or self.tables[name][0] < gold_cap:
+            self.tables[name] = (gold_cap, values)
+
+    def has(self, name):
+        return name in self.tables or mirror_name(name) in self.tables
+
+    def probe_pieces(self, pieces, stm):
+        """(result, plies) for the side to move, or None when not covered."""
+        name = config_name(pieces)
+        if name not in self.tables:
+            name = mirror_name(name)
+            if name not in self.tables:
+                return None
+            pieces, stm = mirror(pieces, stm)
+        gold_cap, values = self.tables[name]
+        index = position_index(pieces, stm, gold_cap)
+        if index is None:
+            return None
+        return _decode(values[index])
+
+    def probe(self, game):
+        """Exact (result, plies) for the side to move in game, or None."""
+        pieces = game_pieces(game)
+        if game.en_passant is not None and any(p[0] == game.turn and p[1] == 'P' for p in pieces):
+            return None
+        found = self.probe_pieces(pieces, game.turn)
+        if found is None or found[0] == UNKNOWN:
+            return None
+        self.hits += 1
+        return found
+
+    def best_move(self, game):
+        """The fastest win, a draw, or the slowest loss; None when the position is unresolved."""
+        if self.probe(game) is None:
+            return None
+        best, best_key = None, None
+        for action, child in legal_actions(game_pieces(game), game.turn):
+            found = self.probe_pieces(child, _other(game.turn))
+            if found is None or found[0] == UNKNOWN:
+                continue
+            result, plies = found
+            # Child results are for the opponent.
+            key = {LOSS: (2, -plies), DRAW: (1, 0), WIN: (0, plies)}[result]
+            if best_key is None or key > best_key:
+                best, best_key = action, key
+        return best
+
+
+def game_pieces(game):
+    return tuple((p.color, p.type, r * 8 + c, p.gold)
+                 for r, row in enumerate(game.board) for c, p in enumerate(row) if p is not None)
+
+
+def adjudicate(game, tablebases):
+    """End game with its exact tablebase result; returns whether it did."""
+    found = tablebases.probe(game)
+    if found is None:
+        return False
+    result = found[0]
+    game.game_over = True
+    if result == DRAW:
+        game.winner = "draw"
+    else:
+        game.winner = game.turn if result == WIN else _other(game.turn)
+    return True
+
+
+def load_tablebases(directory=None):
+    """Tablebases from directory (default models/tablebases), or None if it holds none."""
+    tablebases = Tablebases(DEFAULT_TABLEBASE_DIR if directory is None else directory)
+    return tablebases if len(tablebases) else None
+
+
+# --- Generation -------------------------------------------------------------------
+
+def _dependencies(name):
+    """Configurations reachable by one capture or promotion."""
+    spec = config_pieces(name)
+    deps = set()
+    for i, (color, ptype) in enumerate(spec):
+        if ptype == 'K':
+            continue
+        rest = spec[:i] + spec[i + 1:]
+        deps.add(config_name([(c, t, 0, 0) for c, t in rest]))
+        if ptype == 'P':
+            for promo in PROMOTIONS:
+                deps.add(config_name([(c, t, 0, 0) for c, t in rest + [(color, promo)]]))
+    return deps
+
+
+def _positions(name, gold_cap):
+    """Every legal position of a configuration: (pieces, stm, index)."""
+    spec = sorted(config_pieces(name), key=lambda p: (p[0] != 'white', PIECE_ORDER.index(p[1])))
+    n = len(spec)
+    for squares in itertools.permutations(range(64), n):
+        # Identical pieces are stored once, in increasing square order.
+        if any(spec[i] == spec[i + 1] and squares[i] > squares[i + 1] for i in range(n - 1)):
+            continue
+        if any(t == 'P' and sq // 8 in (0, 7) for (_, t), sq in zip(spec, squares)):
+            continue
+        for golds in itertools.product(range(gold_cap + 1), repeat=n):
+            pieces = tuple((c, t, sq, g) for (c, t), sq, g in zip(spec, squares, golds))
+            for stm in ('white', 'black'):
+                if _in_check(_other(stm), pieces):
+                    continue  # The side that just moved cannot be in check
+                yield pieces, stm, position_index(pieces, stm, gold_cap)
+
+
+def generate_table(name, gold_cap=0, tablebases=None, verbose=True):
+    """Solve one configuration (generating what it depends on first).
+
+    Returns the int16 table; it is also added to tablebases.
+    """
+    if tablebases is None:
+        tablebases = Tablebases()
+    for dep in sorted(_dependencies(name)):
+        if not tablebases.has(dep):
+            generate_table(dep, gold_cap, tablebases, verbose)
+
+    t0 = time.time()
+    size = table_size(name, gold_cap)
+    result = np.zeros(size, dtype=np.int8)
+    plies = np.zeros(size, dtype=np.int32)
+    valid = np.zeros(size, dtype=bool)
+    remaining = np.zeros(size, dtype=np.int32)  # Successors not yet known to win
+    longest_win = np.zeros(size, dtype=np.int32)
+    may_draw = np.zeros(size, dtype=bool)   # Some successor is not a win for the opponent
+    exits = np.zeros(size, dtype=bool)      # Some successor is outside the tables
+    edge_src, edge_dst = array('i'), array('i')
+    queue = []
+
+    for pieces, stm, index in _positions(name, gold_cap):
+        valid[index] = True
+        terminal = terminal_result(pieces, stm)
+        if terminal == DRAW:
+            result[index] = DRAW
+            continue
+        if terminal == LOSS:
+            heapq.heappush(queue, (0, index, LOSS))
+            continue
+        opponent = _other(stm)
+        for _, child in legal_actions(pieces, stm):
+            child_name = config_name(child)
+            if child_name == name:
+                child_index = position_index(child, opponent, gold_cap)
+                if child_index is None:
+                    exits[index] = True
+                else:
+                    edge_src.append(index)
+                    edge_dst.append(child_index)
+                    remaining[index] += 1
+                continue
+            found = tablebases.probe_pieces(child, opponent)
+            if found is None or found[0] == UNKNOWN:
+                exits[index] = True
+            elif found[0] == LOSS:
+                heapq.heappush(queue, (found[1] + 1, index, WIN))
+            elif found[0] == WIN:
+                longest_win[index] = max(longest_win[index], found[1])
+            else:
+                may_draw[index] = True
+        if remaining[index] == 0 and not exits[index] and not may_draw[index]:
+            heapq.heappush(queue, (longest_win[index] + 1, index, LOSS))
+
+    # Predecessor lists (CSR) of the in-table edges.
+    src = np.frombuffer(edge_src, dtype=np.int32)
+    dst = np.frombuffer(edge_dst, dtype=np.int32)
+    order = np.argsort(dst, kind="stable")
+    pred = src[order]
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(dst, minlength=size), out=offsets[1:])
+
+    # Resolve in order of distance: a win takes its shortest mate, a loss
+    # (decided when its last successor is known to win) its longest.
+    while queue:
+        p, index, res = heapq.heappop(queue)
+        if result[index] != UNKNOWN:
+            continue
+        result[index], plies[index] = res, p
+        for q in pred[offsets[index]:offsets[index + 1]]:
+            if result[q] != UNKNOWN:
+                continue
+            if res == LOSS:
+                heapq.heappush(queue, (p + 1, int(q), WIN))
+            else:
+                remaining[q] -= 1
+                longest_win[q] = max(longest_win[q], p)
+                if remaining[q] == 0 and not exits[q] and not may_draw[q]:
+                    heapq.heappush(queue, (int(longest_win[q]) + 1, int(q), LOSS))
+
+    # Unresolved positions are draws unless a move sequence through other
+    # unresolved positions can leave the tables.
+    open_ = valid & (result == UNKNOWN)
+    frontier = list(np.flatnonzero(open_ & exits))
+    escapes = np.zeros(size, dtype=bool)
+    escapes[frontier] = True
+    while frontier:
+        index = frontier.pop()
+        for q in pred[offsets[index]:offsets[index + 1]]:
+            if open_[q] and not escapes[q]:
+                escapes[q] = True
+                frontier.append(q)
+    result[open_ & ~escapes] = DRAW
+
+    values = np.zeros(size, dtype=np.int16)
+    values[valid & (result == DRAW)] = _encode(DRAW, 0)
+    for res in (WIN, LOSS):
+        mask = valid & (result == res)
+        values[mask] = _encode(res, 0) + 2 * plies[mask]
+    tablebases.add(name, gold_cap, values)
+    if verbose:
+        counts = {label: int((valid & (result == res)).sum())
+                  for label, res in (("win", WIN), ("loss", LOSS), ("draw", DRAW), ("unknown", UNKNOWN))}
+        longest = int(plies[valid & (result == WIN)].max(initial=0))
+        print(f"{name} (gold <= {gold_cap}): {int(valid.sum())} positions, {counts}, "
+              f"longest win {longest} plies, {time.time() - t0:.1f}s")
+    return values
+
+
+def generate_tablebases(configs=DEFAULT_CONFIGS, gold_cap=0, directory=None):
+    """Generate configs (and their dependencies) and save every table to directory."""
+    if directory is None:
+        directory = DEFAULT_TABLEBASE_DIR
+    os.makedirs(directory, exist_ok=True)
+    tablebases = Tablebases()
+    for name in configs:
+        if not tablebases.has(name):
+            generate_table(name, gold_cap, tablebases)
+    for name, (cap, values) in tablebases.tables.items():
+        np.save(os.path.join(directory, f"{name}.g{cap}.npy"), values)
+    print(f"Saved {len(tablebases)} tables to {directory}")
+    return tablebases
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    gold_cap = int(args[0]) if args else 0
+    generate_tablebases(configs=tuple(args[1:]) or DEFAULT_CONFIGS, gold_cap=gold_cap)
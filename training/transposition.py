@@ -0,0 +1,104 @@
+"""Transposition table in shared memory for alpha-beta search.
+
+Entries are two uint64 words in a ``multiprocessing.shared_memory`` block,
+so every process of a lazy-SMP search (training/lazy_smp.py) reads and
+writes the same table without locks. Writes store ``(key ^ data, data)``;
+a reader only accepts an entry when the two words XOR back to its own key,
+so an entry torn by concurrent writers reads as a miss rather than as
+another position's data.
+
+data packs the score (float32 bits), the best move's action index, the
+bound type and the search depth.
+"""
+
+import hashlib
+import struct
+
+import numpy as np
+from multiprocessing import shared_memory
+
+EXACT, LOWER, UPPER = 0, 1, 2
+NO_MOVE = 0x3FFF  # 14-bit move field; real action indices are < 8513
+_VALID = 1 << 56
+
+
+def position_hash(game):
+    """64-bit hash of the position (stable across processes, unlike hash())."""
+    digest = hashlib.blake2b(game.get_position_key().encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _pack(depth, bound, move_index, score):
+    score_bits = struct.unpack("<I", struct.pack("<f", score))[0]
+    move_index = NO_MOVE if move_index is None else move_index
+    return score_bits | (move_index << 32) | (bound << 46) | (depth << 48) | _VALID
+
+
+def _unpack(data):
+    score = struct.unpack("<f", struct.pack("<I", data & 0xFFFFFFFF))[0]
+    move_index = (data >> 32) & 0x3FFF
+    bound = (data >> 46) & 0x3
+    depth = (data >> 48) & 0xFF
+    return depth, bound, None if move_index == NO_MOVE else move_index, score
+
+
+class TranspositionTable:
+    """Fixed-size hash table over a (possibly shared) block of uint64 pairs.
+
+    TranspositionTable(num_entries) creates a new block; attach() opens an
+    existing one by name from another process. The creator calls unlink()
+    when done; every user calls close().
+    """
+
+    def __init__(self, num_entries=1 << 18, name=None):
+        self.num_entries = num_entries
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=num_entries * 16)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self._entries = np.ndarray((num_entries, 2), dtype=np.uint64, buffer=self._shm.buf)
+        if self._owner:
+            self._entries[:] = 0
+        self.probes = 0
+        self.hits = 0
+
+    @classmethod
+    def attach(cls, name, num_entries):
+        return cls(num_entries, name=name)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def probe(self, key):
+        """(depth, bound, move_index, score) stored for key, or None."""
+        self.probes += 1
+        slot = self._entries[key % self.num_entries]
+        check, data = int(slot[0]), int(slot[1])
+        if not data & _VALID or check ^ data != key:
+            return None
+        self.hits += 1
+        return _unpack(data)
+
+    def store(self, key, depth, bound, move_index, score):
+        """Store an entry, keeping a deeper result already held for the same key."""
+        slot = self._entries[key % self.num_entries]
+        check, data = int(slot[0]), int(slot[1])
+        if data & _VALID and check ^ data == key and _unpack(data)[0] > depth:
+            return
+        data = _pack(depth, bound, move_index, score)
+        slot[1] = data
+        slot[0] = key ^ data
+
+    def clear(self):
+        self._entries[:] = 0
+
+    def close(self):
+        self._entries = None
+        self._shm.close()
+
+    def unlink(self):
+        if self._owner:
+            self._shm.unlink()